@@ -6,7 +6,7 @@
 """
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import json
 import logging
 from datetime import datetime
@@ -22,9 +22,15 @@ from app.models.compatibility import (
 from app.services.saju_client import saju_client
 from app.services.compatibility_engine import compatibility_engine
 from app.services.compatibility_ai_interpreter import get_compatibility_ai_interpreter
+from msp_common.prompt_builder import prompt_metrics
+from msp_common.llm_limiter import get_llm_limiter_stats
+from msp_common.metrics import CONTENT_TYPE, MetricsMiddleware, register_collector, render_metrics, time_stage
+from msp_common.tracing import TracingMiddleware, get_tracing_stats
+from msp_common.profiling import ProfilingMiddleware, debug_router
+from msp_common.logging_setup import RequestIdMiddleware, get_logging_stats, setup_logging
 
-# 로깅 설정
-logging.basicConfig(level=logging.INFO)
+# 로깅 설정: JSON 레코드를 QueueListener 스레드에서 출력 (LOG_LEVEL / LOG_FORMAT / LOG_SAMPLE_RATES)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 class UnicodeJSONResponse(JSONResponse):
@@ -58,6 +64,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 라우트별 요청 수/지연 시간 (CORS 처리 시간 포함, 추적/프로파일링/요청 ID 미들웨어는 이보다 바깥쪽)
+app.add_middleware(MetricsMiddleware)
+
+# 분산 추적: 요청마다 서버 스팬을 시작하고 SAJU API/LLM 호출에 traceparent 전달 (TRACING_EXPORTER 설정 시)
+app.add_middleware(TracingMiddleware)
+
+# 요청 단위 프로파일링: X-Profile-Token 헤더 또는 PROFILE_SAMPLE_RATE로 선택된 요청만 (결과는 /debug/profiles)
+app.add_middleware(ProfilingMiddleware)
+app.include_router(debug_router)
+
+# 요청 ID: X-Request-ID를 이어받거나 새로 만들어 로그 레코드, 응답 헤더, SAJU API 호출 헤더에 붙임 (가장 바깥쪽)
+app.add_middleware(RequestIdMiddleware)
+
+# 기존 통계 엔드포인트의 숫자 값도 /metrics 게이지로 노출
+register_collector("compatibility_llm", get_llm_limiter_stats, label="provider")
+register_collector("compatibility_prompt", lambda: prompt_metrics.stats()["endpoints"], label="endpoint")
+register_collector("compatibility_tracing", get_tracing_stats)
+register_collector("compatibility_logging", get_logging_stats)
+
 @app.get("/")
 async def root():
     return {
@@ -94,7 +119,7 @@ async def health_check():
             }
         )
     except Exception as e:
-        logger.error(f"헬스 체크 실패: {e}")
+        logger.error("헬스 체크 실패: %s", e)
         return HealthCheckResponse(
             status="unhealthy",
             timestamp=datetime.now().isoformat(),
@@ -151,7 +176,7 @@ async def test_saju_connection(request: CompatibilityRequest):
         )
         
     except Exception as e:
-        logger.error(f"SAJU API 연결 테스트 실패: {e}")
+        logger.error("SAJU API 연결 테스트 실패: %s", e)
         return CompatibilityAnalysisResponse(
             success=False,
             error="test_failed",
@@ -162,7 +187,8 @@ async def test_saju_connection(request: CompatibilityRequest):
 async def analyze_compatibility(request: CompatibilityRequest):
     """실제 궁합 분석 엔드포인트"""
     try:
-        logger.info(f"궁합 분석 시작: {request.person1.name} & {request.person2.name}")
+        logger.info("궁합 분석 시작", extra={"birth_years": [request.person1.year, request.person2.year]})
+        logger.debug("궁합 분석 대상: %s & %s", request.person1.name, request.person2.name)
         
         # 1. SAJU API로부터 두 사람의 사주 분석 결과 가져오기
         saju_result = await saju_client.analyze_multiple_saju(
@@ -178,10 +204,11 @@ async def analyze_compatibility(request: CompatibilityRequest):
             )
         
         # 2. 궁합 계산 엔진으로 분석
-        compatibility_result = compatibility_engine.calculate_overall_compatibility(
-            saju_result["person1"],
-            saju_result["person2"]
-        )
+        with time_stage("compatibility_engine"):
+            compatibility_result = compatibility_engine.calculate_overall_compatibility(
+                saju_result["person1"],
+                saju_result["person2"]
+            )
         
         if not compatibility_result.get("success", False):
             return CompatibilityAnalysisResponse(
@@ -229,7 +256,7 @@ async def analyze_compatibility(request: CompatibilityRequest):
         )
         
     except Exception as e:
-        logger.error(f"궁합 분석 실패: {e}")
+        logger.error("궁합 분석 실패: %s", e)
         return CompatibilityAnalysisResponse(
             success=False,
             error="analysis_failed",
@@ -244,7 +271,7 @@ async def ai_chat_compatibility(
 ):
     """AI 대화형 궁합 해석"""
     try:
-        logger.info(f"AI 궁합 채팅 요청: {question}")
+        logger.info("AI 궁합 채팅 요청: %s", question)
         
         # 1. 궁합 분석 실행
         compatibility_result = await analyze_compatibility(request)
@@ -297,7 +324,7 @@ async def ai_chat_compatibility(
         })
         
     except Exception as e:
-        logger.error(f"AI 궁합 해석 오류: {e}")
+        logger.error("AI 궁합 해석 오류: %s", e)
         return UnicodeJSONResponse({
             "success": False,
             "error": str(e),
@@ -312,7 +339,7 @@ async def generate_suggested_questions(
 ):
     """궁합 분석 결과 기반 개인화된 예상 질문 생성"""
     try:
-        logger.info(f"AI 질문 생성 요청 (방식: {method})")
+        logger.info("AI 질문 생성 요청 (방식: %s)", method)
         
         # 1. 궁합 분석 실행
         compatibility_result = await analyze_compatibility(request)
@@ -362,7 +389,7 @@ async def generate_suggested_questions(
         })
         
     except Exception as e:
-        logger.error(f"질문 생성 오류: {e}")
+        logger.error("질문 생성 오류: %s", e)
         return UnicodeJSONResponse({
             "success": False,
             "error": str(e),
@@ -384,16 +411,32 @@ async def test_ai_connection():
             "message": "AI 연결 테스트 실패"
         }, status_code=500)
 
+# 프롬프트 토큰 지표
+@app.get("/prompt-metrics")
+async def prompt_metrics_stats():
+    """엔드포인트별 LLM 프롬프트 토큰 수 및 기존 방식 대비 절감량 조회"""
+    return prompt_metrics.stats()
+
+@app.get("/llm-limits")
+async def llm_limits():
+    """LLM 공급자별 동시 실행 한도, 실행/대기 중 요청 수, 대기 시간, 429 재시도 현황 조회"""
+    return get_llm_limiter_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 형식 지표 (라우트별 요청 수/지연 히스토그램, SAJU API/궁합 계산/AI 호출 단계 소요 시간, LLM 통계)"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
 # Azure OpenAI API 라우터 등록 (안전한 try-catch)
 try:
     from app.routers.azure_compatibility_api import azure_compatibility_router
     app.include_router(azure_compatibility_router, prefix="/api/v1/azure-compatibility", tags=["azure-compatibility"])
     logger.info("Azure OpenAI 궁합 API 라우터 등록 성공")
 except ImportError as e:
-    logger.error(f"Azure OpenAI 궁합 API 라우터 로드 실패: {e}")
+    logger.error("Azure OpenAI 궁합 API 라우터 로드 실패: %s", e)
     logger.info("Gemini AI만 사용 가능합니다")
 except Exception as e:
-    logger.error(f"Azure OpenAI 궁합 API 라우터 등록 실패: {e}")
+    logger.error("Azure OpenAI 궁합 API 라우터 등록 실패: %s", e)
 
 @app.get("/info")
 async def service_info():
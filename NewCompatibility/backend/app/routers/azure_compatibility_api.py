@@ -11,6 +11,7 @@ from datetime import datetime
 from app.models.compatibility import CompatibilityRequest
 from app.services.saju_client import saju_client
 from app.services.compatibility_engine import compatibility_engine  
+from msp_common.metrics import time_stage
 from app.services.azure_compatibility_ai_service import get_azure_compatibility_service
 
 # 로깅 설정
@@ -43,7 +44,7 @@ async def azure_compatibility_test():
             "data": test_result
         })
     except Exception as e:
-        logger.error(f"Azure 궁합 AI 테스트 실패: {e}")
+        logger.error("Azure 궁합 AI 테스트 실패: %s", e)
         return UnicodeJSONResponse({
             "success": False,
             "error": str(e),
@@ -57,7 +58,7 @@ async def azure_compatibility_chat(
 ):
     """Azure AI 궁합 대화형 해석"""
     try:
-        logger.info(f"Azure AI 궁합 채팅 요청: {question}")
+        logger.info("Azure AI 궁합 채팅 요청: %s", question)
         
         # 1. SAJU API로부터 두 사람의 사주 분석 결과 가져오기
         saju_result = await saju_client.analyze_multiple_saju(
@@ -73,10 +74,11 @@ async def azure_compatibility_chat(
             }, status_code=500)
         
         # 2. 궁합 계산 엔진으로 분석
-        compatibility_result = compatibility_engine.calculate_overall_compatibility(
-            saju_result["person1"],
-            saju_result["person2"]
-        )
+        with time_stage("compatibility_engine"):
+            compatibility_result = compatibility_engine.calculate_overall_compatibility(
+                saju_result["person1"],
+                saju_result["person2"]
+            )
         
         if not compatibility_result.get("success", False):
             return UnicodeJSONResponse({
@@ -124,7 +126,7 @@ async def azure_compatibility_chat(
         })
         
     except Exception as e:
-        logger.error(f"Azure AI 궁합 해석 오류: {e}")
+        logger.error("Azure AI 궁합 해석 오류: %s", e)
         return UnicodeJSONResponse({
             "success": False,
             "error": str(e),
@@ -135,7 +137,7 @@ async def azure_compatibility_chat(
 async def azure_compatibility_questions(request: CompatibilityRequest):
     """Azure AI 궁합 맞춤 질문 생성"""
     try:
-        logger.info(f"Azure AI 궁합 질문 생성 요청")
+        logger.info("Azure AI 궁합 질문 생성 요청")
         
         # 1. SAJU API로부터 두 사람의 사주 분석 결과 가져오기
         saju_result = await saju_client.analyze_multiple_saju(
@@ -151,10 +153,11 @@ async def azure_compatibility_questions(request: CompatibilityRequest):
             }, status_code=500)
         
         # 2. 궁합 계산 엔진으로 분석
-        compatibility_result = compatibility_engine.calculate_overall_compatibility(
-            saju_result["person1"],
-            saju_result["person2"]
-        )
+        with time_stage("compatibility_engine"):
+            compatibility_result = compatibility_engine.calculate_overall_compatibility(
+                saju_result["person1"],
+                saju_result["person2"]
+            )
         
         if not compatibility_result.get("success", False):
             return UnicodeJSONResponse({
@@ -198,7 +201,7 @@ async def azure_compatibility_questions(request: CompatibilityRequest):
         })
         
     except Exception as e:
-        logger.error(f"Azure AI 궁합 질문 생성 오류: {e}")
+        logger.error("Azure AI 궁합 질문 생성 오류: %s", e)
         return UnicodeJSONResponse({
             "success": False,
             "error": str(e),
@@ -249,7 +252,7 @@ async def azure_compatibility_analyze(
         return await azure_compatibility_chat(request, "우리 둘의 궁합은 어떤가요?")
         
     except Exception as e:
-        logger.error(f"Azure AI 궁합 분석 오류: {e}")
+        logger.error("Azure AI 궁합 분석 오류: %s", e)
         return UnicodeJSONResponse({
             "success": False,
             "error": str(e),
@@ -9,10 +9,51 @@ import aiohttp
 from typing import Dict, Any, Optional
 from datetime import datetime
 from dotenv import load_dotenv
+from msp_common.metrics import time_stage
+from msp_common.tracing import inject_headers, start_span
+from msp_common.llm_limiter import LLMProviderError, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, azure_limiter, parse_retry_after
+from msp_common.prompt_builder import PromptTemplate, build_prompt, legacy_json
+from app.services.prompt_features import COMPATIBILITY_FEATURES, couple_text
 
 # .env 파일 로드
 load_dotenv()
 
+# 프롬프트 템플릿 (문구를 바꾸면 version을 올려 지표/응답에서 구분)
+INTERPRET_TEMPLATE = PromptTemplate("azure.compatibility.interpret", "2", """
+궁합 정보:
+{features}
+
+질문: {question}
+
+위 궁합 분석을 바탕으로 친근하고 따뜻하게 답변해주세요:
+- 핵심 내용 1-2줄로 요약 
+- 두 분의 궁합 특징 2-3개
+- 관계 개선을 위한 실용적 조언 2개
+- 200자 내외, 이모지 적절히 사용 💕
+""")
+
+QUESTIONS_TEMPLATE = PromptTemplate("azure.compatibility.questions", "2", """
+궁합 분석:
+{features}
+두 분 정보: {persons}
+
+{name1}님과 {name2}님의 궁합이 {total}점입니다.
+
+이 두 분이 가장 궁금해할 만한 궁합 관련 질문 5개를 다음 JSON 형식으로 생성해주세요:
+
+{{
+  "questions": [
+    {{"question": "우리 둘이 결혼하면 어떨까요?", "category": "결혼궁합", "priority": "high", "icon": "💒"}},
+    {{"question": "갈등이 생겼을 때 해결 방법은?", "category": "갈등해결", "priority": "high", "icon": "🤝"}},
+    {{"question": "서로 소통할 때 주의할 점은?", "category": "소통방법", "priority": "medium", "icon": "💬"}},
+    {{"question": "장기적으로 관계가 어떻게 발전할까요?", "category": "미래전망", "priority": "medium", "icon": "🔮"}},
+    {{"question": "연애를 더 발전시키려면?", "category": "연애발전", "priority": "low", "icon": "💕"}}
+  ]
+}}
+
+궁합 점수와 특성을 반영해서 구체적이고 실용적인 질문으로 작성해주세요.
+""")
+
 class AzureCompatibilityAIService:
     """Azure OpenAI 궁합 분석 전용 서비스"""
     
@@ -34,8 +75,8 @@ class AzureCompatibilityAIService:
         self.max_tokens = 1000
         self.top_p = 0.9
     
-    async def chat_completion(self, messages: list, system_prompt: str = None) -> str:
-        """Azure OpenAI Chat Completion API 호출"""
+    async def chat_completion(self, messages: list, system_prompt: str = None, priority: int = PRIORITY_INTERACTIVE) -> str:
+        """Azure OpenAI Chat Completion API 호출 (동시 실행 제한 + 429/5xx 재시도)"""
         headers = {
             "Content-Type": "application/json",
             "api-key": self.api_key
@@ -58,14 +99,25 @@ class AzureCompatibilityAIService:
             "top_p": self.top_p
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.api_url, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data["choices"][0]["message"]["content"]
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"Azure OpenAI API 오류 ({response.status}): {error_text}")
+        with time_stage("ai_call.azure_openai"):
+            return await azure_limiter.call(lambda: self._post_chat(headers, payload), priority)
+
+    async def _post_chat(self, headers: Dict[str, str], payload: Dict[str, Any]) -> str:
+        with start_span("azure_openai.chat.completions", kind="client", attributes={"llm.provider": "azure_openai", "llm.deployment": self.deployment_name}) as span:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.api_url, headers=inject_headers(headers), json=payload) as response:
+                    if span is not None:
+                        span.set_attribute("http.status_code", response.status)
+                    if response.status == 200:
+                        data = await response.json()
+                        return data["choices"][0]["message"]["content"]
+                    else:
+                        error_text = await response.text()
+                        raise LLMProviderError(
+                            f"Azure OpenAI API 오류 ({response.status}): {error_text}",
+                            status=response.status,
+                            retry_after=parse_retry_after(response.headers),
+                        )
     
     async def interpret_compatibility(self, compatibility_data: Dict[str, Any], question: str) -> Dict[str, Any]:
         """궁합 분석 해석 서비스"""
@@ -74,25 +126,23 @@ class AzureCompatibilityAIService:
 궁합 분석 결과를 바탕으로 간결하고 따뜻한 조언을 제공합니다.
 두 분의 관계에 실질적으로 도움이 되는 조언을 해주세요."""
             
-            user_prompt = f"""
-궁합 정보: {json.dumps(compatibility_data, ensure_ascii=False, indent=2)}
-
-질문: {question}
-
-위 궁합 분석을 바탕으로 친근하고 따뜻하게 답변해주세요:
-- 핵심 내용 1-2줄로 요약 
-- 두 분의 궁합 특징 2-3개
-- 관계 개선을 위한 실용적 조언 2개
-- 200자 내외, 이모지 적절히 사용 💕
-            """
+            prompt = build_prompt(
+                "azure.compatibility.interpret",
+                INTERPRET_TEMPLATE,
+                compatibility_data,
+                COMPATIBILITY_FEATURES,
+                baseline=INTERPRET_TEMPLATE.text.format(features=legacy_json(compatibility_data, indent=2), question=question),
+                question=question,
+            )
             
-            response = await self.chat_completion(user_prompt, system_prompt)
+            response = await self.chat_completion(prompt.text, system_prompt)
             
             return {
                 "success": True,
                 "ai_interpretation": response,
                 "provider": "azure_openai",
                 "model": "gpt-4.1",
+                "prompt": prompt.summary(),
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -112,28 +162,24 @@ class AzureCompatibilityAIService:
             score = compatibility_data.get('score', {})
             persons = compatibility_data.get('persons', {})
             
-            user_prompt = f"""
-궁합 분석: {json.dumps(compatibility_data, ensure_ascii=False)}
-두 분 정보: {json.dumps(persons_info, ensure_ascii=False)}
-
-{persons.get('person1', {}).get('name', '')}님과 {persons.get('person2', {}).get('name', '')}님의 궁합이 {score.get('total', 0)}점입니다.
-
-이 두 분이 가장 궁금해할 만한 궁합 관련 질문 5개를 다음 JSON 형식으로 생성해주세요:
-
-{{
-  "questions": [
-    {{"question": "우리 둘이 결혼하면 어떨까요?", "category": "결혼궁합", "priority": "high", "icon": "💒"}},
-    {{"question": "갈등이 생겼을 때 해결 방법은?", "category": "갈등해결", "priority": "high", "icon": "🤝"}},
-    {{"question": "서로 소통할 때 주의할 점은?", "category": "소통방법", "priority": "medium", "icon": "💬"}},
-    {{"question": "장기적으로 관계가 어떻게 발전할까요?", "category": "미래전망", "priority": "medium", "icon": "🔮"}},
-    {{"question": "연애를 더 발전시키려면?", "category": "연애발전", "priority": "low", "icon": "💕"}}
-  ]
-}}
-
-궁합 점수와 특성을 반영해서 구체적이고 실용적인 질문으로 작성해주세요.
-            """
+            names = {
+                "name1": persons.get('person1', {}).get('name', ''),
+                "name2": persons.get('person2', {}).get('name', ''),
+                "total": score.get('total', 0),
+            }
+            prompt = build_prompt(
+                "azure.compatibility.questions",
+                QUESTIONS_TEMPLATE,
+                compatibility_data,
+                COMPATIBILITY_FEATURES,
+                baseline=QUESTIONS_TEMPLATE.text.format(
+                    features=legacy_json(compatibility_data), persons=legacy_json(persons_info), **names
+                ),
+                persons=couple_text(persons_info),
+                **names,
+            )
             
-            response = await self.chat_completion(user_prompt, system_prompt)
+            response = await self.chat_completion(prompt.text, system_prompt, PRIORITY_BACKGROUND)
             
             # JSON 파싱
             try:
@@ -152,6 +198,7 @@ class AzureCompatibilityAIService:
                 "suggested_questions": questions,
                 "generation_method": "azure_ai_compatibility",
                 "provider": "azure_openai", 
+                "prompt": prompt.summary(),
                 "timestamp": datetime.now().isoformat(),
                 "total_questions": len(questions)
             }
@@ -138,7 +138,7 @@ class CompatibilityEngine:
             return elements
             
         except Exception as e:
-            logger.error(f"사주 요소 추출 실패: {e}")
+            logger.error("사주 요소 추출 실패: %s", e)
             return {}
     
     def calculate_wuxing_compatibility(self, person1_wuxing: Dict[str, int], person2_wuxing: Dict[str, int]) -> Dict[str, Any]:
@@ -178,7 +178,7 @@ class CompatibilityEngine:
             }
             
         except Exception as e:
-            logger.error(f"오행 궁합 계산 실패: {e}")
+            logger.error("오행 궁합 계산 실패: %s", e)
             return {"score": 50, "analysis": "오행 분석 중 오류가 발생했습니다."}
     
     def calculate_sibseong_compatibility(self, person1_sibseong: str, person2_sibseong: str) -> Dict[str, Any]:
@@ -201,7 +201,7 @@ class CompatibilityEngine:
             }
             
         except Exception as e:
-            logger.error(f"십성 궁합 계산 실패: {e}")
+            logger.error("십성 궁합 계산 실패: %s", e)
             return {"score": 50, "analysis": "십성 분석 중 오류가 발생했습니다."}
     
     def get_wuxing_analysis(self, element1: str, element2: str, score: int) -> str:
@@ -262,7 +262,7 @@ class CompatibilityEngine:
                     return 25  # 나쁜 궁합의 끝점
                     
         except Exception as e:
-            logger.error(f"점수 극단화 실패: {e}")
+            logger.error("점수 극단화 실패: %s", e)
             # 실패 시 원래 점수 반환
             return raw_score
     
@@ -368,7 +368,7 @@ class CompatibilityEngine:
             }
             
         except Exception as e:
-            logger.error(f"전체 궁합 계산 실패: {e}")
+            logger.error("전체 궁합 계산 실패: %s", e)
             return {
                 "success": False,
                 "error": "compatibility_calculation_failed",
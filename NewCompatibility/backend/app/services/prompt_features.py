@@ -0,0 +1,35 @@
+"""
+궁합 분석 결과의 프롬프트 항목 정의 (직렬화/토큰 예산은 msp_common.prompt_builder)
+"""
+from typing import Any, Dict, Tuple
+
+from msp_common.prompt_builder import FeatureSpec
+
+
+def couple_text(persons: Dict[str, Any]) -> str:
+    """두 사람 정보를 한 줄로 (예: 철수(1990년 1월 1일) & 영희(1992년생))"""
+    names = []
+    for key in ("person1", "person2"):
+        person = persons.get(key) or {}
+        name = person.get("name", "")
+        birth = person.get("birth_date") or (f"{person['year']}년생" if person.get("year") else "")
+        if name or birth:
+            names.append(f"{name}({birth})" if birth else name)
+    return " & ".join(names)
+
+
+def _score_text(data: Dict[str, Any]) -> str:
+    score = data.get("score") or {}
+    if "total" not in score:
+        return ""
+    text = f"{score['total']}점"
+    return f"{text} ({score['grade']})" if score.get("grade") else text
+
+
+COMPATIBILITY_FEATURES: Tuple[FeatureSpec, ...] = (
+    FeatureSpec("두 분", lambda d: couple_text(d.get("persons") or {}), 100),
+    FeatureSpec("궁합 점수", _score_text, 95),
+    FeatureSpec("종합 평가", lambda d: (d.get("analysis") or {}).get("overall_summary") or (d.get("score") or {}).get("description"), 80),
+    FeatureSpec("오행 상성", "analysis.wuxing_compatibility", 60),
+    FeatureSpec("십성 배합", "analysis.ten_gods_compatibility", 50),
+)
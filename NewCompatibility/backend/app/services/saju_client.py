@@ -10,6 +10,10 @@ from typing import Dict, Any, Optional
 import asyncio
 from datetime import datetime
 
+from msp_common.metrics import time_stage
+from msp_common.tracing import inject_headers
+from msp_common.logging_setup import with_request_id
+
 logger = logging.getLogger(__name__)
 
 class SajuAPIClient:
@@ -37,7 +41,7 @@ class SajuAPIClient:
             logger.error("SAJU API 연결 실패")
             return {"status": "disconnected", "error": "SAJU API 서버에 연결할 수 없습니다"}
         except Exception as e:
-            logger.error(f"SAJU API 헬스 체크 실패: {e}")
+            logger.error("SAJU API 헬스 체크 실패: %s", e)
             return {"status": "error", "error": str(e)}
     
     async def analyze_saju(self, birth_info: Dict[str, Any]) -> Dict[str, Any]:
@@ -58,17 +62,19 @@ class SajuAPIClient:
             완전한 사주 분석 결과
         """
         try:
-            logger.info(f"SAJU API 호출 시작: {birth_info.get('name', 'Unknown')}")
+            logger.debug("SAJU API 호출 시작: %s", birth_info.get('name', 'Unknown'))
             
             async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/v1/saju/analyze",
-                    json=birth_info
-                )
+                with time_stage("saju_api"):
+                    response = await client.post(
+                        f"{self.base_url}/api/v1/saju/analyze",
+                        json=birth_info,
+                        headers=with_request_id(inject_headers())
+                    )
                 response.raise_for_status()
                 
                 result = response.json()
-                logger.info(f"SAJU API 호출 성공: {birth_info.get('name', 'Unknown')}")
+                logger.debug("SAJU API 호출 성공: %s", birth_info.get('name', 'Unknown'))
                 
                 return {
                     "success": True,
@@ -136,13 +142,14 @@ class SajuAPIClient:
             person1_task = self.analyze_saju(person1_info)
             person2_task = self.analyze_saju(person2_info)
             
-            person1_result, person2_result = await asyncio.gather(
-                person1_task, person2_task, return_exceptions=True
-            )
+            with time_stage("saju_api.pair"):
+                person1_result, person2_result = await asyncio.gather(
+                    person1_task, person2_task, return_exceptions=True
+                )
             
             # 결과 검증
             if isinstance(person1_result, Exception):
-                logger.error(f"Person1 분석 실패: {person1_result}")
+                logger.error("Person1 분석 실패: %s", person1_result)
                 return {
                     "success": False,
                     "error": "person1_analysis_failed",
@@ -151,7 +158,7 @@ class SajuAPIClient:
                 }
             
             if isinstance(person2_result, Exception):
-                logger.error(f"Person2 분석 실패: {person2_result}")
+                logger.error("Person2 분석 실패: %s", person2_result)
                 return {
                     "success": False,
                     "error": "person2_analysis_failed",
@@ -0,0 +1,14 @@
+"""
+관상 분석 서비스 - app 패키지
+서비스 공용 모듈(저장소 루트의 shared/msp_common)을 import 경로에 추가합니다.
+저장소 구조가 다른 곳(컨테이너 등)에서는 MSP_SHARED_PATH로 shared/ 위치를 지정합니다.
+"""
+import os
+import sys
+
+os.environ.setdefault("SERVICE_NAME", "physiognomy")
+
+_SHARED_PATH = os.getenv("MSP_SHARED_PATH") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "shared"))
+if _SHARED_PATH not in sys.path:
+    sys.path.append(_SHARED_PATH)
@@ -0,0 +1,70 @@
+# batch_analyze.py
+"""
+저장된 이미지를 한꺼번에 다시 분석하는 오프라인 도구입니다.
+
+실행 (Physiognomy/backend 에서):
+    python -m app.batch_analyze uploads/ --output results.jsonl
+    python -m app.batch_analyze uploads/ --output results.parquet --report
+    python -m app.batch_analyze uploads/ --db        # analysis_results의 해석 키를 갱신
+"""
+
+import argparse
+import asyncio
+import time
+
+from . import models
+from .database import SessionLocal, engine, upgrade_schema
+from .services.analysis_pipeline import shutdown_executor
+from .services.batch_analysis import (
+    BATCH_CHUNK_SIZE,
+    analyze_images_batch,
+    collect_image_paths,
+    upsert_results,
+    write_results_file,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="관상 배치 분석")
+    parser.add_argument("inputs", nargs="+", help="이미지 파일 또는 디렉토리")
+    parser.add_argument("--output", help="결과 파일 경로 (.jsonl 또는 .parquet)")
+    parser.add_argument("--db", action="store_true", help="analysis_results에 결과 저장 (같은 이미지 기록은 갱신)")
+    parser.add_argument("--report", action="store_true", help="LLM 리포트도 생성 (해석 키 조합별 1회)")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE, help="워커 하나가 한 번에 처리할 이미지 수")
+    return parser.parse_args()
+
+
+async def run(args) -> None:
+    image_paths = collect_image_paths(args.inputs)
+    print(f"이미지 {len(image_paths)}개 분석 시작")
+    started = time.perf_counter()
+    results = await analyze_images_batch(image_paths, include_report=args.report, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - started
+
+    detected = sum(result.face_detected for result in results)
+    print(f"완료: {elapsed:.1f}초, 얼굴 감지 {detected}/{len(results)}개")
+
+    if args.output:
+        write_results_file(results, args.output)
+        print(f"결과 파일 저장: {args.output}")
+    if args.db:
+        models.Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
+        with SessionLocal() as db:
+            counts = upsert_results(db, results)
+            db.commit()
+        print(f"DB 저장: 갱신 {counts['updated']}건, 추가 {counts['inserted']}건")
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.output and not args.db:
+        raise SystemExit("--output 또는 --db 중 하나 이상을 지정해야 합니다.")
+    try:
+        asyncio.run(run(args))
+    finally:
+        shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,108 @@
-
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+import asyncio
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./physiognomy.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
+# 커넥션 풀 설정 (SQLite 파일 DB는 WAL 덕분에 읽기 커넥션을 여러 개 둘 수 있음)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5" if DATABASE_URL.startswith("sqlite") else "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10" if DATABASE_URL.startswith("sqlite") else "20"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+
+# SQLite PRAGMA 설정
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# 쓰기 묶음 커밋(group commit) 설정. 지연이 0이면 대기 중인 쓰기만 모아서 바로 커밋
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "64"))
+DB_WRITE_BATCH_DELAY_MS = float(os.getenv("DB_WRITE_BATCH_DELAY_MS", "0"))
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def _engine_options(url: str) -> dict:
+    if not url.startswith("sqlite"):
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_pre_ping": True,
+            "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        }
+    options = {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    if _is_memory_sqlite(url):
+        # 메모리 DB는 커넥션마다 별개의 DB가 되므로 하나를 공유
+        options["poolclass"] = StaticPool
+    else:
+        options["pool_size"] = DB_POOL_SIZE
+        options["max_overflow"] = DB_MAX_OVERFLOW
+    return options
+
+
+def configure_sqlite(bind) -> None:
+    """
+    SQLite 커넥션마다 WAL, synchronous=NORMAL, mmap, busy_timeout PRAGMA를 적용합니다.
+    WAL에서는 쓰기 중에도 읽기가 막히지 않고, NORMAL 동기화는 커밋마다 fsync하지 않습니다.
+    pysqlite의 암묵적 트랜잭션 처리를 끄고 BEGIN을 직접 내보내 SAVEPOINT가 올바르게 동작하게 합니다.
+    """
+    @event.listens_for(bind, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(bind, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+def create_db_engine(url: str = DATABASE_URL):
+    bind = create_engine(url, **_engine_options(url))
+    if url.startswith("sqlite"):
+        configure_sqlite(bind)
+    return bind
+
+
+# 동기 URL에 대응하는 비동기 드라이버 (같은 모델을 두 백엔드에서 사용)
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str = DATABASE_URL):
+    async_url = to_async_url(url)
+    bind = create_async_engine(async_url, **_engine_options(async_url))
+    if async_url.startswith("sqlite"):
+        configure_sqlite(bind.sync_engine)
+    return bind
+
+
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 비동기 엔드포인트용 엔진/세션 (이벤트 루프를 막지 않음)
+async_engine = create_async_db_engine(DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -17,3 +111,149 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def upgrade_schema(bind=engine):
+    """
+    create_all은 기존 테이블에 새 컬럼이나 인덱스를 추가하지 않으므로,
+    모델에는 있지만 DB에 없는 (nullable) 컬럼을 ALTER TABLE로 추가하고 누락된 인덱스를 생성합니다.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"DB 스키마 업그레이드: {table.name}.{column.name} 컬럼 추가")
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=conn)
+                    print(f"DB 스키마 업그레이드: {index.name} 인덱스 생성")
+
+
+class WriteBatcher:
+    """
+    여러 요청의 짧은 쓰기 작업을 모아 AsyncSession 한 트랜잭션으로 커밋합니다 (group commit).
+    한 작업이 실패하면 작업별 SAVEPOINT로 다시 적용하므로 같은 묶음의 다른 작업은 커밋됩니다.
+    작업 함수는 동기 Session을 받아 결과를 반환하며 (AsyncSession.run_sync로 실행),
+    결과는 커밋이 끝난 뒤 전달됩니다.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, max_batch: int = DB_WRITE_BATCH_SIZE,
+                 max_delay_ms: float = DB_WRITE_BATCH_DELAY_MS):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.writes = 0
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def run(self, operation: Callable[[Any], Any]) -> Any:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        while not self._queue.empty():
+            self._queue.get_nowait()[1].cancel()
+        self._task = None
+
+    async def _collect(self) -> List[Tuple[Callable[[Any], Any], asyncio.Future]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @staticmethod
+    def _apply_all(db, operations: List[Callable[[Any], Any]]) -> List[Any]:
+        return [operation(db) for operation in operations]
+
+    @staticmethod
+    def _apply_each(db, operations: List[Callable[[Any], Any]]) -> List[Tuple[bool, Any]]:
+        outcomes = []
+        for operation in operations:
+            try:
+                with db.begin_nested():
+                    outcomes.append((True, operation(db)))
+            except Exception as e:
+                outcomes.append((False, e))
+        return outcomes
+
+    async def _commit_batch(self, operations: List[Callable[[Any], Any]]) -> List[Tuple[bool, Any]]:
+        # 대부분 성공하므로 먼저 SAVEPOINT 없이 한 번에 적용하고, 실패하면 작업별 SAVEPOINT로 다시 시도
+        async with self.session_factory() as db:
+            try:
+                results = await db.run_sync(self._apply_all, operations)
+                await db.commit()
+                return [(True, result) for result in results]
+            except Exception:
+                await db.rollback()
+        async with self.session_factory() as db:
+            outcomes = await db.run_sync(self._apply_each, operations)
+            await db.commit()
+            return outcomes
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            try:
+                outcomes = await self._commit_batch([operation for operation, _ in batch])
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                print(f"DB 묶음 커밋 실패: {e}")
+                outcomes = [(False, e)] * len(batch)
+            self.batches += 1
+            for (_, future), (ok, value) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if ok:
+                    self.writes += 1
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "avg_batch_size": round(self.writes / self.batches, 2) if self.batches else 0,
+            "pending": self._queue.qsize() if self._queue else 0,
+        }
+
+
+write_batcher = WriteBatcher()
@@ -1,29 +1,80 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
+import asyncio
 import os
 import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Optional
+
+# 서비스 공용 모듈 (shared/msp_common)
+from msp_common.metrics import CONTENT_TYPE, MetricsMiddleware, register_collector, render_metrics
+from msp_common.profiling import ProfilingMiddleware, debug_router, require_admin_token
 
 # 데이터베이스 및 모델 임포트
 from . import models, database
 from .database import engine
 
 # 서비스 모듈 임포트
-from .services.face_landmarker import get_face_landmarks
-from .services.geometry_calculator import calculate_geometric_metrics
-from .services.rule_engine import analyze_gwansang_rules
-from .services.report_generator import generate_report
-from .services.lucky_charm_generator import generate_lucky_charm_image
+from .services.analysis_history import InvalidCursorError, MAX_PAGE_SIZE, query_history_page
+from .services.analysis_pipeline import (
+    PipelineBusyError,
+    admission,
+    get_pipeline_metrics,
+    run_analysis_pipeline_async,
+    shutdown_executor,
+)
+from .services import charm_store
+from .services.charm_jobs import FAILED, CharmQueueFullError, charm_jobs
+from .services.rule_engine import rule_engine
+from .services.report_cache import canonical_keys, report_cache
+from .services.report_generator import prewarm_report_cache
+from .services import landmark_store, thumbnails
+from .services.batch_analysis import BATCH_MAX_FILES, BATCH_MAX_TOTAL_BYTES, analyze_images_batch, insert_results
+from .services.rescoring import rescore_history
+from .services.upload_handler import (
+    MAX_UPLOAD_BYTES,
+    MULTIPART_OVERHEAD_BYTES,
+    UploadRejectedError,
+    UploadSizeLimitMiddleware,
+    downsample_if_needed,
+    save_upload,
+)
 
 # 데이터베이스 테이블 생성
 models.Base.metadata.create_all(bind=engine)
+database.upgrade_schema(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    charm_jobs.start()
+    # REPORT_CACHE_PREWARM=N 이면 가장 자주 나온 N개 해석 키 조합의 리포트를 백그라운드에서 미리 생성
+    # (작업 참조를 보관해 도중에 가비지 컬렉션되지 않도록 하고, 종료 시 취소)
+    prewarm_task = None
+    prewarm_limit = int(os.getenv("REPORT_CACHE_PREWARM", "0"))
+    if prewarm_limit > 0:
+        prewarm_task = asyncio.create_task(prewarm_report_cache(prewarm_limit))
+    yield
+    if prewarm_task is not None and not prewarm_task.done():
+        prewarm_task.cancel()
+        await asyncio.gather(prewarm_task, return_exceptions=True)
+    shutdown_executor()
+    await charm_jobs.stop()
+    # 아직 DB에 반영하지 않은 리포트 캐시 메모리 적중 기록
+    await asyncio.to_thread(report_cache.flush_touches)
+    await database.write_batcher.stop()
+    await database.async_engine.dispose()
 
 app = FastAPI(
     title="AI 관상 분석 API",
     description="사용자의 얼굴 이미지를 분석하여 전통 관상학에 기반한 해석을 제공합니다. **본 서비스는 오락용이며, 과학적 근거가 없습니다.**",
     version="1.1.0",
+    lifespan=lifespan,
 )
 
 # CORS 미들웨어 추가
@@ -35,6 +86,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 업로드 본문 크기 제한 (multipart 파싱 전에 거부)
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/analyze/"])
+# 배치는 파일당 상한과 별도로 요청 전체 크기를 BATCH_MAX_TOTAL_BYTES로 제한
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/analyze/batch"],
+                   max_body_bytes=min(BATCH_MAX_TOTAL_BYTES, (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES) * BATCH_MAX_FILES))
+
+# 라우트별 요청 수/지연 시간 (업로드 크기 제한/CORS 처리 시간 포함, 프로파일링 미들웨어는 이보다 바깥쪽)
+app.add_middleware(MetricsMiddleware)
+
+# 요청 단위 프로파일링: X-Profile-Token 헤더 또는 PROFILE_SAMPLE_RATE로 선택된 요청만 (결과는 /debug/profiles)
+app.add_middleware(ProfilingMiddleware)
+app.include_router(debug_router)
+
+# 기존 통계 엔드포인트의 숫자 값도 /metrics 게이지로 노출
+register_collector("physiognomy_admission", admission.snapshot)
+register_collector("physiognomy_report_cache", report_cache.stats)
+register_collector("physiognomy_charm_store", charm_store.stats)
+register_collector("physiognomy_charm_jobs", charm_jobs.stats)
+register_collector("physiognomy_db_writes", database.write_batcher.stats)
+
 # 정적 파일 서빙
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
@@ -48,21 +119,27 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-from typing import Union, Tuple
+def _insert_analysis(db: Session, db_result: models.AnalysisResult) -> int:
+    db.add(db_result)
+    db.flush()
+    return db_result.id
 
-def run_analysis_pipeline(image_path: str) -> Union[Tuple[str, str], None]:
-    landmarks, height, width = get_face_landmarks(image_path)
-    if not landmarks:
-        return None
-    geometric_metrics = calculate_geometric_metrics(landmarks, height, width)
-    gwansang_keys = analyze_gwansang_rules(geometric_metrics)
-    final_report, dalle_prompt = generate_report(gwansang_keys)
-    return final_report, dalle_prompt
+async def _shrink_stored_copy(image_path: str, image_header) -> None:
+    """
+    분석이 끝난 뒤 저장본만 축소하고 썸네일을 예약합니다.
+    기하학 지표(눈/눈썹 기울기, 코/입꼬리 각도 등)는 픽셀 단위이고 규칙 임계값도 픽셀 기준이므로,
+    분석 자체는 항상 업로드 원본 해상도로 수행해야 합니다 (저장되는 image_size도 원본 크기).
+    """
+    try:
+        await asyncio.to_thread(downsample_if_needed, image_path, image_header)
+    except UploadRejectedError as e:
+        print(f"업로드 저장본 축소 실패 ({image_path}): {e}")
+    thumbnails.schedule_thumbnails(image_path)
 
 @app.post("/analyze/",
           summary="얼굴 이미지 관상 분석",
           description="**중요**: 이 엔드포인트는 오락 목적으로만 사용되어야 합니다.")
-async def analyze_face_api(db: Session = Depends(database.get_db), file: UploadFile = File(...)):
+async def analyze_face_api(file: UploadFile = File(...)):
     if not allowed_file(file.filename):
         raise HTTPException(status_code=400, detail="허용되지 않는 파일 형식입니다.")
 
@@ -71,39 +148,119 @@ async def analyze_face_api(db: Session = Depends(database.get_db), file: UploadF
         filename = f"{uuid.uuid4()}_{file.filename}"
         image_path = os.path.join(UPLOAD_FOLDER, filename)
 
-        with open(image_path, "wb") as buffer:
-            buffer.write(await file.read())
-
-        analysis_result = run_analysis_pipeline(image_path)
+        # 청크 단위로 저장하면서 크기/형식을 검사
+        image_header = await save_upload(file, image_path)
+        try:
+            analysis_result = await run_analysis_pipeline_async(image_path)
+        finally:
+            await _shrink_stored_copy(image_path, image_header)
         if analysis_result is None:
             raise HTTPException(status_code=400, detail="얼굴을 감지하지 못했습니다.")
         
-        report, charm_prompt = analysis_result
+        report, charm_prompt = analysis_result.report, analysis_result.charm_prompt
 
-        # 데이터베이스에 분석 결과 저장
+        # 데이터베이스에 분석 결과 저장 (다른 요청의 쓰기와 묶어서 커밋)
         db_result = models.AnalysisResult(
             original_filename=file.filename,
             image_path=filename,
             report=report,
-            lucky_charm_image_url=None  # 초기에는 부적 URL 없음
+            lucky_charm_image_url=None,  # 초기에는 부적 URL 없음
+            interpretation_keys=canonical_keys(analysis_result.interpretation_keys),
+            **landmark_store.landmark_columns(analysis_result.landmarks, analysis_result.image_size, analysis_result.metrics),
         )
-        db.add(db_result)
-        db.commit()
-        db.refresh(db_result)
+        analysis_id = await database.write_batcher.run(lambda db: _insert_analysis(db, db_result))
 
         image_url = f"/uploads/{filename}"
         return JSONResponse(content={
             "success": True,
             "report": report,
-            "analysis_id": db_result.id,
+            "analysis_id": analysis_id,
             "image_url": image_url,
+            "thumbnail_url": thumbnails.thumbnail_url(filename),
             "charm_prompt": charm_prompt  # 프롬프트를 프론트엔드로 전달
         })
 
+    except UploadRejectedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except PipelineBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error during analysis: {e}")
         raise HTTPException(status_code=500, detail=f"서버 내부 오류가 발생했습니다.")
 
+@app.post("/analyze/batch",
+          summary="여러 이미지 일괄 관상 분석",
+          description=f"최대 {BATCH_MAX_FILES}개의 이미지를 한 번에 분석합니다. 리포트 생성은 `include_report=true`일 때만 수행하며 "
+                      "(해석 키 조합별 1회), `save=false`이면 DB에 저장하지 않습니다. 이미지별 실패는 결과의 `error`로 반환됩니다.")
+async def analyze_batch_api(
+    files: List[UploadFile] = File(...),
+    include_report: bool = Query(False),
+    save: bool = Query(True),
+):
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {BATCH_MAX_FILES}개까지 분석할 수 있습니다.")
+
+    # 이미지별 업로드 검사 결과 (거부된 파일은 분석에서 제외하고 오류로 보고)
+    items = []
+    for file in files:
+        item = {"original_filename": file.filename, "image_path": None, "error": None}
+        items.append(item)
+        if not allowed_file(file.filename):
+            item["error"] = "허용되지 않는 파일 형식입니다."
+            continue
+        filename = f"{uuid.uuid4()}_{file.filename}"
+        image_path = os.path.join(UPLOAD_FOLDER, filename)
+        try:
+            item["image_header"] = await save_upload(file, image_path)
+        except UploadRejectedError as e:
+            item["error"] = str(e)
+            continue
+        item["image_path"] = image_path
+
+    accepted = [item for item in items if item["image_path"]]
+    try:
+        # 프로세스 풀 묶음(BATCH_CHUNK_SIZE장)마다 수용 제어 슬롯을 하나씩 차지
+        results = await analyze_images_batch([item["image_path"] for item in accepted], include_report=include_report,
+                                             admission=admission)
+    except PipelineBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    finally:
+        for item in accepted:
+            await _shrink_stored_copy(item["image_path"], item["image_header"])
+
+    analysis_ids = [None] * len(results)
+    if save and results:
+        original_filenames = [item["original_filename"] for item in accepted]
+        analysis_ids = await database.write_batcher.run(lambda db: insert_results(db, results, original_filenames))
+
+    by_path = {item["image_path"]: (result, analysis_id) for item, result, analysis_id in zip(accepted, results, analysis_ids)}
+    response_items = []
+    for item in items:
+        entry = {"original_filename": item["original_filename"], "error": item["error"]}
+        if item["image_path"]:
+            result, analysis_id = by_path[item["image_path"]]
+            filename = os.path.basename(item["image_path"])
+            entry.update({
+                "analysis_id": analysis_id,
+                "face_detected": result.face_detected,
+                "interpretation_keys": result.interpretation_keys,
+                "report": result.report,
+                "charm_prompt": result.charm_prompt,
+                "error": result.error,
+                "image_url": f"/uploads/{filename}",
+                "thumbnail_url": thumbnails.thumbnail_url(filename),
+            })
+        response_items.append(entry)
+
+    return JSONResponse(content={
+        "success": True,
+        "count": len(response_items),
+        "analyzed": sum(1 for result in results if result.face_detected),
+        "results": response_items,
+    })
+
 from pydantic import BaseModel
 
 class CharmRequest(BaseModel):
@@ -111,32 +268,149 @@ class CharmRequest(BaseModel):
     analysis_id: int
 
 @app.post("/generate-charm/",
-          summary="행운의 부적 생성",
-          description="관상 분석 결과로 생성된 프롬프트를 사용하여 행운의 부적 이미지를 생성합니다.")
-async def generate_charm_api(request: CharmRequest, db: Session = Depends(database.get_db)):
+          status_code=202,
+          summary="행운의 부적 생성 요청",
+          description="관상 분석 결과로 생성된 프롬프트로 부적 이미지 생성 작업을 등록하고 작업 ID를 즉시 반환합니다. 결과는 `/generate-charm/{job_id}`로 조회합니다.")
+async def generate_charm_api(request: CharmRequest, db: AsyncSession = Depends(database.get_async_db)):
+    if await db.get(models.AnalysisResult, request.analysis_id) is None:
+        raise HTTPException(status_code=404, detail="분석 기록을 찾을 수 없습니다.")
+
     try:
-        lucky_charm_image_url = generate_lucky_charm_image(request.prompt)
-        
-        # DB에 부적 이미지 URL 업데이트
-        db_result = db.query(models.AnalysisResult).filter(models.AnalysisResult.id == request.analysis_id).first()
-        if db_result:
-            db_result.lucky_charm_image_url = lucky_charm_image_url
-            db.commit()
+        job = await charm_jobs.submit(request.prompt, request.analysis_id)
+    except CharmQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
-        return JSONResponse(content={
-            "success": True,
-            "lucky_charm_image_url": lucky_charm_image_url
-        })
-    except Exception as e:
-        print(f"행운의 부적 이미지 생성 실패: {e}")
-        raise HTTPException(status_code=500, detail="행운의 부적 이미지 생성에 실패했습니다.")
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/generate-charm/{job.job_id}"
+    })
+
+@app.get("/charm-cache/",
+         summary="부적 이미지 캐시 상태 조회",
+         description="프롬프트별로 저장된 부적 이미지 수와 디렉토리 사용량을 조회합니다.")
+def get_charm_cache_api():
+    return {**charm_store.stats(), "jobs": charm_jobs.stats()}
+
+@app.get("/generate-charm/{job_id}",
+         summary="행운의 부적 생성 상태 조회",
+         description="부적 생성 작업의 상태를 조회합니다. `wait`(초)를 지정하면 작업이 끝날 때까지 최대 그 시간만큼 기다렸다가 응답합니다.")
+async def get_charm_job_api(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    job = charm_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="부적 생성 작업을 찾을 수 없습니다.")
+    job = await charm_jobs.wait(job, wait)
+    return JSONResponse(content={"success": job.status != FAILED, **job.to_dict()})
 
 @app.get("/analysis-history/",
          summary="관상 분석 기록 조회",
          description="지금까지 수행된 관상 분석 기록을 최신순으로 조회합니다.")
-def get_analysis_history(db: Session = Depends(database.get_db), skip: int = 0, limit: int = 10):
-    history = db.query(models.AnalysisResult).order_by(models.AnalysisResult.created_at.desc()).offset(skip).limit(limit).all()
-    return history
+async def get_analysis_history(db: AsyncSession = Depends(database.get_async_db), skip: int = 0, limit: int = 10):
+    result = await db.execute(
+        select(models.AnalysisResult)
+        # 재분석용 바이너리 컬럼은 JSON 응답에서 제외
+        .options(defer(models.AnalysisResult.landmarks), defer(models.AnalysisResult.metrics))
+        .order_by(models.AnalysisResult.created_at.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+@app.get("/analyses/",
+         summary="관상 분석 기록 조회 (커서 페이지네이션)",
+         description="분석 기록을 최신순으로 조회합니다. 응답의 `next_cursor`를 `cursor`로 넘기면 다음 페이지를 조회합니다. "
+                     "리포트 본문은 `include_report=true`일 때만 포함됩니다.")
+async def list_analyses(
+    db: AsyncSession = Depends(database.get_async_db),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_report: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    filename: Optional[str] = Query(None, max_length=255),
+):
+    try:
+        page = await query_history_page(
+            db, limit=limit, cursor=cursor, include_report=include_report,
+            date_from=date_from, date_to=date_to, filename=filename,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**page, "limit": limit}
+
+@app.get("/thumbnails/{key}/{size}",
+         summary="업로드 이미지 썸네일 조회",
+         description=f"업로드 이미지의 썸네일을 `Accept` 헤더에 따라 AVIF 또는 WebP로 반환합니다. 크기: {', '.join(map(str, thumbnails.THUMBNAIL_SIZES))}")
+async def get_thumbnail_api(key: str, size: int, request: Request):
+    if not thumbnails.is_valid_key(key) or size not in thumbnails.THUMBNAIL_SIZES:
+        raise HTTPException(status_code=404, detail="썸네일을 찾을 수 없습니다.")
+
+    headers = {"Cache-Control": thumbnails.CACHE_CONTROL, "Vary": "Accept"}
+    negotiated = thumbnails.negotiate_format(request.headers.get("accept", ""))
+    if negotiated is None:
+        # AVIF/WebP를 받지 못하는 클라이언트에는 원본을 반환
+        original = thumbnails.find_original(key)
+        if original is None:
+            raise HTTPException(status_code=404, detail="썸네일을 찾을 수 없습니다.")
+        return FileResponse(original, headers=headers)
+
+    extension, media_type = negotiated
+    path = await thumbnails.resolve_thumbnail(key, size, extension)
+    if path is None:
+        raise HTTPException(status_code=404, detail="썸네일을 찾을 수 없습니다.")
+
+    headers["ETag"] = thumbnails.make_etag(path)
+    if thumbnails.etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+@app.get("/pipeline-metrics/",
+         summary="분석 파이프라인 지표 조회",
+         description="단계별 지연 시간과 대기열 상태를 조회합니다.")
+def get_pipeline_metrics_api():
+    return {**get_pipeline_metrics(), "db_writes": database.write_batcher.stats()}
+
+@app.get("/metrics",
+         summary="Prometheus 지표",
+         description="라우트별 요청 수/지연 히스토그램, 파이프라인 단계(FaceMesh 랜드마크, 기하학, 규칙, 리포트, AI 호출) 소요 시간, 캐시/대기열 통계를 Prometheus 형식으로 반환합니다.")
+def get_metrics_api():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/rules/",
+         summary="관상 규칙 상태 조회",
+         description="현재 적용 중인 규칙 버전과 규칙별 발화 횟수를 조회합니다.")
+def get_rules_api():
+    return rule_engine.stats()
+
+@app.post("/rules/reload",
+          summary="관상 규칙 재로드",
+          description="규칙 파일을 즉시 다시 로드합니다. 파일 변경은 요청 시 자동으로도 감지됩니다. (X-Profile-Token 필요)",
+          dependencies=[Depends(require_admin_token)])
+def reload_rules_api():
+    try:
+        ruleset = rule_engine.reload()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"규칙 파일을 로드할 수 없습니다: {e}")
+    return {"success": True, "version": ruleset.version, "rules": len(ruleset.case_keys)}
+
+@app.post("/rules/rescore",
+          summary="분석 기록 재채점",
+          description="저장된 랜드마크로 모든 분석 기록의 지표와 해석 키를 현재 규칙으로 다시 계산합니다. dry_run이면 변경 건수만 집계합니다. (X-Profile-Token 필요)",
+          dependencies=[Depends(require_admin_token)])
+async def rescore_history_api(dry_run: bool = False):
+    return await asyncio.to_thread(rescore_history, dry_run=dry_run)
+
+@app.get("/report-cache/",
+         summary="리포트 캐시 상태 조회",
+         description="해석 키 조합별 리포트 캐시의 적중률과 저장 항목 수를 조회합니다.")
+def get_report_cache_api():
+    return report_cache.stats()
+
+@app.post("/report-cache/prewarm",
+          summary="리포트 캐시 사전 준비",
+          description="분석 기록에서 가장 자주 나온 해석 키 조합의 리포트를 미리 생성합니다. (LLM 호출 비용이 발생하므로 X-Profile-Token 필요)",
+          dependencies=[Depends(require_admin_token)])
+async def prewarm_report_cache_api(limit: int = 20):
+    return await prewarm_report_cache(limit)
 
 @app.get("/", include_in_schema=False)
 async def read_root():
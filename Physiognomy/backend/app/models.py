@@ -1,5 +1,4 @@
-
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, LargeBinary
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -11,4 +10,41 @@ class AnalysisResult(Base):
     image_path = Column(String)
     report = Column(Text)
     lucky_charm_image_url = Column(String, nullable=True)
+    # 정렬된 해석 키를 쉼표로 연결한 문자열 (리포트 캐시 사전 준비에 사용)
+    interpretation_keys = Column(Text, nullable=True)
+    # 재분석(re-score)용 원시 데이터: 정규화 랜드마크 (478x3 float32), 이미지 크기, 기하학 지표 (float32)
+    landmarks = Column(LargeBinary, nullable=True)
+    image_height = Column(Integer, nullable=True)
+    image_width = Column(Integer, nullable=True)
+    metrics = Column(LargeBinary, nullable=True)
+    metrics_version = Column(String(16), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # 최신순 키셋 페이지네이션 (created_at DESC, id DESC)용 복합 인덱스
+        Index("ix_analysis_results_created_at_id", "created_at", "id"),
+    )
+
+class ReportCacheEntry(Base):
+    __tablename__ = "report_cache"
+
+    cache_key = Column(String(64), primary_key=True)
+    template_version = Column(String, nullable=False)
+    interpretation_keys = Column(Text, nullable=False)
+    report = Column(Text, nullable=False)
+    dalle_prompt = Column(Text, nullable=False)
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, index=True)
+    last_accessed_at = Column(DateTime, nullable=False, index=True)
+
+class CharmImage(Base):
+    __tablename__ = "charm_images"
+
+    # 정규화된 프롬프트의 SHA-256 (이미지 파일명과 동일)
+    prompt_hash = Column(String(64), primary_key=True)
+    prompt = Column(Text, nullable=False)
+    filename = Column(String, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    last_accessed_at = Column(DateTime, nullable=False, index=True)
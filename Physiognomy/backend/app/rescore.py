@@ -0,0 +1,37 @@
+# rescore.py
+"""
+저장된 랜드마크로 분석 기록 전체를 다시 채점하는 오프라인 도구입니다.
+규칙 파일이나 기하학 지표 계산이 바뀐 뒤 MediaPipe를 다시 실행하지 않고 해석 키를 갱신합니다.
+
+실행 (Physiognomy/backend 에서):
+    python -m app.rescore --dry-run     # 바뀔 건수만 확인
+    python -m app.rescore
+"""
+
+import argparse
+
+from . import models
+from .database import engine, upgrade_schema
+from .services.rescoring import RESCORE_BATCH_SIZE, rescore_history
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="관상 분석 기록 재채점")
+    parser.add_argument("--dry-run", action="store_true", help="DB를 갱신하지 않고 변경 건수만 집계")
+    parser.add_argument("--batch-size", type=int, default=RESCORE_BATCH_SIZE, help="한 번에 읽어 채점할 행 수")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    models.Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    stats = rescore_history(batch_size=args.batch_size, dry_run=args.dry_run)
+    print(
+        f"완료: {stats['elapsed_seconds']}초, 처리 {stats['scanned']}건, 해석 키 변경 {stats['keys_changed']}건, "
+        f"갱신 {stats['rows_updated']}건, 랜드마크 없음 {stats['missing_landmarks']}건 (규칙 버전 {stats['rules_version']})"
+    )
+
+
+if __name__ == "__main__":
+    main()
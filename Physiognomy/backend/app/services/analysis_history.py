@@ -0,0 +1,114 @@
+# analysis_history.py
+
+import base64
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import String, and_, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from .thumbnails import thumbnail_url
+
+MAX_PAGE_SIZE = 100
+
+# 목록 조회 시 기본으로 반환하는 컬럼 (큰 report 컬럼은 요청 시에만 포함)
+SUMMARY_COLUMNS = (
+    models.AnalysisResult.id,
+    models.AnalysisResult.original_filename,
+    models.AnalysisResult.image_path,
+    models.AnalysisResult.lucky_charm_image_url,
+    models.AnalysisResult.interpretation_keys,
+    models.AnalysisResult.created_at,
+)
+
+
+class InvalidCursorError(ValueError):
+    """페이지 커서를 해석할 수 없을 때 발생합니다."""
+
+
+def encode_cursor(created_at: datetime, result_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{result_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, result_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(result_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursorError("잘못된 페이지 커서입니다.") from e
+
+
+def _bind_datetime(dialect_name: str, value: datetime):
+    """
+    SQLite는 DateTime을 문자열로 비교하는데, server_default(CURRENT_TIMESTAMP)로 저장된 값에는
+    마이크로초가 없어 SQLAlchemy 기본 바인딩 형식과 일치하지 않습니다. 저장 형식에 맞춰 바인딩합니다.
+    """
+    if dialect_name != "sqlite":
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    text = value.strftime("%Y-%m-%d %H:%M:%S")
+    if value.microsecond:
+        text += f".{value.microsecond:06d}"
+    return literal(text, String)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def query_history_page(
+    db: AsyncSession,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_report: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    filename: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    (created_at, id) 기준 키셋 페이지네이션으로 분석 기록을 최신순 조회합니다.
+    OFFSET과 달리 페이지가 깊어져도 인덱스 범위 탐색만 수행합니다.
+
+    Returns:
+        dict: {"items": [...], "next_cursor": 다음 페이지 커서 또는 None}
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    table = models.AnalysisResult
+    columns = SUMMARY_COLUMNS + ((table.report,) if include_report else ())
+
+    dialect_name = db.bind.dialect.name
+
+    query = select(*columns).where(table.created_at.isnot(None))
+    if date_from is not None:
+        query = query.where(table.created_at >= _bind_datetime(dialect_name, date_from))
+    if date_to is not None:
+        query = query.where(table.created_at < _bind_datetime(dialect_name, date_to))
+    if filename:
+        query = query.where(table.original_filename.ilike(f"%{_escape_like(filename)}%", escape="\\"))
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        cursor_created_at = _bind_datetime(dialect_name, cursor_created_at)
+        query = query.where(or_(
+            table.created_at < cursor_created_at,
+            and_(table.created_at == cursor_created_at, table.id < cursor_id),
+        ))
+
+    # 다음 페이지 존재 여부 확인을 위해 한 건 더 조회
+    result = await db.execute(query.order_by(table.created_at.desc(), table.id.desc()).limit(limit + 1))
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items: List[Dict[str, Any]] = []
+    for row in rows:
+        item = dict(row._mapping)
+        item["created_at"] = item["created_at"].isoformat()
+        item["thumbnail_url"] = thumbnail_url(item["image_path"])
+        items.append(item)
+
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return {"items": items, "next_cursor": next_cursor}
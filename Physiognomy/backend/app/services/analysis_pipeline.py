@@ -0,0 +1,228 @@
+# analysis_pipeline.py
+
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from msp_common.metrics import observe_stage
+
+from .face_landmarker import get_face_landmarks
+from .geometry_calculator import calculate_geometric_metrics, landmarks_to_array
+from .rule_engine import analyze_gwansang_rules
+from .report_generator import generate_report_async
+
+# 프로세스 풀 및 수용 제어(admission control) 설정
+POOL_WORKERS = int(os.getenv("ANALYSIS_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+MAX_IN_FLIGHT = int(os.getenv("ANALYSIS_MAX_IN_FLIGHT", str(POOL_WORKERS * 2)))
+MAX_QUEUED = int(os.getenv("ANALYSIS_MAX_QUEUED", str(POOL_WORKERS * 4)))
+RETRY_AFTER_SECONDS = int(os.getenv("ANALYSIS_RETRY_AFTER", "5"))
+
+# 단계별 지연 시간 통계를 위해 보관하는 최근 샘플 수
+_LATENCY_WINDOW = 512
+
+
+class PipelineResult(NamedTuple):
+    report: str
+    charm_prompt: str
+    interpretation_keys: List[str]
+    # 재분석용 원시 데이터 (정규화 랜드마크 (478, 3), (높이, 너비), 기하학 지표)
+    landmarks: Optional[np.ndarray] = None
+    image_size: Optional[Tuple[int, int]] = None
+    metrics: Optional[Dict[str, float]] = None
+
+
+class PipelineBusyError(Exception):
+    """대기열이 가득 차서 새로운 분석 요청을 받을 수 없을 때 발생합니다."""
+
+    def __init__(self, retry_after: int = RETRY_AFTER_SECONDS):
+        super().__init__("분석 요청이 많아 잠시 후 다시 시도해주세요.")
+        self.retry_after = retry_after
+
+
+class StageMetrics:
+    """파이프라인 단계별 지연 시간(초)을 기록하고 요약 통계를 제공합니다. (/metrics 히스토그램에도 함께 기록)"""
+
+    def __init__(self, window: int = _LATENCY_WINDOW):
+        self._window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        if stage not in self._samples:
+            self._samples[stage] = deque(maxlen=self._window)
+            self._counts[stage] = 0
+        self._samples[stage].append(seconds)
+        self._counts[stage] += 1
+        observe_stage(stage, seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            summary[stage] = {
+                "count": self._counts[stage],
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+        return summary
+
+
+class AdmissionController:
+    """
+    프로세스 풀에서 동시에 처리 중인 분석 수를 제한하고, 대기열 한도를 넘는 요청은 즉시 거절합니다.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # 이벤트 루프가 실행된 뒤에 세마포어를 생성합니다.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    def admit(self, slots: int = 1) -> None:
+        """
+        slots개의 작업을 더 받으면 대기열 한도를 넘는지 확인하고, 넘으면 즉시 거절합니다.
+        전체 한도(max_in_flight + max_queued)보다 큰 묶음은 한도만큼만 검사합니다 (유휴 상태에서는 받아들임).
+        """
+        slots = min(slots, self.max_in_flight + self.max_queued)
+        free = max(0, self.max_in_flight - self.in_flight)
+        if self.waiting + max(0, slots - free) > self.max_queued:
+            self.rejected += 1
+            raise PipelineBusyError()
+
+    async def _acquire(self) -> None:
+        self.waiting += 1
+        try:
+            await self._get_semaphore().acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._get_semaphore().release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """대기열 한도 검사 없이 슬롯 하나를 차지합니다 (admit으로 묶음 전체를 미리 검사한 작업용)."""
+        await self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def __aenter__(self):
+        self.admit()
+        await self._acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._release()
+        return False
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+        }
+
+
+stage_metrics = StageMetrics()
+admission = AdmissionController(MAX_IN_FLIGHT, MAX_QUEUED)
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=POOL_WORKERS)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def extract_metrics(image_path: str) -> Tuple[Optional[Dict[str, float]], Dict[str, float], Optional[np.ndarray], Optional[Tuple[int, int]]]:
+    """
+    워커 프로세스에서 실행되는 CPU 집약 단계(랜드마크 추출, 기하학 계산)입니다.
+
+    Returns:
+        tuple: (기하학적 특징 딕셔너리 또는 None, 단계별 소요 시간, 랜드마크 배열, (높이, 너비))
+    """
+    timings = {}
+    started = time.perf_counter()
+    landmarks, height, width = get_face_landmarks(image_path)
+    timings["landmarks"] = time.perf_counter() - started
+    if not landmarks:
+        return None, timings, None, None
+
+    started = time.perf_counter()
+    landmark_array = landmarks_to_array(landmarks)
+    geometric_metrics = calculate_geometric_metrics(landmark_array, height, width)
+    timings["geometry"] = time.perf_counter() - started
+    return geometric_metrics, timings, landmark_array, (height, width)
+
+
+async def run_analysis_pipeline_async(image_path: str) -> Optional[PipelineResult]:
+    """
+    이미지 경로를 받아 전체 관상 분석 파이프라인을 실행합니다.
+    랜드마크/기하학 단계는 프로세스 풀에서(수용 슬롯 사용), 리포트 생성은 슬롯을 반납한 뒤 비동기 LLM 호출로 수행합니다.
+
+    Raises:
+        PipelineBusyError: 대기열이 가득 찬 경우.
+    """
+    pipeline_started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+
+    # 수용 슬롯은 프로세스 풀 단계에만 사용 (LLM 응답을 기다리는 동안 풀 작업을 막지 않음)
+    async with admission:
+        started = time.perf_counter()
+        geometric_metrics, timings, landmark_array, image_size = await loop.run_in_executor(get_executor(), extract_metrics, image_path)
+    # 풀 대기 시간 = 전체 경과 시간 - 워커 내 실제 처리 시간
+    stage_metrics.record("pool_wait", max(0.0, time.perf_counter() - started - sum(timings.values())))
+    for stage, seconds in timings.items():
+        stage_metrics.record(stage, seconds)
+    if not geometric_metrics:
+        return None
+
+    started = time.perf_counter()
+    gwansang_keys = analyze_gwansang_rules(geometric_metrics)
+    stage_metrics.record("rules", time.perf_counter() - started)
+
+    started = time.perf_counter()
+    final_report, dalle_prompt = await generate_report_async(gwansang_keys)
+    stage_metrics.record("report", time.perf_counter() - started)
+
+    stage_metrics.record("total", time.perf_counter() - pipeline_started)
+    return PipelineResult(final_report, dalle_prompt, gwansang_keys, landmark_array, image_size, geometric_metrics)
+
+
+def get_pipeline_metrics() -> Dict[str, Any]:
+    return {
+        "stages": stage_metrics.snapshot(),
+        "admission": admission.snapshot(),
+        "pool_workers": POOL_WORKERS,
+    }
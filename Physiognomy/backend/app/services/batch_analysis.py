@@ -0,0 +1,241 @@
+# batch_analysis.py
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .. import models
+from .analysis_pipeline import AdmissionController, get_executor, stage_metrics
+from .face_landmarker import get_face_landmarks_batch
+from .geometry_calculator import METRIC_NAMES, calculate_geometric_metrics_batch, metrics_to_dicts
+from .landmark_store import landmark_columns
+from .report_cache import canonical_keys
+from .report_generator import generate_report_async
+from .rule_engine import analyze_gwansang_rules_batch
+
+# 배치 분석 설정
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+# /analyze/batch 요청 본문 전체 크기 상한 (파일당 상한 × 최대 파일 수와 별도로 제한)
+BATCH_MAX_TOTAL_BYTES = int(os.getenv("BATCH_MAX_TOTAL_BYTES", str(100 * 1024 * 1024)))
+# 워커 프로세스 하나에 넘기는 이미지 수 (FaceMesh 초기화를 묶음당 한 번만 수행)
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "8"))
+# 리포트 생성 시 동시에 보내는 LLM 요청 수
+BATCH_REPORT_CONCURRENCY = int(os.getenv("BATCH_REPORT_CONCURRENCY", "4"))
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+@dataclass
+class BatchItemResult:
+    image_path: str
+    face_detected: bool = False
+    interpretation_keys: List[str] = field(default_factory=list)
+    metrics: Dict[str, float] = field(default_factory=dict)
+    report: Optional[str] = None
+    charm_prompt: Optional[str] = None
+    error: Optional[str] = None
+    # 재분석용 원시 데이터 (결과 파일/응답에는 포함하지 않음)
+    landmarks: Optional[np.ndarray] = field(default=None, repr=False)
+    image_size: Optional[Tuple[int, int]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name != "landmarks"}
+
+
+def collect_image_paths(inputs: Sequence[str]) -> List[str]:
+    """파일 경로와 디렉토리(하위 포함)를 받아 분석할 이미지 경로 목록을 만듭니다."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, filenames in os.walk(item):
+                paths.extend(
+                    os.path.join(root, filename) for filename in sorted(filenames)
+                    if filename.lower().endswith(IMAGE_EXTENSIONS)
+                )
+        elif os.path.isfile(item):
+            paths.append(item)
+        else:
+            print(f"경고: 파일을 찾을 수 없습니다. 경로: {item}")
+    return paths
+
+
+async def extract_landmarks_many(image_paths: Sequence[str], chunk_size: int = BATCH_CHUNK_SIZE,
+                                 admission: Optional[AdmissionController] = None) -> List[tuple]:
+    """
+    이미지들을 묶음으로 나누어 프로세스 풀에서 랜드마크를 추출합니다. 결과 순서는 입력과 같습니다.
+    admission이 주어지면 묶음 수만큼 대기열 여유를 먼저 확인하고, 묶음마다 슬롯을 하나씩 차지합니다.
+
+    Raises:
+        PipelineBusyError: admission 대기열이 가득 찬 경우.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = [list(image_paths[i:i + chunk_size]) for i in range(0, len(image_paths), chunk_size)]
+
+    async def run(chunk: List[str]) -> List[tuple]:
+        if admission is None:
+            return await loop.run_in_executor(get_executor(), get_face_landmarks_batch, chunk)
+        async with admission.slot():
+            return await loop.run_in_executor(get_executor(), get_face_landmarks_batch, chunk)
+
+    if admission is not None:
+        admission.admit(len(chunks))
+    chunk_results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    return [item for chunk in chunk_results for item in chunk]
+
+
+def score_landmarks(results: List[BatchItemResult], extracted: List[tuple]) -> None:
+    """얼굴이 감지된 이미지들의 기하학 지표와 규칙 키를 한 번의 행렬 연산으로 계산해 결과에 채웁니다."""
+    detected = [i for i, (landmarks, _, _) in enumerate(extracted) if landmarks is not None]
+    for i, (landmarks, height, _) in enumerate(extracted):
+        if landmarks is None:
+            results[i].error = "얼굴을 감지하지 못했습니다." if height else "이미지를 읽을 수 없습니다."
+    if not detected:
+        return
+
+    landmark_tensor = np.stack([extracted[i][0] for i in detected])
+    sizes = np.array([(extracted[i][1], extracted[i][2]) for i in detected])
+    metric_matrix = calculate_geometric_metrics_batch(landmark_tensor, sizes)
+    key_lists = analyze_gwansang_rules_batch(metric_matrix, METRIC_NAMES)
+
+    for i, metrics, keys in zip(detected, metrics_to_dicts(metric_matrix), key_lists):
+        results[i].face_detected = True
+        results[i].metrics = metrics
+        results[i].interpretation_keys = keys
+        results[i].landmarks = extracted[i][0]
+        results[i].image_size = (extracted[i][1], extracted[i][2])
+
+
+async def attach_reports(results: List[BatchItemResult], concurrency: int = BATCH_REPORT_CONCURRENCY) -> None:
+    """해석 키 조합별로 리포트를 한 번씩만 생성해 같은 조합의 결과에 나눠 씁니다."""
+    by_key_set: Dict[str, List[BatchItemResult]] = {}
+    for result in results:
+        if result.face_detected:
+            by_key_set.setdefault(canonical_keys(result.interpretation_keys), []).append(result)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate(group: List[BatchItemResult]) -> None:
+        async with semaphore:
+            report, charm_prompt = await generate_report_async(group[0].interpretation_keys)
+        for result in group:
+            result.report = report
+            result.charm_prompt = charm_prompt
+
+    await asyncio.gather(*(generate(group) for group in by_key_set.values()))
+
+
+async def analyze_images_batch(image_paths: Sequence[str], include_report: bool = False,
+                               chunk_size: int = BATCH_CHUNK_SIZE,
+                               admission: Optional[AdmissionController] = None) -> List[BatchItemResult]:
+    """
+    여러 이미지를 한 번에 분석합니다. 랜드마크 추출은 프로세스 풀에서 묶음 단위로,
+    기하학 지표와 규칙 평가는 전체 배치에 대한 벡터 연산으로 수행하며, 리포트 생성은 선택입니다.
+    """
+    loop = asyncio.get_running_loop()
+    results = [BatchItemResult(image_path=path) for path in image_paths]
+    if not results:
+        return results
+
+    started = loop.time()
+    extracted = await extract_landmarks_many(image_paths, chunk_size, admission)
+    stage_metrics.record("batch_landmarks", loop.time() - started)
+
+    started = loop.time()
+    score_landmarks(results, extracted)
+    stage_metrics.record("batch_scoring", loop.time() - started)
+
+    if include_report:
+        started = loop.time()
+        await attach_reports(results)
+        stage_metrics.record("batch_report", loop.time() - started)
+    return results
+
+
+def _original_filename(image_path: str) -> str:
+    # 업로드 파일명은 `<uuid>_<원본 파일명>` 형식
+    name = os.path.basename(image_path)
+    prefix, _, rest = name.partition("_")
+    return rest if rest and len(prefix) == 36 else name
+
+
+def insert_results(db, results: Sequence[BatchItemResult], original_filenames: Optional[Sequence[str]] = None) -> List[Optional[int]]:
+    """얼굴이 감지된 결과를 analysis_results에 한 번에 추가하고 행 ID 목록을 반환합니다 (미감지는 None)."""
+    rows: List[Optional[models.AnalysisResult]] = []
+    for i, result in enumerate(results):
+        if not result.face_detected:
+            rows.append(None)
+            continue
+        rows.append(models.AnalysisResult(
+            original_filename=original_filenames[i] if original_filenames else _original_filename(result.image_path),
+            image_path=os.path.basename(result.image_path),
+            report=result.report,
+            lucky_charm_image_url=None,
+            interpretation_keys=canonical_keys(result.interpretation_keys),
+            **landmark_columns(result.landmarks, result.image_size, result.metrics),
+        ))
+    db.add_all([row for row in rows if row is not None])
+    db.flush()
+    return [row.id if row is not None else None for row in rows]
+
+
+def upsert_results(db, results: Sequence[BatchItemResult]) -> Dict[str, int]:
+    """
+    같은 image_path의 기존 기록이 있으면 해석 키(와 리포트)를 갱신하고, 없으면 새로 추가합니다.
+    저장된 업로드를 규칙 변경 후 다시 분석할 때 사용합니다.
+    """
+    detected = [result for result in results if result.face_detected]
+    filenames = [os.path.basename(result.image_path) for result in detected]
+    existing: Dict[str, models.AnalysisResult] = {}
+    for start in range(0, len(filenames), 500):
+        for row in db.query(models.AnalysisResult).filter(models.AnalysisResult.image_path.in_(filenames[start:start + 500])):
+            existing.setdefault(row.image_path, row)
+
+    updated = 0
+    new_results = []
+    for filename, result in zip(filenames, detected):
+        row = existing.get(filename)
+        if row is None:
+            new_results.append(result)
+            continue
+        row.interpretation_keys = canonical_keys(result.interpretation_keys)
+        for column, value in landmark_columns(result.landmarks, result.image_size, result.metrics).items():
+            setattr(row, column, value)
+        if result.report is not None:
+            row.report = result.report
+        updated += 1
+    inserted = len([row_id for row_id in insert_results(db, new_results) if row_id is not None])
+    return {"updated": updated, "inserted": inserted}
+
+
+def write_jsonl(results: Sequence[BatchItemResult], output_path: str) -> None:
+    with open(output_path, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+
+
+def write_parquet(results: Sequence[BatchItemResult], output_path: str) -> None:
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise RuntimeError("Parquet 출력에는 pandas와 pyarrow가 필요합니다: pip install pandas pyarrow") from e
+
+    records = []
+    for result in results:
+        record = result.to_dict()
+        metrics = record.pop("metrics")
+        record["interpretation_keys"] = canonical_keys(result.interpretation_keys)
+        # 지표는 열로 펼쳐서 저장 (분석 도구에서 바로 필터링할 수 있도록)
+        record.update({name: metrics.get(name) for name in METRIC_NAMES})
+        records.append(record)
+    pd.DataFrame.from_records(records).to_parquet(output_path, index=False)
+
+
+def write_results_file(results: Sequence[BatchItemResult], output_path: str) -> None:
+    if output_path.endswith(".parquet"):
+        write_parquet(results, output_path)
+    else:
+        write_jsonl(results, output_path)
@@ -0,0 +1,182 @@
+# charm_jobs.py
+
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .. import models
+from ..database import write_batcher
+from . import charm_store
+from .lucky_charm_generator import generate_lucky_charm_image_async
+
+# 작업 큐 설정
+CHARM_WORKERS = int(os.getenv("CHARM_WORKERS", "2"))
+CHARM_MAX_QUEUED = int(os.getenv("CHARM_MAX_QUEUED", "20"))
+# 완료된 작업 정보를 메모리에 보관하는 시간(초)
+CHARM_JOB_TTL_SECONDS = int(os.getenv("CHARM_JOB_TTL_SECONDS", "3600"))
+CHARM_RETRY_AFTER_SECONDS = int(os.getenv("CHARM_RETRY_AFTER", "10"))
+
+# 작업 상태
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class CharmQueueFullError(Exception):
+    """부적 생성 대기열이 가득 찼을 때 발생합니다."""
+
+    def __init__(self, retry_after: int = CHARM_RETRY_AFTER_SECONDS):
+        super().__init__("부적 생성 요청이 많아 잠시 후 다시 시도해주세요.")
+        self.retry_after = retry_after
+
+
+@dataclass
+class CharmJob:
+    prompt: str
+    analysis_id: Optional[int]
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    lucky_charm_image_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "analysis_id": self.analysis_id,
+            "lucky_charm_image_url": self.lucky_charm_image_url,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+async def _save_charm_url(analysis_id: int, image_url: str) -> None:
+    def update(db) -> None:
+        db.query(models.AnalysisResult).filter(models.AnalysisResult.id == analysis_id).update(
+            {models.AnalysisResult.lucky_charm_image_url: image_url}, synchronize_session=False
+        )
+
+    await write_batcher.run(update)
+
+
+class CharmJobQueue:
+    """
+    부적 이미지 생성 작업 큐입니다. 요청은 작업 ID를 즉시 받고,
+    비동기 워커들이 이미지 생성/다운로드 후 결과를 AnalysisResult에 기록합니다.
+    """
+
+    def __init__(self, workers: int = CHARM_WORKERS, max_queued: int = CHARM_MAX_QUEUED,
+                 job_ttl_seconds: int = CHARM_JOB_TTL_SECONDS):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.job_ttl_seconds = job_ttl_seconds
+        self.jobs: Dict[str, CharmJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # 시작되지 못한 대기 작업도 실패로 마무리
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            job.status = FAILED
+            job.error = "서버 종료로 부적 생성 작업이 취소되었습니다."
+            job.finished_at = time.time()
+            job.done.set()
+        self._queue = None
+
+    async def submit(self, prompt: str, analysis_id: Optional[int]) -> CharmJob:
+        self.start()
+        self._prune()
+        job = CharmJob(prompt=prompt, analysis_id=analysis_id)
+
+        # 같은 프롬프트로 생성된 이미지가 있으면 대기열을 거치지 않고 즉시 완료
+        cached_url = await asyncio.to_thread(charm_store.lookup, prompt)
+        if cached_url:
+            if analysis_id is not None:
+                await _save_charm_url(analysis_id, cached_url)
+            job.lucky_charm_image_url = cached_url
+            job.status = SUCCEEDED
+            job.finished_at = time.time()
+            job.done.set()
+            self.jobs[job.job_id] = job
+            return job
+
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise CharmQueueFullError()
+        self.jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[CharmJob]:
+        return self.jobs.get(job_id)
+
+    async def wait(self, job: CharmJob, timeout: float) -> CharmJob:
+        """작업이 끝나거나 timeout(초)이 지날 때까지 기다립니다 (롱 폴링용)."""
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def _prune(self) -> None:
+        expire_before = time.time() - self.job_ttl_seconds
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished_at and job.finished_at < expire_before]:
+            del self.jobs[job_id]
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            try:
+                job.lucky_charm_image_url = await generate_lucky_charm_image_async(job.prompt)
+                if job.analysis_id is not None:
+                    await _save_charm_url(job.analysis_id, job.lucky_charm_image_url)
+                job.status = SUCCEEDED
+            except asyncio.CancelledError:
+                # 종료 중 취소된 작업이 RUNNING으로 남아 롱 폴링이 끝나지 않는 일이 없도록 실패로 마무리
+                job.status = FAILED
+                job.error = "서버 종료로 부적 생성 작업이 취소되었습니다."
+                raise
+            except Exception as e:
+                print(f"행운의 부적 이미지 생성 실패 (job={job.job_id}): {e}")
+                job.status = FAILED
+                job.error = "행운의 부적 이미지 생성에 실패했습니다."
+            finally:
+                if job.status in (SUCCEEDED, FAILED):
+                    job.finished_at = time.time()
+                    job.done.set()
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queued": self.max_queued,
+            "jobs": counts,
+        }
+
+
+charm_jobs = CharmJobQueue()
@@ -0,0 +1,107 @@
+# charm_store.py
+
+import hashlib
+import os
+import re
+import unicodedata
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func
+
+from .. import models
+from ..database import SessionLocal
+
+# 부적 이미지 저장 디렉토리와 URL 경로
+IMAGE_DIR = "app/static/amulets"
+IMAGE_URL_PREFIX = "/static/amulets"
+os.makedirs(IMAGE_DIR, exist_ok=True)
+
+# 부적 디렉토리 최대 용량 (바이트). 넘으면 가장 오래 사용되지 않은 이미지부터 삭제합니다.
+CHARM_CACHE_MAX_BYTES = int(os.getenv("CHARM_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+
+def normalize_prompt(prompt: str) -> str:
+    """유니코드 정규화, 공백 정리, 소문자 변환으로 사소한 차이가 있는 프롬프트를 같게 취급합니다."""
+    normalized = unicodedata.normalize("NFKC", prompt)
+    return re.sub(r"\s+", " ", normalized).strip().lower()
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+
+def image_path_for(key: str) -> str:
+    return os.path.join(IMAGE_DIR, f"{key}.png")
+
+
+def image_url_for(key: str) -> str:
+    return f"{IMAGE_URL_PREFIX}/{key}.png"
+
+
+def lookup(prompt: str) -> Optional[str]:
+    """같은 프롬프트로 생성된 이미지가 있으면 URL을 반환하고 마지막 사용 시각을 갱신합니다."""
+    key = prompt_hash(prompt)
+    with SessionLocal() as db:
+        entry = db.get(models.CharmImage, key)
+        if entry is None:
+            return None
+        if not os.path.exists(image_path_for(key)):
+            # 파일이 수동으로 삭제된 경우 인덱스도 정리
+            db.delete(entry)
+            db.commit()
+            return None
+        entry.hit_count += 1
+        entry.last_accessed_at = datetime.utcnow()
+        db.commit()
+    return image_url_for(key)
+
+
+def register(prompt: str) -> str:
+    """이미지 파일이 저장된 뒤 프롬프트→이미지 인덱스에 등록하고, 용량 한도를 넘으면 정리합니다."""
+    key = prompt_hash(prompt)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.merge(models.CharmImage(
+            prompt_hash=key,
+            prompt=normalize_prompt(prompt),
+            filename=os.path.basename(image_path_for(key)),
+            size_bytes=os.path.getsize(image_path_for(key)),
+            hit_count=0,
+            created_at=now,
+            last_accessed_at=now,
+        ))
+        db.commit()
+        evict(db, keep=key)
+    return image_url_for(key)
+
+
+def evict(db, keep: Optional[str] = None) -> int:
+    """디렉토리 용량이 한도를 넘으면 마지막 사용 시각이 오래된 이미지부터 삭제합니다."""
+    total = db.query(func.coalesce(func.sum(models.CharmImage.size_bytes), 0)).scalar()
+    removed = 0
+    if total <= CHARM_CACHE_MAX_BYTES:
+        return removed
+    for entry in db.query(models.CharmImage).order_by(models.CharmImage.last_accessed_at.asc()).all():
+        if total <= CHARM_CACHE_MAX_BYTES:
+            break
+        if entry.prompt_hash == keep:
+            continue
+        try:
+            os.remove(os.path.join(IMAGE_DIR, entry.filename))
+        except FileNotFoundError:
+            pass
+        total -= entry.size_bytes
+        db.delete(entry)
+        removed += 1
+    db.commit()
+    return removed
+
+
+def stats() -> Dict[str, object]:
+    with SessionLocal() as db:
+        count, total = db.query(
+            func.count(models.CharmImage.prompt_hash),
+            func.coalesce(func.sum(models.CharmImage.size_bytes), 0),
+        ).one()
+    return {"images": count, "total_bytes": int(total), "max_bytes": CHARM_CACHE_MAX_BYTES}
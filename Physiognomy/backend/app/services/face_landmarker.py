@@ -1,6 +1,7 @@
 import cv2
 import mediapipe as mp
 import numpy as np
+from typing import List, Optional, Tuple
 
 # MediaPipe 솔루션 초기화
 mp_face_mesh = mp.solutions.face_mesh
@@ -79,6 +80,40 @@ def get_face_landmarks(image_path: str, visualize: bool = False):
         print(f"랜드마크 추출 중 오류 발생: {e}")
         return None, None, None
 
+def get_face_landmarks_batch(image_paths: List[str]) -> List[Tuple[Optional[np.ndarray], Optional[int], Optional[int]]]:
+    """
+    여러 이미지를 FaceMesh 인스턴스 하나로 처리합니다 (모델 초기화 비용을 이미지마다 치르지 않음).
+
+    Returns:
+        list: 이미지별 (랜드마크 배열 (478, 3) 또는 None, 이미지 높이, 이미지 너비).
+    """
+    results = []
+    with mp_face_mesh.FaceMesh(
+        static_image_mode=True,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.7) as face_mesh:
+        for image_path in image_paths:
+            try:
+                image = cv2.imread(image_path)
+                if image is None:
+                    print(f"오류: 이미지를 로드할 수 없습니다. 경로: {image_path}")
+                    results.append((None, None, None))
+                    continue
+                image_height, image_width, _ = image.shape
+                detected = face_mesh.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+                if not detected.multi_face_landmarks:
+                    results.append((None, image_height, image_width))
+                    continue
+                landmarks = np.array(
+                    [(lm.x, lm.y, lm.z) for lm in detected.multi_face_landmarks[0].landmark], dtype=np.float64
+                )
+                results.append((landmarks, image_height, image_width))
+            except Exception as e:
+                print(f"랜드마크 추출 중 오류 발생 ({image_path}): {e}")
+                results.append((None, None, None))
+    return results
+
 # --- 테스트용 코드 ---
 if __name__ == '__main__':
     # 테스트할 이미지 경로를 지정하세요.
@@ -1,7 +1,7 @@
 # geometry_calculator.py
 
 import numpy as np
-from typing import List, Dict, Any
+from typing import Any, Dict, List, Sequence, Tuple, Union
 
 # MediaPipe 랜드마크 인덱스 (주요 포인트)
 # 이 인덱스들은 MediaPipe 공식 문서를 참조하여 정의되었습니다.
@@ -63,113 +63,196 @@ NASOLABIAL_LEFT_UPPER = 205
 NASOLABIAL_RIGHT_UPPER = 425
 
 
-def calculate_geometric_metrics(landmarks: List[Any], img_height: int, img_width: int) -> Dict[str, float]:
+NUM_LANDMARKS = 478
+
+# 좌표 축 (x, y는 픽셀 좌표, z는 MediaPipe 정규화 깊이값)
+X, Y, Z = 0, 1, 2
+
+# --- 선언적 특징 명세 (Metric Spec) ---
+# 1) 거리 항: 두 랜드마크 사이의 2D 픽셀 거리
+DISTANCE_TERMS: Dict[str, Tuple[int, int]] = {
+    'face_height': (FOREHEAD_TOP, JAW_BOTTOM),
+    'face_width': (JAW_LEFT, JAW_RIGHT),
+    'cheek_width': (CHEEK_LEFT, CHEEK_RIGHT),
+    'jaw_width': (CHIN_LEFT, CHIN_RIGHT),  # 입꼬리 아래 턱 너비
+    'left_eye_height': (LEFT_EYE_TOP, LEFT_EYE_BOTTOM),
+    'left_eye_width': (LEFT_EYE_RIGHT_CORNER, LEFT_EYE_LEFT_CORNER),
+    'inter_eye_distance': (RIGHT_EYE_LEFT_CORNER, LEFT_EYE_RIGHT_CORNER),
+    'left_eyebrow_length': (LEFT_EYEBROW_OUTER_END, LEFT_EYEBROW_INNER_END),
+    'nose_height': (NOSE_BRIDGE_BOTTOM, NOSE_BRIDGE_TOP),
+    'nose_width': (NOSE_RIGHT_WING, NOSE_LEFT_WING),
+    'lip_height': (LIP_LOWER_BOTTOM, LIP_UPPER_TOP),
+    'lip_width': (LIP_RIGHT_CORNER, LIP_LEFT_CORNER),
+    'upper_lip_thickness': (LIP_UPPER_TOP, UPPER_LIP_CENTER_BOTTOM),
+    'lower_lip_thickness': (LOWER_LIP_CENTER_TOP, LIP_LOWER_BOTTOM),
+    'philtrum_height': (PHILTRUM_TOP, PHILTRUM_BOTTOM),
+}
+
+# 2) 선형 항: (축, 랜드마크 인덱스, 가중치)의 가중합
+LINEAR_TERMS: Dict[str, Tuple[Tuple[int, int, float], ...]] = {
+    # 눈썹 중앙 높이 - 이마 상단 높이
+    'forehead_height': ((Y, LEFT_EYEBROW_INNER_END, 0.5), (Y, RIGHT_EYEBROW_INNER_END, 0.5), (Y, FOREHEAD_TOP, -1.0)),
+    # M자 이마 (헤어라인 굴곡): 이마 중앙 x - 좌우 이마 상단(104, 333) x 평균
+    'forehead_m_offset': ((X, FOREHEAD_TOP, 1.0), (X, 104, -0.5), (X, 333, -0.5)),
+    'left_eye_slant': ((Y, LEFT_EYE_LEFT_CORNER, 1.0), (Y, LEFT_EYE_RIGHT_CORNER, -1.0)),
+    'right_eye_slant': ((Y, RIGHT_EYE_RIGHT_CORNER, 1.0), (Y, RIGHT_EYE_LEFT_CORNER, -1.0)),
+    # 눈썹 위쪽(105)과 아래쪽(107)의 z값 차이
+    'eyebrow_z_delta': ((Z, LEFT_EYEBROW_CENTER_TOP, 1.0), (Z, 107, -1.0)),
+    'eyebrow_arch': ((Y, LEFT_EYEBROW_INNER_END, 0.5), (Y, LEFT_EYEBROW_OUTER_END, 0.5), (Y, LEFT_EYEBROW_CENTER_TOP, -1.0)),
+    'eyebrow_slant': ((Y, LEFT_EYEBROW_INNER_END, 1.0), (Y, LEFT_EYEBROW_OUTER_END, -1.0)),
+    'nose_tip_sharpness': ((Z, NOSE_BRIDGE_BOTTOM, 1.0), (Z, NOSE_TIP, -1.0)),  # 값이 클수록 뾰족
+    'nose_upturned_angle': ((Y, NOSE_TIP, 1.0), (Y, NOSE_BRIDGE_BOTTOM, -1.0)),
+    'cheekbone_prominence': ((Z, JAW_LEFT, 0.5), (Z, CHEEK_LEFT, -0.5), (Z, JAW_RIGHT, 0.5), (Z, CHEEK_RIGHT, -0.5)),
+    'mouth_corner_angle': ((Y, LIP_UPPER_TOP, 0.5), (Y, LIP_LOWER_BOTTOM, 0.5), (Y, LIP_LEFT_CORNER, -0.5), (Y, LIP_RIGHT_CORNER, -0.5)),
+    'chin_prominence': ((Z, FOREHEAD_TOP, 1.0), (Z, CHIN_CENTER, -1.0)),
+    # 법령의 깊이는 z값의 차이로 추정
+    'nasolabial_depth': ((Z, NASOLABIAL_LEFT_UPPER, 0.5), (Z, NASOLABIAL_RIGHT_UPPER, 0.5), (Z, NOSE_LEFT_WING, -1.0)),
+}
+
+# 절댓값을 취하는 선형 항
+ABSOLUTE_TERMS = {'eyebrow_z_delta'}
+
+# 3) 최종 특징: (특징명, 분자 항 목록, 분모 항 목록)
+# 분자/분모는 각 항의 곱이며, 분모가 0 이하이면 결과는 0입니다.
+METRIC_SPECS: Tuple[Tuple[str, Tuple[str, ...], Tuple[str, ...]], ...] = (
+    # --- 얼굴 전체 및 기본 비율 ---
+    ('face_height', ('face_height',), ()),
+    ('face_width', ('face_width',), ()),
+    ('face_aspect_ratio', ('face_height',), ('face_width',)),
+    # --- 얼굴형 (Face Shape) ---
+    ('cheek_to_face_width_ratio', ('cheek_width',), ('face_width',)),
+    ('jaw_to_cheek_width_ratio', ('jaw_width',), ('cheek_width',)),
+    # --- 이마 (Forehead) ---
+    ('forehead_height_ratio', ('forehead_height',), ('face_height',)),
+    ('forehead_m_shape_curve', ('forehead_m_offset',), ('face_width',)),
+    # --- 눈 (Eyes) ---
+    ('left_eye_aspect_ratio', ('left_eye_height',), ('left_eye_width',)),
+    ('eye_size_ratio', ('left_eye_height', 'left_eye_width'), ('face_height', 'face_width')),
+    ('left_eye_slant', ('left_eye_slant',), ()),
+    ('right_eye_slant', ('right_eye_slant',), ()),
+    ('eye_spacing_ratio', ('inter_eye_distance',), ('left_eye_width',)),
+    # --- 눈썹 (Eyebrows) ---
+    ('eyebrow_length_ratio', ('left_eyebrow_length',), ('left_eye_width',)),
+    ('eyebrow_thickness', ('eyebrow_z_delta',), ()),
+    ('eyebrow_arch', ('eyebrow_arch',), ()),
+    ('eyebrow_slant', ('eyebrow_slant',), ()),
+    # --- 코 (Nose) ---
+    ('nose_height_ratio', ('nose_height',), ('face_height',)),
+    ('nose_width_ratio', ('nose_width',), ('face_width',)),
+    ('nose_tip_sharpness', ('nose_tip_sharpness',), ()),
+    ('nose_upturned_angle', ('nose_upturned_angle',), ()),
+    # --- 광대뼈 (Cheekbones) ---
+    ('cheekbone_prominence', ('cheekbone_prominence',), ()),
+    # --- 입술 및 입 (Lips & Mouth) ---
+    ('lip_thickness_ratio', ('lip_height',), ('lip_width',)),
+    ('mouth_size_ratio', ('lip_width',), ('face_width',)),
+    ('mouth_corner_angle', ('mouth_corner_angle',), ()),
+    ('lip_upper_to_lower_ratio', ('upper_lip_thickness',), ('lower_lip_thickness',)),
+    # --- 턱 (Chin/Jaw) ---
+    ('jaw_width_ratio', ('jaw_width',), ('face_width',)),
+    ('chin_prominence', ('chin_prominence',), ()),
+    # --- 인중 (Philtrum) ---
+    ('philtrum_height_ratio', ('philtrum_height',), ('nose_height',)),
+    # --- 법령 (Nasolabial Folds) ---
+    ('nasolabial_depth', ('nasolabial_depth',), ()),
+)
+
+METRIC_NAMES: List[str] = [name for name, _, _ in METRIC_SPECS]
+
+
+def _compile_metric_spec():
     """
-    랜드마크 리스트를 받아 주요 기하학적 특징들을 계산합니다.
-    랜드마크 좌표는 정규화되어 있으므로, 실제 픽셀 좌표로 변환하여 비율을 계산합니다.
+    선언적 명세를 한 번의 배치 연산으로 평가할 수 있는 인덱스/가중치 배열로 변환합니다.
     """
-    if not landmarks or len(landmarks) < 478:
-        return {}
+    term_names = list(DISTANCE_TERMS) + list(LINEAR_TERMS)
+    term_index = {name: i for i, name in enumerate(term_names)}
 
-    lm_coords = np.array([[lm.x * img_width, lm.y * img_height] for lm in landmarks])
-    lm_coords_z = np.array([lm.z for lm in landmarks])
+    dist_pairs = np.array(list(DISTANCE_TERMS.values()), dtype=np.intp)
 
-    metrics = {}
+    linear_weights = np.zeros((len(LINEAR_TERMS), NUM_LANDMARKS, 3), dtype=np.float64)
+    for t, components in enumerate(LINEAR_TERMS.values()):
+        for axis, idx, weight in components:
+            linear_weights[t, idx, axis] += weight
+    absolute_mask = np.array([name in ABSOLUTE_TERMS for name in LINEAR_TERMS])
 
-    # --- 얼굴 전체 및 기본 비율 ---
-    face_height = np.linalg.norm(lm_coords[FOREHEAD_TOP] - lm_coords[JAW_BOTTOM])
-    face_width = np.linalg.norm(lm_coords[JAW_LEFT] - lm_coords[JAW_RIGHT])
-    metrics['face_height'] = face_height
-    metrics['face_width'] = face_width
-    metrics['face_aspect_ratio'] = face_height / face_width if face_width > 0 else 0
+    numerator_mask = np.zeros((len(METRIC_SPECS), len(term_names)), dtype=bool)
+    denominator_mask = np.zeros((len(METRIC_SPECS), len(term_names)), dtype=bool)
+    for m, (_, numerator, denominator) in enumerate(METRIC_SPECS):
+        for name in numerator:
+            numerator_mask[m, term_index[name]] = True
+        for name in denominator:
+            denominator_mask[m, term_index[name]] = True
 
-    # --- 얼굴형 (Face Shape) ---
-    # 광대뼈 너비
-    cheek_width = np.linalg.norm(lm_coords[CHEEK_LEFT] - lm_coords[CHEEK_RIGHT])
-    # 턱 너비 (입꼬리 아래)
-    jaw_width = np.linalg.norm(lm_coords[326] - lm_coords[97])
-    metrics['cheek_to_face_width_ratio'] = cheek_width / face_width
-    metrics['jaw_to_cheek_width_ratio'] = jaw_width / cheek_width if cheek_width > 0 else 0
+    return dist_pairs, linear_weights, absolute_mask, numerator_mask, denominator_mask
 
-    # --- 이마 (Forehead) ---
-    eyebrow_mid_y = (lm_coords[LEFT_EYEBROW_INNER_END][1] + lm_coords[RIGHT_EYEBROW_INNER_END][1]) / 2
-    forehead_height = eyebrow_mid_y - lm_coords[FOREHEAD_TOP][1]
-    metrics['forehead_height_ratio'] = forehead_height / face_height if face_height > 0 else 0
-    # M자 이마 (헤어라인 굴곡)
-    forehead_center_x = lm_coords[FOREHEAD_TOP][0]
-    forehead_left_x = lm_coords[104][0] # 왼쪽 이마 상단
-    forehead_right_x = lm_coords[333][0] # 오른쪽 이마 상단
-    metrics['forehead_m_shape_curve'] = (forehead_center_x - (forehead_left_x + forehead_right_x) / 2) / face_width
 
-    # --- 눈 (Eyes) ---
-    left_eye_height = np.linalg.norm(lm_coords[LEFT_EYE_TOP] - lm_coords[LEFT_EYE_BOTTOM])
-    left_eye_width = np.linalg.norm(lm_coords[LEFT_EYE_RIGHT_CORNER] - lm_coords[LEFT_EYE_LEFT_CORNER])
-    metrics['left_eye_aspect_ratio'] = left_eye_height / left_eye_width if left_eye_width > 0 else 0
-    metrics['eye_size_ratio'] = (left_eye_height * left_eye_width) / (face_height * face_width) if face_height * face_width > 0 else 0
-    # 눈꼬리 각도
-    metrics['left_eye_slant'] = lm_coords[LEFT_EYE_LEFT_CORNER][1] - lm_coords[LEFT_EYE_RIGHT_CORNER][1]
-    metrics['right_eye_slant'] = lm_coords[RIGHT_EYE_RIGHT_CORNER][1] - lm_coords[RIGHT_EYE_LEFT_CORNER][1]
-    # 눈 사이 거리
-    inter_eye_distance = np.linalg.norm(lm_coords[RIGHT_EYE_LEFT_CORNER] - lm_coords[LEFT_EYE_RIGHT_CORNER])
-    metrics['eye_spacing_ratio'] = inter_eye_distance / left_eye_width if left_eye_width > 0 else 0
+_DIST_PAIRS, _LINEAR_WEIGHTS, _ABSOLUTE_MASK, _NUMERATOR_MASK, _DENOMINATOR_MASK = _compile_metric_spec()
 
-    # --- 눈썹 (Eyebrows) ---
-    left_eyebrow_length = np.linalg.norm(lm_coords[LEFT_EYEBROW_OUTER_END] - lm_coords[LEFT_EYEBROW_INNER_END])
-    metrics['eyebrow_length_ratio'] = left_eyebrow_length / left_eye_width if left_eye_width > 0 else 0
-    # 눈썹 두께 (z값으로 추정)
-    metrics['eyebrow_thickness'] = abs(lm_coords_z[LEFT_EYEBROW_CENTER_TOP] - lm_coords_z[107]) # 눈썹 위쪽과 아래쪽 z값 차이
-    # 눈썹 모양 (직선/아치)
-    eyebrow_center_y = lm_coords[LEFT_EYEBROW_CENTER_TOP][1]
-    eyebrow_ends_y_avg = (lm_coords[LEFT_EYEBROW_INNER_END][1] + lm_coords[LEFT_EYEBROW_OUTER_END][1]) / 2
-    metrics['eyebrow_arch'] = eyebrow_ends_y_avg - eyebrow_center_y
-    # 눈썹 각도
-    metrics['eyebrow_slant'] = lm_coords[LEFT_EYEBROW_INNER_END][1] - lm_coords[LEFT_EYEBROW_OUTER_END][1]
 
-    # --- 코 (Nose) ---
-    nose_height = np.linalg.norm(lm_coords[NOSE_BRIDGE_BOTTOM] - lm_coords[NOSE_BRIDGE_TOP])
-    nose_width = np.linalg.norm(lm_coords[NOSE_RIGHT_WING] - lm_coords[NOSE_LEFT_WING])
-    metrics['nose_height_ratio'] = nose_height / face_height if face_height > 0 else 0
-    metrics['nose_width_ratio'] = nose_width / face_width if face_width > 0 else 0
-    # 코끝 모양 (z값으로 뾰족함 측정)
-    nose_tip_z = lm_coords_z[NOSE_TIP]
-    nose_bridge_z = lm_coords_z[NOSE_BRIDGE_BOTTOM]
-    metrics['nose_tip_sharpness'] = nose_bridge_z - nose_tip_z # 값이 클수록 뾰족
-    # 들창코 (코끝과 콧대 바닥의 y좌표 비교)
-    metrics['nose_upturned_angle'] = lm_coords[NOSE_TIP][1] - lm_coords[NOSE_BRIDGE_BOTTOM][1]
+def landmarks_to_array(landmarks: List[Any]) -> np.ndarray:
+    """
+    MediaPipe 랜드마크 객체 리스트를 정규화 좌표 배열 (N, 3)로 변환합니다.
+    """
+    flat = np.fromiter(
+        (value for lm in landmarks for value in (lm.x, lm.y, lm.z)),
+        dtype=np.float64,
+        count=len(landmarks) * 3,
+    )
+    return flat.reshape(-1, 3)
 
-    # --- 광대뼈 (Cheekbones) ---
-    cheek_prominence_left = lm_coords_z[JAW_LEFT] - lm_coords_z[CHEEK_LEFT]
-    cheek_prominence_right = lm_coords_z[JAW_RIGHT] - lm_coords_z[CHEEK_RIGHT]
-    metrics['cheekbone_prominence'] = (cheek_prominence_left + cheek_prominence_right) / 2
 
-    # --- 입술 및 입 (Lips & Mouth) ---
-    lip_height = np.linalg.norm(lm_coords[LIP_LOWER_BOTTOM] - lm_coords[LIP_UPPER_TOP])
-    lip_width = np.linalg.norm(lm_coords[LIP_RIGHT_CORNER] - lm_coords[LIP_LEFT_CORNER])
-    metrics['lip_thickness_ratio'] = lip_height / lip_width if lip_width > 0 else 0
-    metrics['mouth_size_ratio'] = lip_width / face_width if face_width > 0 else 0
-    # 입꼬리 각도
-    lip_center_y = (lm_coords[LIP_UPPER_TOP][1] + lm_coords[LIP_LOWER_BOTTOM][1]) / 2
-    lip_corners_y_avg = (lm_coords[LIP_LEFT_CORNER][1] + lm_coords[LIP_RIGHT_CORNER][1]) / 2
-    metrics['mouth_corner_angle'] = lip_center_y - lip_corners_y_avg
-    # 윗입술/아랫입술 두께 비교
-    upper_lip_thickness = np.linalg.norm(lm_coords[LIP_UPPER_TOP] - lm_coords[UPPER_LIP_CENTER_BOTTOM])
-    lower_lip_thickness = np.linalg.norm(lm_coords[LOWER_LIP_CENTER_TOP] - lm_coords[LIP_LOWER_BOTTOM])
-    metrics['lip_upper_to_lower_ratio'] = upper_lip_thickness / lower_lip_thickness if lower_lip_thickness > 0 else 0
+def calculate_geometric_metrics_batch(landmarks: np.ndarray, img_sizes: Union[np.ndarray, Sequence[Tuple[int, int]]]) -> np.ndarray:
+    """
+    여러 얼굴의 랜드마크를 한 번의 NumPy 연산으로 처리하여 특징 행렬을 계산합니다.
 
-    # --- 턱 (Chin/Jaw) ---
-    metrics['jaw_width_ratio'] = jaw_width / face_width if face_width > 0 else 0
-    # 주걱턱/무턱 (z값으로 판단)
-    metrics['chin_prominence'] = lm_coords_z[FOREHEAD_TOP] - lm_coords_z[CHIN_CENTER]
+    Args:
+        landmarks (np.ndarray): 정규화 좌표 텐서 (B, 478, 3).
+        img_sizes: 각 이미지의 (높이, 너비) 배열 (B, 2).
 
-    # --- 인중 (Philtrum) ---
-    philtrum_height = np.linalg.norm(lm_coords[PHILTRUM_TOP] - lm_coords[PHILTRUM_BOTTOM])
-    metrics['philtrum_height_ratio'] = philtrum_height / nose_height if nose_height > 0 else 0
+    Returns:
+        np.ndarray: (B, len(METRIC_NAMES)) 특징 행렬. 열 순서는 METRIC_NAMES와 같습니다.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    if landmarks.ndim != 3 or landmarks.shape[1] < NUM_LANDMARKS or landmarks.shape[2] != 3:
+        raise ValueError(f"랜드마크 텐서의 형태가 올바르지 않습니다: {landmarks.shape}")
+    landmarks = landmarks[:, :NUM_LANDMARKS, :]
 
-    # --- 법령 (Nasolabial Folds) ---
-    # 법령의 깊이는 z값의 차이로 추정
-    metrics['nasolabial_depth'] = (lm_coords_z[NASOLABIAL_LEFT_UPPER] + lm_coords_z[NASOLABIAL_RIGHT_UPPER]) / 2 - lm_coords_z[NOSE_LEFT_WING]
+    sizes = np.asarray(img_sizes, dtype=np.float64).reshape(-1, 2)
+    # x는 너비, y는 높이로 스케일링하여 픽셀 좌표로 변환 (z는 그대로 유지)
+    scale = np.stack([sizes[:, 1], sizes[:, 0], np.ones(len(sizes))], axis=-1)
+    coords = landmarks * scale[:, None, :]
+
+    # 거리 항 (B, n_dist)
+    deltas = coords[:, _DIST_PAIRS[:, 0], :2] - coords[:, _DIST_PAIRS[:, 1], :2]
+    distances = np.sqrt(np.einsum('btc,btc->bt', deltas, deltas))
+
+    # 선형 항 (B, n_linear)
+    linear = np.einsum('bkc,tkc->bt', coords, _LINEAR_WEIGHTS)
+    linear = np.where(_ABSOLUTE_MASK, np.abs(linear), linear)
+
+    terms = np.concatenate([distances, linear], axis=1)[:, None, :]
+
+    numerators = np.prod(np.where(_NUMERATOR_MASK, terms, 1.0), axis=-1)
+    denominators = np.prod(np.where(_DENOMINATOR_MASK, terms, 1.0), axis=-1)
+    return np.divide(numerators, denominators, out=np.zeros_like(numerators), where=denominators > 0)
+
+
+def metrics_to_dicts(metric_matrix: np.ndarray) -> List[Dict[str, float]]:
+    """특징 행렬을 얼굴별 {특징명: 값} 딕셔너리 리스트로 변환합니다."""
+    return [dict(zip(METRIC_NAMES, row.tolist())) for row in np.atleast_2d(metric_matrix)]
+
+
+def calculate_geometric_metrics(landmarks: Union[List[Any], np.ndarray], img_height: int, img_width: int) -> Dict[str, float]:
+    """
+    랜드마크 리스트를 받아 주요 기하학적 특징들을 계산합니다.
+    랜드마크 좌표는 정규화되어 있으므로, 실제 픽셀 좌표로 변환하여 비율을 계산합니다.
+    """
+    if landmarks is None or len(landmarks) < NUM_LANDMARKS:
+        return {}
 
-    return metrics
+    lm_array = landmarks if isinstance(landmarks, np.ndarray) else landmarks_to_array(landmarks)
+    metric_matrix = calculate_geometric_metrics_batch(lm_array[None, ...], [(img_height, img_width)])
+    return metrics_to_dicts(metric_matrix)[0]
 
 
 # --- 테스트용 코드 ---
@@ -0,0 +1,58 @@
+# landmark_store.py
+
+import hashlib
+from typing import Dict, Optional
+
+import numpy as np
+
+from .geometry_calculator import METRIC_NAMES, NUM_LANDMARKS
+
+# 저장 형식: 리틀엔디언 float32. 정규화 좌표에서 float32 오차(~1e-7)는 픽셀 단위로 무시할 수 있습니다.
+STORAGE_DTYPE = np.dtype("<f4")
+
+# 지표 열 구성이 바뀌면 저장된 지표 blob을 해석할 수 없으므로, 지표 이름 목록의 해시를 버전으로 함께 저장
+METRICS_VERSION = hashlib.sha1(",".join(METRIC_NAMES).encode("utf-8")).hexdigest()[:16]
+
+
+def encode_landmarks(landmarks: np.ndarray) -> bytes:
+    array = np.asarray(landmarks, dtype=STORAGE_DTYPE)
+    if array.shape != (NUM_LANDMARKS, 3):
+        raise ValueError(f"랜드마크 배열의 형태가 올바르지 않습니다: {array.shape}")
+    return array.tobytes()
+
+
+def decode_landmarks(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=STORAGE_DTYPE).reshape(NUM_LANDMARKS, 3)
+
+
+def decode_landmarks_many(blobs) -> np.ndarray:
+    """여러 blob을 한 번에 (B, 478, 3) float64 텐서로 변환합니다."""
+    joined = b"".join(blobs)
+    return np.frombuffer(joined, dtype=STORAGE_DTYPE).reshape(-1, NUM_LANDMARKS, 3).astype(np.float64)
+
+
+def encode_metrics(metrics) -> bytes:
+    """지표 딕셔너리 또는 METRIC_NAMES 순서의 벡터를 blob으로 변환합니다."""
+    if isinstance(metrics, dict):
+        metrics = [metrics.get(name, 0.0) for name in METRIC_NAMES]
+    return np.asarray(metrics, dtype=STORAGE_DTYPE).tobytes()
+
+
+def decode_metrics(blob: Optional[bytes], version: Optional[str]) -> Optional[Dict[str, float]]:
+    """현재 지표 구성과 같은 버전으로 저장된 경우에만 {지표명: 값}으로 복원합니다."""
+    if blob is None or version != METRICS_VERSION:
+        return None
+    return dict(zip(METRIC_NAMES, np.frombuffer(blob, dtype=STORAGE_DTYPE).astype(float).tolist()))
+
+
+def landmark_columns(landmarks: Optional[np.ndarray], image_size, metrics) -> Dict[str, object]:
+    """AnalysisResult 생성 시 넘길 재분석용 컬럼 값들을 만듭니다. 랜드마크가 없으면 빈 딕셔너리입니다."""
+    if landmarks is None or image_size is None:
+        return {}
+    return {
+        "landmarks": encode_landmarks(landmarks),
+        "image_height": int(image_size[0]),
+        "image_width": int(image_size[1]),
+        "metrics": encode_metrics(metrics) if metrics is not None else None,
+        "metrics_version": METRICS_VERSION if metrics is not None else None,
+    }
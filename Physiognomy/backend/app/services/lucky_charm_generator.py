@@ -1,56 +1,103 @@
+import asyncio
 import os
-import requests
-from datetime import datetime
-from openai import AzureOpenAI
-
-# Azure OpenAI 클라이언트 초기화
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-)
-
-# 이미지 저장 디렉토리 설정
-IMAGE_DIR = "app/static/amulets"
-os.makedirs(IMAGE_DIR, exist_ok=True)
-
-def generate_lucky_charm_image(prompt: str) -> str:
+import httpx
+from typing import Dict, Optional
+from openai import AsyncAzureOpenAI
+from msp_common.metrics import time_stage
+
+from . import charm_store
+
+# Azure OpenAI 비동기 클라이언트는 이벤트 루프에서 처음 사용할 때 생성
+_async_client: Optional[AsyncAzureOpenAI] = None
+
+# 같은 프롬프트에 대해 진행 중인 생성 작업 (중복 생성 방지)
+_inflight: Dict[str, "asyncio.Future[str]"] = {}
+
+# 이미지 다운로드 설정
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("CHARM_DOWNLOAD_TIMEOUT", "60"))
+
+
+def _get_async_client() -> AsyncAzureOpenAI:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncAzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            api_version=os.getenv("OPENAI_API_VERSION"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        )
+    return _async_client
+
+
+async def generate_lucky_charm_image_async(prompt: str) -> str:
     """
     Azure DALL-E API를 사용하여 행운의 부적 이미지를 생성하고 저장합니다.
-
-    Args:
-        prompt (str): 이미지 생성을 위한 DALL-E 프롬프트
+    같은 프롬프트의 이미지가 이미 있으면 즉시 반환하고, 같은 프롬프트가 동시에 요청되면 한 번만 생성합니다.
 
     Returns:
         str: 생성된 이미지의 URL
+
+    Raises:
+        Exception: 이미지 생성 또는 다운로드 실패 시.
     """
+    cached_url = await asyncio.to_thread(charm_store.lookup, prompt)
+    if cached_url:
+        return cached_url
+
+    key = charm_store.prompt_hash(prompt)
+    inflight = _inflight.get(key)
+    if inflight is not None:
+        return await asyncio.shield(inflight)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
     try:
-        result = client.images.generate(
+        image_url = await _generate_and_store(prompt, key)
+        future.set_result(image_url)
+        return image_url
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # 대기자가 없으면 "exception was never retrieved" 경고가 나지 않도록 소비
+        future.exception()
+        raise
+    finally:
+        del _inflight[key]
+
+
+async def _generate_and_store(prompt: str, key: str) -> str:
+    with time_stage("ai_call.dalle"):
+        result = await _get_async_client().images.generate(
             model=os.getenv("AZURE_OPENAI_DALLE_DEPLOYMENT"), # DALL-E 3 모델의 배포 이름 사용
             prompt=prompt,
             n=1,
             size="1024x1024"
         )
 
-        image_url = result.data[0].url
-
-        if not image_url:
-            raise ValueError("API 응답에서 이미지 URL을 찾을 수 없습니다.")
-
-        # 이미지 다운로드
-        image_data = requests.get(image_url).content
-        
-        # 파일명 생성
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        filename = f"lucky_charm_{timestamp}.png"
-        filepath = os.path.join(IMAGE_DIR, filename)
-        
-        # 이미지 저장
-        with open(filepath, "wb") as f:
-            f.write(image_data)
-            
-        return f"/static/amulets/{filename}"
+    image_url = result.data[0].url
+    if not image_url:
+        raise ValueError("API 응답에서 이미지 URL을 찾을 수 없습니다.")
 
-    except Exception as e:
-        print(f"DALL-E 이미지 생성 실패: {e}")
-        return None
+    filepath = charm_store.image_path_for(key)
+    partial_path = f"{filepath}.part"
+
+    # 다운로드가 끝난 뒤에만 최종 파일명으로 바꿔, 불완전한 파일이 노출되지 않도록 합니다.
+    # 파일 열기/쓰기/닫기는 디스크 I/O로 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+    try:
+        async with httpx.AsyncClient(timeout=DOWNLOAD_TIMEOUT_SECONDS) as http_client:
+            async with http_client.stream("GET", image_url) as response:
+                response.raise_for_status()
+                f = await asyncio.to_thread(open, partial_path, "wb")
+                try:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        await asyncio.to_thread(f.write, chunk)
+                finally:
+                    await asyncio.to_thread(f.close)
+        await asyncio.to_thread(os.replace, partial_path, filepath)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    return await asyncio.to_thread(charm_store.register, prompt)
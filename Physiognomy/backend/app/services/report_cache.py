@@ -0,0 +1,212 @@
+# report_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from .. import models
+from ..database import SessionLocal
+
+# 캐시 정책 설정
+REPORT_CACHE_ENABLED = os.getenv("REPORT_CACHE_ENABLED", "true").lower() == "true"
+REPORT_CACHE_TTL_SECONDS = int(os.getenv("REPORT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "5000"))
+REPORT_CACHE_MEMORY_ENTRIES = int(os.getenv("REPORT_CACHE_MEMORY_ENTRIES", "256"))
+# 메모리 적중의 사용 기록(hit_count/last_accessed_at)을 DB에 모아서 반영하는 주기
+REPORT_CACHE_TOUCH_FLUSH_SECONDS = float(os.getenv("REPORT_CACHE_TOUCH_FLUSH_SECONDS", "30"))
+
+
+def canonical_keys(interpretation_keys: Iterable[str]) -> str:
+    """해석 키 집합을 순서와 중복에 무관한 정규 문자열로 변환합니다."""
+    return ",".join(sorted(set(interpretation_keys)))
+
+
+def make_cache_key(interpretation_keys: Iterable[str], template_version: str) -> str:
+    """정규화된 해석 키와 프롬프트 템플릿 버전으로 캐시 키(SHA-256)를 만듭니다."""
+    payload = json.dumps({"keys": canonical_keys(interpretation_keys), "template": template_version}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """
+    해석 키 집합별 리포트 캐시입니다.
+    메모리 LRU를 1차로, DB(report_cache 테이블)를 영구 저장소로 사용하며
+    TTL이 지난 항목은 사용하지 않고, 최대 개수를 넘으면 가장 오래 사용되지 않은 항목부터 삭제합니다.
+    메모리 적중도 DB의 사용 기록에 반영되도록 적중 내역을 모아 두었다가 주기적으로(또는 삭제 전에) 기록합니다.
+    """
+
+    def __init__(self, ttl_seconds: int = REPORT_CACHE_TTL_SECONDS, max_entries: int = REPORT_CACHE_MAX_ENTRIES,
+                 memory_entries: int = REPORT_CACHE_MEMORY_ENTRIES):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Tuple[datetime, str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # cache_key -> (기록 대기 중인 적중 수, 마지막 적중 시각)
+        self._pending_touches: Dict[str, Tuple[int, datetime]] = {}
+        self._last_touch_flush = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self, created_at: datetime) -> bool:
+        return datetime.utcnow() - created_at < self.ttl
+
+    def _remember(self, cache_key: str, created_at: datetime, report: str, dalle_prompt: str) -> None:
+        with self._lock:
+            self._memory[cache_key] = (created_at, report, dalle_prompt)
+            self._memory.move_to_end(cache_key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, interpretation_keys: List[str], template_version: str) -> Optional[Tuple[str, str]]:
+        cache_key = make_cache_key(interpretation_keys, template_version)
+
+        result = None
+        flush_due = False
+        with self._lock:
+            cached = self._memory.get(cache_key)
+            if cached and self._is_fresh(cached[0]):
+                self._memory.move_to_end(cache_key)
+                self.hits += 1
+                count, _ = self._pending_touches.get(cache_key, (0, None))
+                self._pending_touches[cache_key] = (count + 1, datetime.utcnow())
+                flush_due = time.monotonic() - self._last_touch_flush >= REPORT_CACHE_TOUCH_FLUSH_SECONDS
+                result = (cached[1], cached[2])
+            elif cached:
+                del self._memory[cache_key]
+        if result is not None:
+            if flush_due:
+                self.flush_touches()
+            return result
+
+        try:
+            with SessionLocal() as db:
+                entry = db.get(models.ReportCacheEntry, cache_key)
+                if entry is None or not self._is_fresh(entry.created_at):
+                    if entry is not None:
+                        db.delete(entry)
+                        db.commit()
+                    self._count(hit=False)
+                    return None
+                entry.hit_count += 1
+                entry.last_accessed_at = datetime.utcnow()
+                db.commit()
+                result = (entry.created_at, entry.report, entry.dalle_prompt)
+        except Exception as e:
+            print(f"리포트 캐시 조회 실패: {e}")
+            self._count(hit=False)
+            return None
+
+        self._remember(cache_key, *result)
+        self._count(hit=True)
+        return result[1], result[2]
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def flush_touches(self, db=None) -> None:
+        """모아 둔 메모리 적중을 DB의 hit_count/last_accessed_at에 반영합니다 (LRU 삭제 순서가 실제 사용을 따르도록)."""
+        with self._lock:
+            pending, self._pending_touches = self._pending_touches, {}
+            self._last_touch_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            if db is None:
+                with SessionLocal() as session:
+                    self._apply_touches(session, pending)
+            else:
+                self._apply_touches(db, pending)
+        except Exception as e:
+            print(f"리포트 캐시 사용 기록 반영 실패: {e}")
+
+    def _apply_touches(self, db, pending: Dict[str, Tuple[int, datetime]]) -> None:
+        for cache_key, (count, accessed_at) in pending.items():
+            db.query(models.ReportCacheEntry).filter(models.ReportCacheEntry.cache_key == cache_key).update({
+                models.ReportCacheEntry.hit_count: models.ReportCacheEntry.hit_count + count,
+                models.ReportCacheEntry.last_accessed_at: accessed_at,
+            }, synchronize_session=False)
+        db.commit()
+
+    def put(self, interpretation_keys: List[str], template_version: str, report: str, dalle_prompt: str) -> None:
+        cache_key = make_cache_key(interpretation_keys, template_version)
+        now = datetime.utcnow()
+        try:
+            with SessionLocal() as db:
+                db.merge(models.ReportCacheEntry(
+                    cache_key=cache_key,
+                    template_version=template_version,
+                    interpretation_keys=canonical_keys(interpretation_keys),
+                    report=report,
+                    dalle_prompt=dalle_prompt,
+                    hit_count=0,
+                    created_at=now,
+                    last_accessed_at=now,
+                ))
+                db.commit()
+                self.flush_touches(db)
+                self._evict(db)
+        except Exception as e:
+            print(f"리포트 캐시 저장 실패: {e}")
+        self._remember(cache_key, now, report, dalle_prompt)
+
+    def _evict(self, db) -> None:
+        # TTL이 지난 항목 삭제
+        expired_before = datetime.utcnow() - self.ttl
+        db.query(models.ReportCacheEntry).filter(models.ReportCacheEntry.created_at < expired_before).delete(synchronize_session=False)
+        # 최대 개수를 넘는 항목은 마지막 사용 시각이 오래된 순으로 삭제 (LRU)
+        overflow = db.query(func.count(models.ReportCacheEntry.cache_key)).scalar() - self.max_entries
+        if overflow > 0:
+            stale_keys = [
+                row.cache_key for row in db.query(models.ReportCacheEntry.cache_key)
+                .order_by(models.ReportCacheEntry.last_accessed_at.asc())
+                .limit(overflow)
+            ]
+            db.query(models.ReportCacheEntry).filter(models.ReportCacheEntry.cache_key.in_(stale_keys)).delete(synchronize_session=False)
+        db.commit()
+
+    def stats(self) -> Dict[str, object]:
+        try:
+            with SessionLocal() as db:
+                persisted = db.query(func.count(models.ReportCacheEntry.cache_key)).scalar()
+        except Exception:
+            persisted = None
+        total = self.hits + self.misses
+        return {
+            "enabled": REPORT_CACHE_ENABLED,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+            "persisted_entries": persisted,
+            "ttl_seconds": int(self.ttl.total_seconds()),
+            "max_entries": self.max_entries,
+        }
+
+
+def most_frequent_key_sets(limit: int) -> List[List[str]]:
+    """analysis_results에서 가장 자주 관찰된 해석 키 조합을 빈도순으로 반환합니다."""
+    with SessionLocal() as db:
+        rows = (
+            db.query(models.AnalysisResult.interpretation_keys, func.count(models.AnalysisResult.id).label("seen"))
+            .filter(models.AnalysisResult.interpretation_keys.isnot(None))
+            .group_by(models.AnalysisResult.interpretation_keys)
+            .order_by(func.count(models.AnalysisResult.id).desc())
+            .limit(limit)
+            .all()
+        )
+    return [row.interpretation_keys.split(",") for row in rows if row.interpretation_keys]
+
+
+report_cache = ReportCache()
@@ -1,6 +1,7 @@
 
 
 # report_generator.py
+import asyncio
 import os
 import json
 import re
@@ -12,6 +13,13 @@ from langchain_community.embeddings import SentenceTransformerEmbeddings
 from langchain.chains import RetrievalQA
 from langchain_google_genai import GoogleGenerativeAI
 
+from msp_common.metrics import time_stage
+from .report_cache import REPORT_CACHE_ENABLED, most_frequent_key_sets, report_cache
+
+# 프롬프트 템플릿 버전: build_report_prompt나 parse_report_response를 변경하면 올려야 합니다.
+# (캐시 키에 포함되므로, 버전을 올리면 이전 템플릿으로 생성된 리포트는 재사용되지 않습니다)
+REPORT_TEMPLATE_VERSION = "1"
+
 # 1. 지식 베이스(KB) 및 RAG 파이프라인 설정
 def initialize_rag_pipeline():
     """
@@ -43,7 +51,8 @@ def initialize_rag_pipeline():
     llm = GoogleGenerativeAI(
         google_api_key=google_api_key,
         model=model_name,
-        temperature=0.7
+        temperature=0.7,
+        **_endpoint_options()
     )
 
     return RetrievalQA.from_chain_type(
@@ -54,7 +63,8 @@ def initialize_rag_pipeline():
 
 # 전역 변수로 QA 체인 초기화
 try:
-    QA_CHAIN = initialize_rag_pipeline()
+    with time_stage("rag_init"):
+        QA_CHAIN = initialize_rag_pipeline()
 except Exception as e:
     print(f"RAG 파이프라인 초기화 실패: {e}")
     QA_CHAIN = None
@@ -153,21 +163,16 @@ KEY_TO_FEATURE_MAP: Dict[str, str] = {
 
 
 
-def generate_report(interpretation_keys: List[str]) -> Tuple[str, str]:
+def build_report_prompt(interpretation_keys: List[str]) -> str:
     """
-    해석 키 리스트를 받아 AI 모델을 호출하여, 사용자용 리포트와 DALL-E용 프롬프트를 생성합니다.
-    Returns:
-        Tuple[str, str]: (사용자용 리포트, DALL-E용 프롬프트)
+    해석 키 리스트를 받아 AI 모델에 전달할 종합 분석용 프롬프트를 생성합니다.
     """
-    if not interpretation_keys:
-        return "얼굴 특징을 분석할 수 없습니다. 다른 사진으로 시도해보세요."
-
     # 감지된 특징들을 한글 문자열로 변환
     detected_features = [KEY_TO_FEATURE_MAP.get(key, key) for key in interpretation_keys]
     features_str = ", ".join(detected_features)
 
     # AI 모델에 전달할 종합 분석용 프롬프트
-    prompt = f"""
+    return f"""
         당신은 사용자의 자신감을 북돋아주는 매우 친절하고 유능한 관상 전문가입니다. 당신의 목표는 운명을 단정 짓는 것이 아니라, 사용자가 자신의 잠재력을 발견하고 긍정적인 방향으로 나아갈 수 있도록 돕는 따뜻한 조언자입니다.
 
         사용자의 얼굴에서 다음과 같은 특징들이 감지되었습니다: **{features_str}**
@@ -194,50 +199,119 @@ def generate_report(interpretation_keys: List[str]) -> Tuple[str, str]:
         답변은 반드시 유효한 JSON 형식이어야 합니다.
     """
 
-    try:
-        google_api_key = os.getenv("GOOGLE_API_KEY")
-        if not google_api_key:
-            raise ValueError("GOOGLE_API_KEY 환경변수가 설정되지 않았습니다.")
-
-        llm = GoogleGenerativeAI(
-            model=os.getenv("GEMINI_MODEL", "gemini-1.5-flash"),
-            google_api_key=google_api_key,
-            temperature=0.7
-        )
-        comprehensive_report_full = llm.invoke(prompt)
-
-        # AI 응답에서 JSON 부분만 추출
-        json_match = re.search(r'\{.*\}', comprehensive_report_full, re.DOTALL)
-        if not json_match:
-            raise ValueError("AI 응답에서 유효한 JSON을 찾을 수 없습니다.")
-        
-        json_str = json_match.group(0)
-        report_data = json.loads(json_str)
-
-        # DALL-E용 프롬프트 생성
-        dalle_prompt_source = report_data.get("luckyCharm", {}).get("dallePrompt", "A beautiful, general-purpose lucky charm.")
-        dalle_prompt = (
-            f"An artistic and mystical lucky charm amulet, embodying the essence of Korean traditional art. "
-            f"The design should be a beautiful representation of the following concept: '{dalle_prompt_source}'. "
-            f"Create a visually stunning, symbolic, and intricate digital art piece. The charm should radiate positive energy, "
-            f"featuring vibrant colors and elegant patterns. It should feel both ancient and powerful. "
-            f"Do not include any text or letters in the image. Focus on abstract symbols and natural motifs. "
-            f"Style: Vivid, high-detail, digital painting."
-        )
-
-        # 최종 사용자 리포트 (JSON 문자열)
-        final_report = json.dumps(report_data, ensure_ascii=False, indent=2)
-        
-        return final_report, dalle_prompt
 
+def get_template_version() -> str:
+    """캐시 키에 사용할 템플릿 버전 (모델이 바뀌어도 캐시를 분리합니다)."""
+    return f"{REPORT_TEMPLATE_VERSION}:{os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')}"
+
+
+def _endpoint_options() -> Dict:
+    """GEMINI_API_ENDPOINT가 설정되면 해당 주소로 REST 호출 (부하 테스트용 모의 LLM 서버 등)"""
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if not endpoint:
+        return {}
+    return {"client_options": {"api_endpoint": endpoint}, "transport": "rest"}
+
+
+def _create_llm() -> GoogleGenerativeAI:
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    if not google_api_key:
+        raise ValueError("GOOGLE_API_KEY 환경변수가 설정되지 않았습니다.")
+
+    return GoogleGenerativeAI(
+        model=os.getenv("GEMINI_MODEL", "gemini-1.5-flash"),
+        google_api_key=google_api_key,
+        temperature=0.7,
+        **_endpoint_options()
+    )
+
+
+def parse_report_response(comprehensive_report_full: str) -> Tuple[str, str]:
+    """
+    AI 응답 문자열에서 JSON 리포트를 추출하고, DALL-E용 프롬프트를 함께 만듭니다.
+    """
+    # AI 응답에서 JSON 부분만 추출
+    json_match = re.search(r'\{.*\}', comprehensive_report_full, re.DOTALL)
+    if not json_match:
+        raise ValueError("AI 응답에서 유효한 JSON을 찾을 수 없습니다.")
+
+    json_str = json_match.group(0)
+    report_data = json.loads(json_str)
+
+    # DALL-E용 프롬프트 생성
+    dalle_prompt_source = report_data.get("luckyCharm", {}).get("dallePrompt", "A beautiful, general-purpose lucky charm.")
+    dalle_prompt = (
+        f"An artistic and mystical lucky charm amulet, embodying the essence of Korean traditional art. "
+        f"The design should be a beautiful representation of the following concept: '{dalle_prompt_source}'. "
+        f"Create a visually stunning, symbolic, and intricate digital art piece. The charm should radiate positive energy, "
+        f"featuring vibrant colors and elegant patterns. It should feel both ancient and powerful. "
+        f"Do not include any text or letters in the image. Focus on abstract symbols and natural motifs. "
+        f"Style: Vivid, high-detail, digital painting."
+    )
+
+    # 최종 사용자 리포트 (JSON 문자열)
+    final_report = json.dumps(report_data, ensure_ascii=False, indent=2)
+
+    return final_report, dalle_prompt
+
+
+def _error_report(e: Exception) -> Tuple[str, str]:
+    import traceback
+    error_trace = traceback.format_exc()
+    print(f"ERROR in generate_report: {e}")
+    print(f"TRACEBACK: {error_trace}")
+    error_report = json.dumps({"error": "답변 생성 시스템에 오류가 발생했습니다. 관리자에게 문의하세요."}, ensure_ascii=False)
+    default_dalle_prompt = "A beautiful, general-purpose lucky charm representing universal good fortune. Style: Vivid, digital art."
+    return error_report, default_dalle_prompt
+
+
+async def generate_report_async(interpretation_keys: List[str], use_cache: bool = True) -> Tuple[str, str]:
+    """
+    해석 키 리스트를 받아 AI 모델을 호출하여, 사용자용 리포트와 DALL-E용 프롬프트를 생성합니다.
+    LLM 호출을 ainvoke로 수행하여 이벤트 루프를 막지 않으며, 같은 해석 키 집합에 대한 리포트는 캐시에서 재사용합니다.
+    Returns:
+        Tuple[str, str]: (사용자용 리포트, DALL-E용 프롬프트)
+    """
+    if not interpretation_keys:
+        return "얼굴 특징을 분석할 수 없습니다. 다른 사진으로 시도해보세요.", ""
+
+    template_version = get_template_version()
+    # 캐시 조회/저장은 동기 DB 세션을 사용하므로 스레드에서 실행
+    if use_cache and REPORT_CACHE_ENABLED:
+        cached = await asyncio.to_thread(report_cache.get, interpretation_keys, template_version)
+        if cached:
+            return cached
+
+    prompt = build_report_prompt(interpretation_keys)
+
+    try:
+        llm = _create_llm()
+        with time_stage("ai_call.gemini"):
+            comprehensive_report_full = await llm.ainvoke(prompt)
+        final_report, dalle_prompt = parse_report_response(comprehensive_report_full)
     except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"ERROR in generate_report: {e}")
-        print(f"TRACEBACK: {error_trace}")
-        error_report = json.dumps({"error": "답변 생성 시스템에 오류가 발생했습니다. 관리자에게 문의하세요."}, ensure_ascii=False)
-        default_dalle_prompt = "A beautiful, general-purpose lucky charm representing universal good fortune. Style: Vivid, digital art."
-        return error_report, default_dalle_prompt
+        # 오류 리포트는 캐시하지 않습니다.
+        return _error_report(e)
+
+    if REPORT_CACHE_ENABLED:
+        await asyncio.to_thread(report_cache.put, interpretation_keys, template_version, final_report, dalle_prompt)
+    return final_report, dalle_prompt
+
+
+async def prewarm_report_cache(limit: int = 20) -> Dict[str, int]:
+    """
+    analysis_results에서 가장 자주 관찰된 해석 키 조합의 리포트를 미리 생성해 캐시에 채웁니다.
+    이미 캐시에 있는 조합은 건너뜁니다.
+    """
+    template_version = get_template_version()
+    warmed = skipped = 0
+    for keys in await asyncio.to_thread(most_frequent_key_sets, limit):
+        if await asyncio.to_thread(report_cache.get, keys, template_version):
+            skipped += 1
+            continue
+        await generate_report_async(keys, use_cache=False)
+        warmed += 1
+    return {"warmed": warmed, "skipped": skipped}
 
 # --- 테스트용 코드 ---
 if __name__ == '__main__':
@@ -253,5 +327,5 @@ if __name__ == '__main__':
         ]
         print(f"\n테스트 키: {test_keys}")
         print("\n리포트를 생성합니다...\n")
-        final_report = generate_report(test_keys)
+        final_report, _ = asyncio.run(generate_report_async(test_keys))
         print(final_report)
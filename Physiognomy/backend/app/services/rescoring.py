@@ -0,0 +1,83 @@
+# rescoring.py
+
+import os
+import time
+from typing import Any, Dict
+
+import numpy as np
+from sqlalchemy import func, select, update
+
+from .. import models
+from ..database import SessionLocal
+from .geometry_calculator import METRIC_NAMES, calculate_geometric_metrics_batch
+from .landmark_store import METRICS_VERSION, decode_landmarks_many, encode_metrics
+from .report_cache import canonical_keys
+from .rule_engine import analyze_gwansang_rules_batch, rule_engine
+
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "1000"))
+
+
+def rescore_history(batch_size: int = RESCORE_BATCH_SIZE, dry_run: bool = False, session_factory=SessionLocal) -> Dict[str, Any]:
+    """
+    저장된 랜드마크로 전체 분석 기록의 기하학 지표와 해석 키를 다시 계산합니다 (MediaPipe 재실행 없음).
+    id 순으로 batch_size개씩 읽어 한 번의 행렬 연산으로 평가하고, 달라진 행만 일괄 갱신합니다.
+    리포트 본문은 LLM 호출이 필요하므로 갱신하지 않습니다.
+
+    Returns:
+        dict: 처리 건수, 해석 키가 바뀐 건수, 랜드마크가 없어 건너뛴 건수 등.
+    """
+    started = time.perf_counter()
+    table = models.AnalysisResult
+    stats = {
+        "scanned": 0,
+        "keys_changed": 0,
+        "rows_updated": 0,
+        "missing_landmarks": 0,
+        "dry_run": dry_run,
+        "rules_version": rule_engine.ruleset.version,
+        "metrics_version": METRICS_VERSION,
+    }
+
+    with session_factory() as db:
+        stats["missing_landmarks"] = db.execute(select(func.count(table.id)).where(table.landmarks.is_(None))).scalar()
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(table.id, table.landmarks, table.image_height, table.image_width,
+                       table.interpretation_keys, table.metrics, table.metrics_version)
+                .where(table.landmarks.isnot(None), table.id > last_id)
+                .order_by(table.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            landmark_tensor = decode_landmarks_many([row.landmarks for row in rows])
+            sizes = np.array([(row.image_height, row.image_width) for row in rows], dtype=np.float64)
+            metric_matrix = calculate_geometric_metrics_batch(landmark_tensor, sizes)
+            key_lists = analyze_gwansang_rules_batch(metric_matrix, METRIC_NAMES, record=False)
+
+            updates = []
+            for row, metric_vector, keys in zip(rows, metric_matrix, key_lists):
+                interpretation_keys = canonical_keys(keys)
+                metrics_blob = encode_metrics(metric_vector)
+                keys_changed = interpretation_keys != row.interpretation_keys
+                stats["keys_changed"] += keys_changed
+                if keys_changed or metrics_blob != row.metrics or row.metrics_version != METRICS_VERSION:
+                    updates.append({
+                        "id": row.id,
+                        "interpretation_keys": interpretation_keys,
+                        "metrics": metrics_blob,
+                        "metrics_version": METRICS_VERSION,
+                    })
+            stats["scanned"] += len(rows)
+
+            if updates and not dry_run:
+                # 기본 키 기준 ORM 일괄 UPDATE (executemany)
+                db.execute(update(table), updates)
+                db.commit()
+                stats["rows_updated"] += len(updates)
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return stats
@@ -1,146 +1,367 @@
 # rule_engine.py
 
-from typing import Dict, List
+import json
+import operator
+import os
+import threading
+import time
+from collections import Counter
+from itertools import compress
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+# 규칙 파일 경로 (환경변수로 교체 가능)
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "rules", "gwansang_rules.json")
+RULES_PATH = os.getenv("GWANSANG_RULES_PATH", DEFAULT_RULES_PATH)
+# 이 크기 이하의 배치는 NumPy 호출 오버헤드를 피하기 위해 스칼라 경로로 평가
+SCALAR_BATCH_LIMIT = 4
+# 규칙 파일 변경 여부를 확인하는 최소 간격(초)
+RELOAD_CHECK_INTERVAL = float(os.getenv("GWANSANG_RULES_CHECK_INTERVAL", "1.0"))
+
+# 지원하는 비교 연산자 (abs 접두어는 절댓값과 비교)
+_OPERATORS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+}
+_SCALAR_OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+_ABS_PREFIX = "abs"
+
+
+class RuleSetError(ValueError):
+    """규칙 파일의 형식이 올바르지 않을 때 발생합니다."""
+
+
+class CompiledRuleSet:
+    """
+    JSON 규칙 정의를 배열 연산으로 평가할 수 있도록 컴파일한 규칙 집합입니다.
+
+    각 그룹은 if/elif/else 체인과 같이 위에서부터 처음 만족하는 case 하나만 적용되며,
+    조건이 없는 case는 else 역할을 합니다. 특징값이 없으면 NaN으로 취급되어 모든 비교가 거짓이 됩니다.
+    """
+
+    def __init__(self, definition: Dict[str, Any]):
+        self.version = str(definition.get("version", "unknown"))
+        self.defaults: Dict[str, float] = dict(definition.get("defaults", {}))
+        self.derived: Dict[str, List[str]] = {}
+        for name, spec in definition.get("derived", {}).items():
+            if "mean" not in spec:
+                raise RuleSetError(f"지원하지 않는 파생 특징 정의입니다: {name}")
+            self.derived[name] = list(spec["mean"])
+
+        groups = definition.get("groups")
+        if not groups:
+            raise RuleSetError("규칙 그룹이 정의되어 있지 않습니다.")
+
+        # 규칙이 참조하는 원본 특징 (파생 특징 제외)
+        columns: List[str] = []
+
+        def column(name: str) -> int:
+            if name not in columns:
+                columns.append(name)
+            return columns.index(name)
+
+        for sources in self.derived.values():
+            for name in sources:
+                column(name)
+
+        self.group_names: List[str] = []
+        self.case_keys: List[str] = []
+        self.case_labels: List[str] = []
+        case_groups: List[int] = []
+        requires: List[List[str]] = []
+        conditions: List[Any] = []  # (특징명, 연산자, 임계값)
+        case_conditions: List[List[int]] = []
+
+        for g, group in enumerate(groups):
+            self.group_names.append(group["name"])
+            requires.append([name for name in group.get("requires", [])])
+            for case in group["cases"]:
+                indices = []
+                for metric, op, threshold in case.get("when", []):
+                    if op.replace(_ABS_PREFIX, "", 1) not in _OPERATORS:
+                        raise RuleSetError(f"지원하지 않는 연산자입니다: {op}")
+                    conditions.append((metric, op, float(threshold)))
+                    indices.append(len(conditions) - 1)
+                self.case_keys.append(case["key"])
+                self.case_labels.append(f"{group['name']}:{case['key']}")
+                case_groups.append(g)
+                case_conditions.append(indices)
+
+        for metric, _, _ in conditions:
+            if metric not in self.derived:
+                column(metric)
+        for names in requires:
+            for name in names:
+                column(name)
+
+        self.columns = columns
+        self._column_index = {name: i for i, name in enumerate(columns)}
+        self._default_values = np.array([self.defaults.get(name, np.nan) for name in columns])
+        self._default_list = self._default_values.tolist()
+        self._derived_indices = [
+            (name, [self._column_index[source] for source in sources])
+            for name, sources in self.derived.items()
+        ]
+
+        # 조건 평가용: 특징명 → (원본 열 또는 파생 열) 인덱스
+        self._value_names = columns + list(self.derived)
+        value_index = {name: i for i, name in enumerate(self._value_names)}
+        self._condition_columns = np.array([value_index[metric] for metric, _, _ in conditions], dtype=np.intp)
+        self._condition_thresholds = np.array([threshold for _, _, threshold in conditions])
+        self._condition_abs = np.array([op.startswith(_ABS_PREFIX) for _, op, _ in conditions])
+        # 연산자별로 조건 인덱스를 묶어 한 번에 비교
+        self._condition_ops = []
+        for op, compare in _OPERATORS.items():
+            indices = np.array([c for c, (_, cond_op, _) in enumerate(conditions) if cond_op.replace(_ABS_PREFIX, "", 1) == op], dtype=np.intp)
+            if len(indices):
+                self._condition_ops.append((compare, indices))
+
+        n_cases = len(self.case_keys)
+        n_groups = len(self.group_names)
+        # 행렬 곱으로 집계하기 위해 마스크는 실수형으로 보관
+        self._case_condition_matrix = np.zeros((len(conditions), n_cases))
+        for c, indices in enumerate(case_conditions):
+            self._case_condition_matrix[indices, c] = 1.0
+        self._requires_matrix = np.zeros((len(columns), n_groups))
+        for g, names in enumerate(requires):
+            for name in names:
+                self._requires_matrix[self._column_index[name], g] = 1.0
+        self._case_groups = np.array(case_groups, dtype=np.intp)
+        # 같은 그룹 안에서 앞선 case들을 찾기 위한 (n_cases, n_cases) 행렬
+        order = np.arange(n_cases)
+        earlier = (self._case_groups[:, None] == self._case_groups[None, :]) & (order[:, None] < order[None, :])
+        self._earlier_matrix = earlier.astype(np.float64)
+
+        # 스칼라 경로용 계획: 그룹별 (필수 열, [(case 인덱스, [(값 인덱스, 비교 함수, 임계값, 절댓값 여부)])])
+        self._scalar_plan = []
+        for g, names in enumerate(requires):
+            cases = []
+            for c in np.flatnonzero(self._case_groups == g):
+                checks = []
+                for i in case_conditions[c]:
+                    metric, op, threshold = conditions[i]
+                    base_op = op.replace(_ABS_PREFIX, "", 1)
+                    checks.append((value_index[metric], _SCALAR_OPERATORS[base_op], threshold, op != base_op))
+                cases.append((int(c), checks))
+            self._scalar_plan.append(([self._column_index[name] for name in names], cases))
+        self._unique_keys = len(set(self.case_keys)) == len(self.case_keys)
+
+    def to_matrix(self, metrics: Union[Dict[str, float], Sequence[Dict[str, float]]]) -> np.ndarray:
+        """특징 딕셔너리(또는 그 리스트)를 규칙 평가용 (B, n_columns) 행렬로 변환합니다. 없는 값은 NaN입니다."""
+        rows = [metrics] if isinstance(metrics, dict) else list(metrics)
+        nan = float("nan")
+        matrix = np.array([[row.get(name, nan) for name in self.columns] for row in rows], dtype=np.float64)
+        return matrix.reshape(len(rows), len(self.columns))
+
+    def row_from_dict(self, metrics: Dict[str, float]) -> List[float]:
+        nan = float("nan")
+        return [metrics.get(name, nan) for name in self.columns]
+
+    def matrix_from_columns(self, metric_matrix: np.ndarray, metric_names: Sequence[str]) -> np.ndarray:
+        """geometry_calculator의 특징 행렬 (B, len(metric_names))에서 규칙에 필요한 열만 뽑아냅니다."""
+        metric_matrix = np.atleast_2d(np.asarray(metric_matrix, dtype=np.float64))
+        source_index = {name: i for i, name in enumerate(metric_names)}
+        matrix = np.full((metric_matrix.shape[0], len(self.columns)), np.nan)
+        for name, i in self._column_index.items():
+            if name in source_index:
+                matrix[:, i] = metric_matrix[:, source_index[name]]
+        return matrix
+
+    def evaluate(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        (B, n_columns) 특징 행렬에 대해 모든 규칙을 한 번에 평가합니다.
+
+        Returns:
+            np.ndarray: (B, n_cases) 불리언 행렬. True이면 해당 case의 해석 키가 적용됩니다.
+        """
+        missing = np.isnan(matrix)
+        group_active = (missing @ self._requires_matrix) == 0
+
+        values = np.where(missing, self._default_values, matrix)
+        if self._derived_indices:
+            derived = np.stack([values[:, indices].mean(axis=1) for _, indices in self._derived_indices], axis=1)
+            values = np.concatenate([values, derived], axis=1)
+
+        operands = values[:, self._condition_columns]
+        operands[:, self._condition_abs] = np.abs(operands[:, self._condition_abs])
+        condition_results = np.zeros(operands.shape, dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for compare, indices in self._condition_ops:
+                condition_results[:, indices] = compare(operands[:, indices], self._condition_thresholds[indices])
+
+        # case 만족 여부: 해당 case의 조건 중 거짓인 것이 하나도 없음
+        satisfied = ((~condition_results) @ self._case_condition_matrix) == 0
+        # 같은 그룹에서 앞선 case가 이미 만족했다면 적용하지 않음 (elif 체인)
+        shadowed = (satisfied @ self._earlier_matrix) > 0
+        return satisfied & ~shadowed & group_active[:, self._case_groups]
+
+    def evaluate_row(self, row: Sequence[float]) -> List[int]:
+        """
+        한 얼굴의 특징값(열 순서는 self.columns, 없는 값은 NaN)을 평가하여 적용된 case 인덱스를 반환합니다.
+        evaluate와 결과가 같으며, 소량 평가 시 NumPy 오버헤드가 없습니다.
+        """
+        values = [default if value != value else value for value, default in zip(row, self._default_list)]
+        for _, indices in self._derived_indices:
+            values.append(sum(values[i] for i in indices) / len(indices))
+
+        fired = []
+        for required, cases in self._scalar_plan:
+            if any(row[i] != row[i] for i in required):
+                continue
+            for c, checks in cases:
+                for i, compare, threshold, absolute in checks:
+                    if not compare(abs(values[i]) if absolute else values[i], threshold):
+                        break
+                else:
+                    fired.append(c)
+                    break
+        return fired
+
+    def keys_from_indices(self, fired: List[int]) -> List[str]:
+        keys = [self.case_keys[c] for c in fired]
+        return keys if self._unique_keys else list(dict.fromkeys(keys))
+
+    def keys_from_fired(self, fired: np.ndarray) -> List[List[str]]:
+        case_keys = self.case_keys
+        rows = np.atleast_2d(fired).tolist()
+        if self._unique_keys:
+            return [list(compress(case_keys, row)) for row in rows]
+        # 같은 해석 키가 여러 그룹에서 나와도 한 번만 포함 (규칙 순서 유지)
+        return [list(dict.fromkeys(compress(case_keys, row))) for row in rows]
+
+
+class RuleEngine:
+    """규칙 파일을 로드하고, 파일이 변경되면 재시작 없이 다시 컴파일합니다."""
+
+    def __init__(self, path: str = RULES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._ruleset: Optional[CompiledRuleSet] = None
+        self.fire_counts: Counter = Counter()
+        self.evaluations = 0
+        self.last_reload_error: Optional[str] = None
+
+    def reload(self) -> CompiledRuleSet:
+        """규칙 파일을 즉시 다시 로드합니다. 형식 오류 시 예외가 발생하며 기존 규칙은 유지됩니다."""
+        with self._lock:
+            return self._load()
+
+    def _load(self) -> CompiledRuleSet:
+        with open(self.path, "r", encoding="utf-8") as f:
+            definition = json.load(f)
+        ruleset = CompiledRuleSet(definition)
+        self._ruleset = ruleset
+        self._mtime = os.path.getmtime(self.path)
+        self.last_reload_error = None
+        print(f"관상 규칙 로드 완료: v{ruleset.version} ({len(ruleset.case_keys)}개 규칙)")
+        return ruleset
+
+    @property
+    def ruleset(self) -> CompiledRuleSet:
+        with self._lock:
+            if self._ruleset is None:
+                return self._load()
+            now = time.monotonic()
+            if now - self._checked_at < RELOAD_CHECK_INTERVAL:
+                return self._ruleset
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = self._mtime
+            if mtime != self._mtime:
+                try:
+                    self._load()
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    # 잘못된 규칙 파일로 교체된 경우 기존 규칙을 계속 사용
+                    self._mtime = mtime
+                    self.last_reload_error = str(e)
+                    print(f"관상 규칙 재로드 실패, 기존 규칙 유지: {e}")
+            return self._ruleset
+
+    def evaluate_rows(self, rows: Sequence[Sequence[float]], ruleset: CompiledRuleSet, record: bool = True) -> List[List[str]]:
+        """소량의 얼굴을 스칼라 경로로 평가하고 (record=True이면) 규칙 발화 횟수를 기록합니다."""
+        fired_rows = [ruleset.evaluate_row(row) for row in rows]
+        if not record:
+            return [ruleset.keys_from_indices(fired) for fired in fired_rows]
+        with self._lock:
+            self.evaluations += len(fired_rows)
+            for fired in fired_rows:
+                for c in fired:
+                    self.fire_counts[ruleset.case_labels[c]] += 1
+        return [ruleset.keys_from_indices(fired) for fired in fired_rows]
+
+    def evaluate(self, matrix: np.ndarray, ruleset: CompiledRuleSet, record: bool = True) -> List[List[str]]:
+        """
+        (B, n_columns) 특징 행렬을 벡터화 경로로 평가하고 규칙 발화 횟수를 기록합니다.
+        저장된 결과 재채점처럼 실제 분석 요청이 아닌 평가는 record=False로 통계에서 제외합니다.
+        """
+        if matrix.shape[0] <= SCALAR_BATCH_LIMIT:
+            return self.evaluate_rows(matrix.tolist(), ruleset, record)
+
+        fired = ruleset.evaluate(matrix)
+        if not record:
+            return ruleset.keys_from_fired(fired)
+        counts = fired.sum(axis=0)
+        with self._lock:
+            self.evaluations += fired.shape[0]
+            for c in np.flatnonzero(counts):
+                self.fire_counts[ruleset.case_labels[c]] += int(counts[c])
+        return ruleset.keys_from_fired(fired)
+
+    def stats(self) -> Dict[str, Any]:
+        ruleset = self.ruleset
+        with self._lock:
+            return {
+                "version": ruleset.version,
+                "path": self.path,
+                "rules": len(ruleset.case_keys),
+                "evaluations": self.evaluations,
+                "fire_counts": {label: self.fire_counts.get(label, 0) for label in ruleset.case_labels},
+                "last_reload_error": self.last_reload_error,
+            }
+
+
+rule_engine = RuleEngine()
+
 
 def analyze_gwansang_rules(metrics: Dict[str, float]) -> List[str]:
     """
     기하학적 특징 딕셔너리를 입력받아, 정의된 규칙에 따라
     관상학적 해석 키 리스트를 반환합니다.
     """
-    interpretations = []
-
-    # --- 얼굴형 (Face Shape) ---
-    if 'face_aspect_ratio' in metrics:
-        if metrics['face_aspect_ratio'] < 0.95: # 너비가 높이보다 큼
-            interpretations.append('FACE_SHAPE_ROUND')
-        elif metrics['face_aspect_ratio'] > 1.1:
-            interpretations.append('FACE_SHAPE_LONG')
-        elif metrics.get('jaw_to_cheek_width_ratio', 1.0) > 0.95:
-            interpretations.append('FACE_SHAPE_SQUARE')
-        elif metrics.get('jaw_to_cheek_width_ratio', 1.0) < 0.8:
-            interpretations.append('FACE_SHAPE_INVERTED_TRIANGLE')
-        else:
-            interpretations.append('FACE_SHAPE_EGG')
-
-    # --- 이마 (Forehead) ---
-    if 'forehead_height_ratio' in metrics:
-        if metrics['forehead_height_ratio'] > 0.35:
-            interpretations.append('FOREHEAD_WIDE_HIGH')
-        elif metrics['forehead_height_ratio'] < 0.30:
-            interpretations.append('FOREHEAD_NARROW')
-    if 'forehead_m_shape_curve' in metrics and metrics['forehead_m_shape_curve'] > 0.02:
-        interpretations.append('FOREHEAD_M_SHAPE')
-
-    # --- 눈 (Eyes) ---
-    if 'eye_size_ratio' in metrics:
-        if metrics['eye_size_ratio'] > 0.015:
-            interpretations.append('EYES_LARGE')
-        else:
-            interpretations.append('EYES_SMALL')
-    if 'left_eye_slant' in metrics and 'right_eye_slant' in metrics:
-        avg_slant = (metrics['left_eye_slant'] + metrics['right_eye_slant']) / 2
-        if avg_slant > 5:
-            interpretations.append('EYES_UPWARD_SLANTING')
-        elif avg_slant < -5:
-            interpretations.append('EYES_DOWNWARD_SLANTING')
-    if 'eye_spacing_ratio' in metrics:
-        if metrics['eye_spacing_ratio'] > 1.1:
-            interpretations.append('EYES_SPACED_WIDE')
-        elif metrics['eye_spacing_ratio'] < 0.9:
-            interpretations.append('EYES_SPACED_NARROW')
-
-    # --- 눈썹 (Eyebrows) ---
-    if 'eyebrow_length_ratio' in metrics:
-        if metrics['eyebrow_length_ratio'] > 1.1:
-            interpretations.append('EYEBROWS_LONG')
-        elif metrics['eyebrow_length_ratio'] < 0.9:
-            interpretations.append('EYEBROWS_SHORT')
-    if 'eyebrow_thickness' in metrics and metrics['eyebrow_thickness'] > 0.01:
-        interpretations.append('EYEBROWS_THICK')
-    else:
-        interpretations.append('EYEBROWS_THIN')
-    if 'eyebrow_arch' in metrics:
-        if abs(metrics['eyebrow_arch']) < 5:
-            interpretations.append('EYEBROWS_STRAIGHT')
-        else:
-            interpretations.append('EYEBROWS_CRESCENT')
-    if 'eyebrow_slant' in metrics:
-        if metrics['eyebrow_slant'] > 5:
-            interpretations.append('EYEBROWS_UPWARD')
-        elif metrics['eyebrow_slant'] < -5:
-            interpretations.append('EYEBROWS_DOWNWARD')
-
-    # --- 코 (Nose) ---
-    if 'nose_height_ratio' in metrics and 'nose_width_ratio' in metrics:
-        if metrics['nose_height_ratio'] > 0.3 and metrics['nose_width_ratio'] < 0.2:
-            interpretations.append('NOSE_LARGE') # 높고 좁은 코
-        elif metrics['nose_height_ratio'] < 0.25:
-            interpretations.append('NOSE_SMALL')
-    if 'nose_width_ratio' in metrics and metrics['nose_width_ratio'] > 0.25:
-        interpretations.append('NOSE_WIDE_WINGS')
-    if 'nose_tip_sharpness' in metrics:
-        if metrics['nose_tip_sharpness'] > 0.02:
-            interpretations.append('NOSE_POINTED_TIP')
-        else:
-            interpretations.append('NOSE_ROUNDED_TIP')
-    if 'nose_upturned_angle' in metrics and metrics['nose_upturned_angle'] < -5:
-        interpretations.append('NOSE_UPTURNED')
-
-    # --- 광대뼈 (Cheekbones) ---
-    if 'cheekbone_prominence' in metrics:
-        if metrics['cheekbone_prominence'] > 0.05:
-            interpretations.append('CHEEKBONES_PROMINENT')
-        else:
-            interpretations.append('CHEEKBONES_BALANCED')
-
-    # --- 입술 및 입 (Lips & Mouth) ---
-    if 'lip_thickness_ratio' in metrics:
-        if metrics['lip_thickness_ratio'] > 0.5:
-            interpretations.append('LIPS_THICK')
-        else:
-            interpretations.append('LIPS_THIN')
-    if 'mouth_size_ratio' in metrics:
-        if metrics['mouth_size_ratio'] > 0.4:
-            interpretations.append('MOUTH_LARGE')
-        else:
-            interpretations.append('MOUTH_SMALL')
-    if 'mouth_corner_angle' in metrics:
-        if metrics['mouth_corner_angle'] > 2:
-            interpretations.append('MOUTH_CORNERS_UP')
-        elif metrics['mouth_corner_angle'] < -2:
-            interpretations.append('MOUTH_CORNERS_DOWN')
-    if 'lip_upper_to_lower_ratio' in metrics:
-        if metrics['lip_upper_to_lower_ratio'] > 1.2:
-            interpretations.append('LIPS_UPPER_THICKER')
-        elif metrics['lip_upper_to_lower_ratio'] < 0.8:
-            interpretations.append('LIPS_LOWER_THICKER')
-
-    # --- 턱 (Chin/Jaw) ---
-    if 'jaw_width_ratio' in metrics:
-        if metrics['jaw_width_ratio'] > 0.8:
-            interpretations.append('JAW_SQUARE')
-        else:
-            interpretations.append('JAW_POINTED_VLINE')
-    if 'chin_prominence' in metrics:
-        if metrics['chin_prominence'] < -0.1:
-            interpretations.append('JAW_PROTRUDING')
-        elif metrics['chin_prominence'] > 0.1:
-            interpretations.append('JAW_RECEDING')
-
-    # --- 인중 (Philtrum) ---
-    if 'philtrum_height_ratio' in metrics:
-        if metrics['philtrum_height_ratio'] > 0.2:
-            interpretations.append('PHILTRUM_LONG')
-        else:
-            interpretations.append('PHILTRUM_SHORT')
-
-    # --- 법령 (Nasolabial Folds) ---
-    if 'nasolabial_depth' in metrics and metrics['nasolabial_depth'] > 0.01:
-        interpretations.append('NASOLABIAL_CLEAR_LONG')
-    else:
-        interpretations.append('NASOLABIAL_FAINT_SHORT')
+    ruleset = rule_engine.ruleset
+    return rule_engine.evaluate_rows([ruleset.row_from_dict(metrics)], ruleset)[0]
 
-    return list(set(interpretations)) # 중복 제거 후 반환
+
+def analyze_gwansang_rules_batch(metrics: Union[Sequence[Dict[str, float]], np.ndarray], metric_names: Optional[Sequence[str]] = None,
+                                 record: bool = True) -> List[List[str]]:
+    """
+    여러 얼굴의 특징을 한 번에 평가합니다.
+
+    Args:
+        metrics: 특징 딕셔너리 리스트, 또는 (B, len(metric_names)) 특징 행렬.
+        metric_names: metrics가 행렬일 때 각 열의 특징명 (geometry_calculator.METRIC_NAMES).
+        record: False이면 규칙 발화 통계(GET /rules/)에 반영하지 않습니다 (재채점 등).
+    """
+    ruleset = rule_engine.ruleset
+    if isinstance(metrics, np.ndarray):
+        if metric_names is None:
+            raise ValueError("특징 행렬을 사용할 때는 metric_names가 필요합니다.")
+        matrix = ruleset.matrix_from_columns(metrics, metric_names)
+    else:
+        matrix = ruleset.to_matrix(metrics)
+    return rule_engine.evaluate(matrix, ruleset, record)
 
 
 # --- 테스트용 코드 ---
@@ -161,7 +382,7 @@ if __name__ == '__main__':
 
     geometric_metrics = get_dummy_metrics()
     gwansang_keys = analyze_gwansang_rules(geometric_metrics)
-    
+
     print("\n관상 분석 결과 (해석 키):")
     print(gwansang_keys)
 
@@ -179,3 +400,6 @@ if __name__ == '__main__':
     gwansang_keys_2 = analyze_gwansang_rules(test_metrics_2)
     print("관상 분석 결과 2 (해석 키):")
     print(gwansang_keys_2)
+
+    print("\n규칙 발화 통계:")
+    print(rule_engine.stats())
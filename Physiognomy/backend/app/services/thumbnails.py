@@ -0,0 +1,174 @@
+# thumbnails.py
+
+import asyncio
+import glob
+import os
+import re
+import tempfile
+from typing import Dict, List, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+UPLOAD_FOLDER = "uploads"
+THUMBNAIL_DIR = os.path.join(UPLOAD_FOLDER, "thumbs")
+os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+
+# 생성할 썸네일 크기 (긴 변 기준 픽셀)
+THUMBNAIL_SIZES: Tuple[int, ...] = tuple(
+    sorted(int(size) for size in os.getenv("THUMBNAIL_SIZES", "128,256,512").split(",") if size.strip())
+)
+DEFAULT_THUMBNAIL_SIZE = 256
+WEBP_QUALITY = int(os.getenv("THUMBNAIL_WEBP_QUALITY", "80"))
+AVIF_QUALITY = int(os.getenv("THUMBNAIL_AVIF_QUALITY", "60"))
+
+# 썸네일은 원본 uuid와 크기로 주소가 정해지고 바뀌지 않으므로 1년간 캐시
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+# 생성 중인 백그라운드 작업 (GC로 사라지지 않도록 참조 유지)
+_pending: Set["asyncio.Task[None]"] = set()
+
+
+def _encoder_supported(extension: str) -> bool:
+    try:
+        ok, _ = cv2.imencode(extension, np.zeros((8, 8, 3), dtype=np.uint8))
+        return bool(ok)
+    except cv2.error:
+        return False
+
+
+# OpenCV 빌드에 따라 AVIF 인코더가 없을 수 있으므로 시작 시 확인. (확장자, MIME, 인코딩 옵션)
+FORMATS: List[Tuple[str, str, List[int]]] = [
+    (extension, mime, params)
+    for extension, mime, params in (
+        ("avif", "image/avif", [cv2.IMWRITE_AVIF_QUALITY, AVIF_QUALITY] if hasattr(cv2, "IMWRITE_AVIF_QUALITY") else []),
+        ("webp", "image/webp", [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY]),
+    )
+    if _encoder_supported(f".{extension}")
+]
+
+
+def image_key(filename: str) -> str:
+    """업로드 파일명(`<uuid>_<원본 파일명>`)에서 썸네일 키로 쓰는 uuid를 꺼냅니다."""
+    return filename.split("_", 1)[0]
+
+
+def is_valid_key(key: str) -> bool:
+    return bool(_UUID_RE.match(key))
+
+
+def thumbnail_path(key: str, size: int, extension: str) -> str:
+    return os.path.join(THUMBNAIL_DIR, f"{key}_{size}.{extension}")
+
+
+def thumbnail_url(filename: Optional[str], size: int = DEFAULT_THUMBNAIL_SIZE) -> Optional[str]:
+    if not filename:
+        return None
+    return f"/thumbnails/{image_key(filename)}/{size}"
+
+
+def find_original(key: str) -> Optional[str]:
+    matches = glob.glob(os.path.join(UPLOAD_FOLDER, f"{glob.escape(key)}_*"))
+    return matches[0] if matches else None
+
+
+def _write_atomic(path: str, encoded: np.ndarray) -> None:
+    # 백그라운드 생성(schedule_thumbnails)과 요청 시 생성(resolve_thumbnail)이 같은 썸네일을 동시에 만들 수 있으므로
+    # 임시 파일 이름을 호출마다 고유하게 만들고, 완성된 파일만 원자적으로 교체
+    fd, partial_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            encoded.tofile(f)
+        os.chmod(partial_path, 0o644)
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+
+def generate_thumbnails(image_path: str, key: Optional[str] = None) -> Dict[int, List[str]]:
+    """
+    원본을 한 번만 디코딩해 큰 크기부터 차례로 축소하며 모든 크기/형식의 썸네일을 만듭니다.
+    이미 있는 파일은 건너뜁니다.
+
+    Returns:
+        dict: {크기: [생성된 파일 경로, ...]}
+    """
+    key = key or image_key(os.path.basename(image_path))
+    image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if image is None:
+        print(f"썸네일 생성 실패: 이미지를 읽을 수 없습니다. 경로: {image_path}")
+        return {}
+
+    created: Dict[int, List[str]] = {}
+    for size in sorted(THUMBNAIL_SIZES, reverse=True):
+        height, width = image.shape[:2]
+        scale = size / max(height, width)
+        if scale < 1:
+            # 이전(더 큰) 썸네일에서 축소하므로 원본 전체를 매번 다시 처리하지 않음
+            image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+        for extension, _, params in FORMATS:
+            path = thumbnail_path(key, size, extension)
+            if os.path.exists(path):
+                continue
+            ok, encoded = cv2.imencode(f".{extension}", image, params)
+            if not ok:
+                continue
+            _write_atomic(path, encoded)
+            created.setdefault(size, []).append(path)
+    return created
+
+
+def schedule_thumbnails(image_path: str) -> None:
+    """요청 응답을 막지 않도록 썸네일 생성을 백그라운드 스레드에서 실행합니다."""
+    async def run() -> None:
+        try:
+            await asyncio.to_thread(generate_thumbnails, image_path)
+        except Exception as e:
+            print(f"썸네일 생성 실패: {e}")
+
+    task = asyncio.create_task(run())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def negotiate_format(accept: str) -> Optional[Tuple[str, str]]:
+    """Accept 헤더에서 클라이언트가 받을 수 있는 가장 작은 형식(AVIF > WebP)을 고릅니다."""
+    accept = accept.lower()
+    for extension, mime, _ in FORMATS:
+        if mime in accept:
+            return extension, mime
+    return None
+
+
+async def resolve_thumbnail(key: str, size: int, extension: str) -> Optional[str]:
+    """썸네일 파일 경로를 반환합니다. 아직 생성되지 않았으면 그 자리에서 생성합니다."""
+    path = thumbnail_path(key, size, extension)
+    if os.path.exists(path):
+        return path
+    original = find_original(key)
+    if original is None:
+        return None
+    await asyncio.to_thread(generate_thumbnails, original, key)
+    return path if os.path.exists(path) else None
+
+
+def make_etag(path: str) -> str:
+    stat = os.stat(path)
+    return f'"{os.path.basename(path)}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 목록 중 하나가 etag와 같은지 확인합니다 (약한 비교: W/ 접두사 무시, `*`는 항상 일치)."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,240 @@
+# upload_handler.py
+
+import asyncio
+import json
+import os
+import struct
+from typing import NamedTuple, Optional, Sequence
+
+import cv2
+from fastapi import HTTPException, UploadFile
+
+# 업로드 제한 설정
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_FILE_SIZE", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+# 헤더(크기 정보)를 이 바이트 안에서 찾지 못하면 이미지가 아닌 것으로 간주
+HEADER_SNIFF_LIMIT = 256 * 1024
+# multipart 경계/필드 등 파일 외 요청 본문 여유분
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# 이미지 크기 제한: 압축 폭탄 방지용 최대 픽셀 수, 저장본의 최대 변 길이, 최소 변 길이
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000)))
+MAX_IMAGE_DIMENSION = int(os.getenv("MAX_IMAGE_DIMENSION", "2048"))
+MIN_IMAGE_DIMENSION = 64
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# 크기 정보를 담은 JPEG SOF 마커 (DHT/JPG/DAC 제외)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# 길이 필드가 없는 JPEG 마커
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+
+class UploadRejectedError(Exception):
+    """업로드를 조기에 거부할 때 발생합니다. status_code는 그대로 HTTP 응답 코드로 사용합니다."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+class ImageHeader(NamedTuple):
+    format: str
+    width: int
+    height: int
+
+
+def _sniff_jpeg(head: bytes) -> Optional[ImageHeader]:
+    pos = 2
+    while True:
+        # 마커 앞의 0xFF 채움 바이트 건너뛰기
+        while pos < len(head) and head[pos] == 0xFF:
+            pos += 1
+        if pos >= len(head):
+            return None
+        if head[pos - 1] != 0xFF:
+            raise UploadRejectedError(415, "손상된 JPEG 이미지입니다.")
+        marker = head[pos]
+        pos += 1
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise UploadRejectedError(415, "JPEG 이미지에서 크기 정보를 찾을 수 없습니다.")
+        if pos + 2 > len(head):
+            return None
+        segment_length = struct.unpack(">H", head[pos:pos + 2])[0]
+        if marker in _JPEG_SOF_MARKERS:
+            if pos + 7 > len(head):
+                return None
+            height, width = struct.unpack(">HH", head[pos + 3:pos + 7])
+            return ImageHeader("jpeg", width, height)
+        pos += segment_length
+
+
+def sniff_image(head: bytes) -> Optional[ImageHeader]:
+    """
+    파일 앞부분만으로 이미지 형식과 크기를 확인합니다 (전체 디코딩 없음).
+
+    Returns:
+        ImageHeader 또는 판단하기에 데이터가 부족하면 None.
+
+    Raises:
+        UploadRejectedError: 지원하지 않는 형식이거나 헤더가 손상된 경우.
+    """
+    if len(head) < 8:
+        return None
+    if head.startswith(_PNG_SIGNATURE):
+        if len(head) < 24:
+            return None
+        if head[12:16] != b"IHDR":
+            raise UploadRejectedError(415, "손상된 PNG 이미지입니다.")
+        width, height = struct.unpack(">II", head[16:24])
+        return ImageHeader("png", width, height)
+    if head.startswith(b"\xff\xd8"):
+        return _sniff_jpeg(head)
+    raise UploadRejectedError(415, "PNG 또는 JPEG 이미지만 업로드할 수 있습니다.")
+
+
+def validate_dimensions(header: ImageHeader) -> None:
+    if header.width * header.height > MAX_IMAGE_PIXELS:
+        raise UploadRejectedError(413, "이미지 해상도가 너무 큽니다.")
+    if min(header.width, header.height) < MIN_IMAGE_DIMENSION:
+        raise UploadRejectedError(400, "이미지가 너무 작습니다.")
+
+
+async def save_upload(upload: UploadFile, dest_path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> ImageHeader:
+    """
+    업로드 파일을 청크 단위로 읽어 저장합니다. 전체를 메모리에 올리지 않고,
+    크기 한도 초과나 이미지가 아닌 내용은 첫 청크들에서 바로 거부합니다.
+    파일 열기/쓰기/닫기는 디스크 I/O로 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+    """
+    partial_path = f"{dest_path}.part"
+    header: Optional[ImageHeader] = None
+    head = bytearray()
+    size = 0
+    try:
+        f = await asyncio.to_thread(open, partial_path, "wb")
+        try:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejectedError(413, f"파일 크기는 {max_bytes // (1024 * 1024)}MB를 넘을 수 없습니다.")
+                if header is None:
+                    head += chunk
+                    header = sniff_image(bytes(head))
+                    if header is not None:
+                        validate_dimensions(header)
+                        head = bytearray()
+                    elif len(head) >= HEADER_SNIFF_LIMIT:
+                        raise UploadRejectedError(415, "이미지 크기 정보를 찾을 수 없습니다.")
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        if header is None:
+            raise UploadRejectedError(415, "이미지 파일이 비어 있거나 잘렸습니다.")
+        await asyncio.to_thread(os.replace, partial_path, dest_path)
+        return header
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+
+def downsample_if_needed(image_path: str, header: ImageHeader, max_dimension: int = MAX_IMAGE_DIMENSION) -> ImageHeader:
+    """
+    긴 변이 max_dimension을 넘으면 저장본을 축소해 덮어씁니다 (디스크/썸네일/재전송 비용 절감).
+    기하학 지표 중 기울기/각도는 픽셀 단위이고 규칙 임계값도 픽셀 기준이라 해상도에 따라 값이 달라지므로,
+    반드시 분석이 끝난 뒤에 호출해야 합니다.
+    JPEG는 IMREAD_REDUCED_* 로 디코딩 단계에서부터 1/2~1/8 크기로 읽어 메모리와 시간을 줄입니다.
+    """
+    long_side = max(header.width, header.height)
+    if long_side <= max_dimension:
+        return header
+
+    read_flag = cv2.IMREAD_COLOR
+    if header.format == "jpeg":
+        for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if long_side // factor >= max_dimension:
+                read_flag = flag
+                break
+    image = cv2.imread(image_path, read_flag)
+    if image is None:
+        raise UploadRejectedError(415, "이미지를 디코딩할 수 없습니다.")
+
+    height, width = image.shape[:2]
+    scale = max_dimension / max(height, width)
+    if scale < 1:
+        image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+        height, width = image.shape[:2]
+
+    extension = ".png" if header.format == "png" else ".jpg"
+    ok, encoded = cv2.imencode(extension, image, [cv2.IMWRITE_JPEG_QUALITY, 92] if extension == ".jpg" else [])
+    if not ok:
+        raise UploadRejectedError(415, "이미지를 다시 저장할 수 없습니다.")
+    partial_path = f"{image_path}.part"
+    encoded.tofile(partial_path)
+    os.replace(partial_path, image_path)
+    return ImageHeader(header.format, width, height)
+
+
+class _BodyTooLarge(HTTPException):
+    # FastAPI는 본문 파싱 중 HTTPException이 아닌 예외를 400으로 바꾸므로 HTTPException으로 전달
+    def __init__(self):
+        super().__init__(status_code=413, detail="요청 본문이 너무 큽니다.")
+
+
+class UploadSizeLimitMiddleware:
+    """
+    지정한 경로의 요청 본문 크기를 multipart 파싱 전에 제한하는 ASGI 미들웨어입니다.
+    Content-Length가 한도를 넘으면 본문을 읽지 않고 413을 반환하고,
+    길이가 없는(chunked) 요청은 받은 바이트를 세다가 한도를 넘는 순간 중단합니다.
+    """
+
+    def __init__(self, app, paths: Sequence[str], max_body_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.paths = tuple(paths)
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_body_bytes:
+                await self._reject(send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise _BodyTooLarge()
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if not response_started:
+                await self._reject(send)
+
+    async def _reject(self, send) -> None:
+        body = json.dumps({"detail": "요청 본문이 너무 큽니다."}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,120 @@
+# bench_db_writes.py
+"""
+분석 결과 저장 쓰기 처리량 벤치마크.
+
+기본 SQLite 엔진(롤백 저널, 요청마다 커밋)과 튜닝된 엔진(WAL + PRAGMA),
+튜닝된 비동기 엔진 + 묶음 커밋(WriteBatcher)을 같은 동시성으로 비교합니다.
+
+실행 (Physiognomy/backend 에서):
+    python -m benchmarks.bench_db_writes --threads 8 --writes 200
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import WriteBatcher, create_async_db_engine, create_db_engine
+
+
+def _new_result(thread_id: int, i: int) -> models.AnalysisResult:
+    return models.AnalysisResult(
+        original_filename=f"bench_{thread_id}_{i}.jpg",
+        image_path=f"bench_{thread_id}_{i}.jpg",
+        report="벤치마크 리포트 " * 50,
+        interpretation_keys="EYE_SIZE_LARGE,FACE_SHAPE_OVAL",
+    )
+
+
+def _run_threads(threads: int, writes: int, write_one) -> float:
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(thread_id: int) -> None:
+        start_barrier.wait()
+        for i in range(writes):
+            write_one(thread_id, i)
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def bench_commit_per_write(url: str, threads: int, writes: int, tuned: bool = True) -> float:
+    engine = create_db_engine(url) if tuned else create_engine(url, connect_args={"check_same_thread": False})
+    Session = sessionmaker(bind=engine)
+
+    def write_one(thread_id: int, i: int) -> None:
+        with Session() as db:
+            db.add(_new_result(thread_id, i))
+            db.commit()
+
+    elapsed = _run_threads(threads, writes, write_one)
+    engine.dispose()
+    return elapsed
+
+
+def bench_batched(url: str, threads: int, writes: int) -> float:
+    """묶음 커밋은 이벤트 루프에서 동작하므로 스레드 대신 같은 수의 동시 코루틴으로 측정합니다."""
+    async def run() -> float:
+        async_engine = create_async_db_engine(url)
+        batcher = WriteBatcher(session_factory=async_sessionmaker(async_engine, expire_on_commit=False))
+
+        def insert(db, result):
+            db.add(result)
+            db.flush()
+            return result.id
+
+        async def client(thread_id: int) -> None:
+            for i in range(writes):
+                result = _new_result(thread_id, i)
+                await batcher.run(lambda db: insert(db, result))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(t) for t in range(threads)))
+        elapsed = time.perf_counter() - started
+        print(f"    묶음 통계: {batcher.stats()}")
+        await batcher.stop()
+        await async_engine.dispose()
+        return elapsed
+
+    return asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="분석 결과 저장 쓰기 처리량 벤치마크")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="스레드당 쓰기 횟수")
+    args = parser.parse_args()
+
+    total = args.threads * args.writes
+    scenarios = [
+        ("기본 엔진, 쓰기마다 커밋", lambda url, t, w: bench_commit_per_write(url, t, w, tuned=False)),
+        ("WAL 튜닝 엔진, 쓰기마다 커밋", bench_commit_per_write),
+        ("WAL 튜닝 비동기 엔진, 묶음 커밋", bench_batched),
+    ]
+
+    print(f"스레드 {args.threads}개 x {args.writes}회 = {total}건")
+    with tempfile.TemporaryDirectory() as tmp:
+        for index, (name, bench) in enumerate(scenarios):
+            url = f"sqlite:///{os.path.join(tmp, f'bench_{index}.db')}"
+            schema_engine = create_engine(url)
+            models.Base.metadata.create_all(bind=schema_engine)
+            schema_engine.dispose()
+            elapsed = bench(url, args.threads, args.writes)
+            print(f"  {name}: {elapsed:.2f}s, {total / elapsed:,.0f} writes/s")
+
+
+if __name__ == "__main__":
+    main()
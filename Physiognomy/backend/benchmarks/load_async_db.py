@@ -0,0 +1,169 @@
+# load_async_db.py
+"""
+동기 세션 vs 비동기 세션 부하 테스트.
+
+`/analyze/`의 저장 단계와 `/analyses/` 조회를 흉내 낸 작은 FastAPI 앱 두 개를 만들고,
+같은 동시성으로 요청을 보내면서 처리량, 응답 지연, 이벤트 루프 지연(heartbeat)을 비교합니다.
+- sync: async 엔드포인트 안에서 동기 SessionLocal로 commit/refresh (기존 방식, 이벤트 루프를 막음)
+- async: AsyncSession 조회 + WriteBatcher 묶음 커밋
+
+실행 (Physiognomy/backend 에서):
+    python -m benchmarks.load_async_db --concurrency 64 --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import models
+from app.database import WriteBatcher, configure_sqlite, create_async_db_engine
+from app.services.analysis_history import query_history_page
+
+REPORT = "벤치마크 리포트 " * 50
+
+
+def build_sync_app(url: str, concurrency: int) -> FastAPI:
+    # 이벤트 루프가 풀 대기에 막혀 교착되지 않도록 동시성만큼 커넥션을 둡니다.
+    engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=concurrency, max_overflow=0)
+    configure_sqlite(engine)
+    Session_ = sessionmaker(bind=engine, autoflush=False)
+    app = FastAPI()
+
+    def get_db():
+        with Session_() as db:
+            yield db
+
+    @app.post("/analyze/")
+    async def analyze(db: Session = Depends(get_db)):
+        db_result = models.AnalysisResult(original_filename="load.jpg", image_path="load.jpg", report=REPORT)
+        db.add(db_result)
+        db.commit()
+        db.refresh(db_result)
+        return {"analysis_id": db_result.id}
+
+    @app.get("/analyses/")
+    async def analyses(db: Session = Depends(get_db)):
+        rows = db.execute(
+            select(models.AnalysisResult.id, models.AnalysisResult.created_at)
+            .order_by(models.AnalysisResult.created_at.desc(), models.AnalysisResult.id.desc())
+            .limit(10)
+        ).all()
+        return {"items": [row.id for row in rows]}
+
+    app.state.close = lambda: _dispose_sync(engine)
+    return app
+
+
+async def _dispose_sync(engine) -> None:
+    engine.dispose()
+
+
+def build_async_app(url: str, concurrency: int) -> FastAPI:
+    async_engine = create_async_db_engine(url)
+    AsyncSession_ = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    batcher = WriteBatcher(session_factory=AsyncSession_)
+    app = FastAPI()
+
+    async def get_db():
+        async with AsyncSession_() as db:
+            yield db
+
+    def insert(db, db_result):
+        db.add(db_result)
+        db.flush()
+        return db_result.id
+
+    @app.post("/analyze/")
+    async def analyze():
+        db_result = models.AnalysisResult(original_filename="load.jpg", image_path="load.jpg", report=REPORT)
+        return {"analysis_id": await batcher.run(lambda db: insert(db, db_result))}
+
+    @app.get("/analyses/")
+    async def analyses(db: AsyncSession = Depends(get_db)):
+        page = await query_history_page(db, limit=10)
+        return {"items": [item["id"] for item in page["items"]]}
+
+    async def close() -> None:
+        await batcher.stop()
+        await async_engine.dispose()
+
+    app.state.close = close
+    return app
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list, interval: float = 0.005) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run_load(app: FastAPI, concurrency: int, total_requests: int) -> dict:
+    latencies = []
+    lags = []
+    counter = iter(range(total_requests))
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def user() -> None:
+            for i in counter:
+                started = time.perf_counter()
+                # 쓰기 3 : 읽기 1 비율
+                if i % 4 == 3:
+                    response = await client.get("/analyses/")
+                else:
+                    response = await client.post("/analyze/")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    stop.set()
+    await heartbeat
+    await app.state.close()
+
+    latencies.sort()
+    return {
+        "rps": total_requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "loop_lag_max_ms": max(lags, default=0.0) * 1000,
+        "loop_lag_p95_ms": (sorted(lags)[int(len(lags) * 0.95) - 1] * 1000) if lags else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="동기 vs 비동기 DB 세션 부하 테스트")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"동시 사용자 {args.concurrency}명, 요청 {args.requests}건 (쓰기 3 : 읽기 1)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, build in (("sync 세션", build_sync_app), ("async 세션 + 묶음 커밋", build_async_app)):
+            url = f"sqlite:///{os.path.join(tmp, name.split()[0] + '.db')}"
+            schema_engine = create_engine(url)
+            models.Base.metadata.create_all(bind=schema_engine)
+            schema_engine.dispose()
+            result = asyncio.run(run_load(build(url, args.concurrency), args.concurrency, args.requests))
+            print(
+                f"  {name}: {result['rps']:,.0f} req/s, p50 {result['p50_ms']:.1f}ms, p95 {result['p95_ms']:.1f}ms, "
+                f"이벤트 루프 지연 p95 {result['loop_lag_p95_ms']:.1f}ms / 최대 {result['loop_lag_max_ms']:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
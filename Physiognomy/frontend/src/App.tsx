@@ -106,14 +106,21 @@ const App: React.FC = () => {
     setCharmError(null);
 
     try {
-                const response = await axios.post('http://localhost:8001/generate-charm/', { 
+        // 부적 생성 작업 등록 후, 완료될 때까지 롱 폴링으로 상태 조회
+        const submitResponse = await axios.post('http://localhost:8001/generate-charm/', {
             prompt: charmPrompt,
             analysis_id: analysisId
         });
-        if (response.data.success) {
-            setLuckyCharmImageUrl(`http://localhost:8001${response.data.lucky_charm_image_url}`);
+        const statusUrl = `http://localhost:8001${submitResponse.data.status_url}`;
+        let job = submitResponse.data;
+        while (job.status === 'queued' || job.status === 'running') {
+            const statusResponse = await axios.get(statusUrl, { params: { wait: 25 } });
+            job = statusResponse.data;
+        }
+        if (job.status === 'succeeded' && job.lucky_charm_image_url) {
+            setLuckyCharmImageUrl(`http://localhost:8001${job.lucky_charm_image_url}`);
         } else {
-            setCharmError(response.data.detail || '부적 생성에 실패했습니다.');
+            setCharmError(job.error || '부적 생성에 실패했습니다.');
         }
     } catch (err) {
         setCharmError('부적 생성 중 오류가 발생했습니다.');
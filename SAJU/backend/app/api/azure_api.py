@@ -5,11 +5,10 @@ Azure OpenAI API 라우터 - 완전 독립형
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import JSONResponse
 from app.models.saju import BirthInfoRequest
-from app.services.saju_analyzer import saju_analyzer
+from app.services.single_flight import analyze_saju_shared
 from app.services.azure_openai_service import get_azure_service
 import logging
 from typing import Dict, Any
-import traceback
 
 # 로깅 설정
 logger = logging.getLogger(__name__)
@@ -35,7 +34,7 @@ def safe_convert_to_dict(obj) -> Any:
         else:
             return obj
     except Exception as e:
-        logger.error(f"객체 변환 실패: {e}")
+        logger.error("객체 변환 실패: %s", e)
         return str(obj)
 
 
@@ -61,10 +60,11 @@ async def azure_chat(
 ):
     """Azure OpenAI 사주 채팅"""
     try:
-        logger.info(f"Azure 채팅 요청: {question} (사용자: {birth_info.name})")
+        logger.info("Azure 채팅 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
+        logger.debug("Azure 채팅 질문: %s", question)
         
         # 1. 사주 분석 (기존 analyzer 사용)
-        raw_result = saju_analyzer.analyze_saju(birth_info)
+        raw_result = await analyze_saju_shared(birth_info)
         saju_data = safe_convert_to_dict(raw_result)
         
         # 2. Azure OpenAI 해석
@@ -86,8 +86,7 @@ async def azure_chat(
         }
         
     except Exception as e:
-        logger.error(f"Azure 채팅 오류: {e}")
-        logger.error(f"상세 에러: {traceback.format_exc()}")
+        logger.exception("Azure 채팅 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"Azure 채팅 실패: {str(e)}")
 
 
@@ -95,10 +94,10 @@ async def azure_chat(
 async def azure_questions(birth_info: BirthInfoRequest):
     """Azure OpenAI 개인화된 질문 생성"""
     try:
-        logger.info(f"Azure 질문 생성 요청: {birth_info.name}")
+        logger.info("Azure 질문 생성 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         
         # 1. 사주 분석
-        raw_result = saju_analyzer.analyze_saju(birth_info)
+        raw_result = await analyze_saju_shared(birth_info)
         saju_data = safe_convert_to_dict(raw_result)
         
         # 2. Azure OpenAI 질문 생성
@@ -111,8 +110,7 @@ async def azure_questions(birth_info: BirthInfoRequest):
         }
         
     except Exception as e:
-        logger.error(f"Azure 질문 생성 오류: {e}")
-        logger.error(f"상세 에러: {traceback.format_exc()}")
+        logger.exception("Azure 질문 생성 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"Azure 질문 생성 실패: {str(e)}")
 
 
@@ -120,10 +118,10 @@ async def azure_questions(birth_info: BirthInfoRequest):
 async def azure_analyze(birth_info: BirthInfoRequest):
     """Azure OpenAI 통합 사주 분석 (기존 analyze + Azure AI 해석)"""
     try:
-        logger.info(f"Azure 통합 분석 요청: {birth_info.name}")
+        logger.info("Azure 통합 분석 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         
         # 1. 기본 사주 분석
-        raw_result = saju_analyzer.analyze_saju(birth_info)
+        raw_result = await analyze_saju_shared(birth_info)
         saju_data = safe_convert_to_dict(raw_result)
         
         # 2. 기본 질문으로 AI 해석 추가
@@ -168,8 +166,7 @@ async def azure_analyze(birth_info: BirthInfoRequest):
         return JSONResponse(content=response_data)
         
     except Exception as e:
-        logger.error(f"Azure 통합 분석 오류: {e}")
-        logger.error(f"상세 에러: {traceback.format_exc()}")
+        logger.exception("Azure 통합 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"Azure 통합 분석 실패: {str(e)}")
 
 
@@ -5,14 +5,15 @@
 - 프론트엔드 호환성 보장
 """
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
+from app.core.responses import UnicodeJSONResponse as JSONResponse
 from app.models.saju import BirthInfoRequest
 from app.services.saju_analyzer import saju_analyzer
+from app.services.single_flight import analyze_saju_shared
+from app.services.chat_sessions import chat_sessions
 from app.services.gemini_ai_interpreter import get_gemini_interpreter
 from app.services.extended_fortune_analyzer import extended_fortune_analyzer
 import logging
 from typing import Optional, Dict, Any
-import traceback
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -183,7 +184,7 @@ def safe_convert_to_dict(obj) -> Dict[str, Any]:
         else:
             return obj
     except Exception as e:
-        logger.error(f"객체 변환 실패: {e}")
+        logger.error("객체 변환 실패: %s", e)
         return str(obj)
 
 @router.post("/analyze")
@@ -198,33 +199,29 @@ async def analyze_saju_simple(birth_info: BirthInfoRequest):
         완전한 사주 분석 결과
     """
     try:
-        logger.info(f"=== 사주 분석 요청 시작 ===")
-        logger.info(f"입력 데이터: {birth_info.dict()}")
+        # 요청마다 남는 로그라 인자는 지연 포맷팅 (레벨/샘플링으로 걸러지면 문자열로 만들지 않음)
+        logger.debug("사주 분석 요청: %s", birth_info)
         
         # 1. 입력 검증
         _validate_birth_info(birth_info)
         
         # 2. 사주 분석 실행
-        logger.info("사주 분석 실행 중...")
-        raw_result = saju_analyzer.analyze_saju(birth_info)
-        logger.info(f"사주 분석 완료. 결과 타입: {type(raw_result)}")
+        raw_result = await analyze_saju_shared(birth_info)
         
         # 3. dict로 변환
         analysis_result = safe_convert_to_dict(raw_result)
-        logger.info(f"변환 완료. 키들: {list(analysis_result.keys()) if isinstance(analysis_result, dict) else 'Not dict'}")
         
         # 4. 프론트엔드 호환 형식으로 변환
         response_data = _format_for_frontend(analysis_result, birth_info)
         
-        logger.info("응답 데이터 생성 완료")
+        logger.info("사주 분석 완료", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         return JSONResponse(content=response_data)
         
     except ValueError as e:
-        logger.error(f"입력 검증 오류: {e}")
+        logger.error("입력 검증 오류: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"사주 분석 중 오류 발생: {e}")
-        logger.error(f"상세 에러: {traceback.format_exc()}")
+        logger.exception("사주 분석 중 오류 발생: %s", e)
         raise HTTPException(status_code=500, detail=f"사주 분석 실패: {str(e)}")
 
 def _validate_birth_info(birth_info: BirthInfoRequest):
@@ -310,7 +307,7 @@ def _format_for_frontend(analysis_result: Dict[str, Any], birth_info: BirthInfoR
         }
         
     except Exception as e:
-        logger.error(f"프론트엔드 형식 변환 오류: {e}")
+        logger.error("프론트엔드 형식 변환 오류: %s", e)
         # 최소한의 기본 응답
         return {
             "basic_info": {
@@ -340,18 +337,18 @@ def _format_for_frontend(analysis_result: Dict[str, Any], birth_info: BirthInfoR
 async def analyze_daeun(birth_info: BirthInfoRequest):
     """대운 분석 API"""
     try:
-        logger.info(f"대운 분석 요청: {birth_info.dict()}")
+        logger.info("대운 분석 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         
         # 1. 입력 검증
         _validate_birth_info(birth_info)
         
         # 2. 사주팔자 추출
         palja = saju_analyzer.extract_palja(birth_info)
-        logger.info(f"사주팔자 추출 완료")
+        logger.info("사주팔자 추출 완료")
         
         # 3. 대운 분석
         daeun_analysis = saju_analyzer.calculate_daeun(birth_info, palja)
-        logger.info(f"대운 분석 완료: 총 {len(daeun_analysis.get('daeun_list', []))}개 대운")
+        logger.info("대운 분석 완료: 총 %s개 대운", len(daeun_analysis.get('daeun_list', [])))
         
         # 4. 응답 구성
         response = {
@@ -372,15 +369,14 @@ async def analyze_daeun(birth_info: BirthInfoRequest):
         return JSONResponse(content=response)
         
     except Exception as e:
-        logger.error(f"대운 분석 오류: {e}")
-        logger.error(f"상세 에러: {traceback.format_exc()}")
+        logger.exception("대운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"대운 분석 실패: {str(e)}")
 
 @router.post("/saeun")
 async def analyze_saeun(birth_info: BirthInfoRequest, target_year: int = Query(None, description="분석 대상 연도")):
     """세운 분석 API"""
     try:
-        logger.info(f"세운 분석 요청: {birth_info.dict()}, 대상연도: {target_year}")
+        logger.info("세운 분석 요청: 대상연도 %s", target_year, extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         
         # 1. 입력 검증
         _validate_birth_info(birth_info)
@@ -392,11 +388,11 @@ async def analyze_saeun(birth_info: BirthInfoRequest, target_year: int = Query(N
         
         # 2. 사주팔자 추출
         palja = saju_analyzer.extract_palja(birth_info)
-        logger.info(f"사주팔자 추출 완료")
+        logger.info("사주팔자 추출 완료")
         
         # 3. 세운 분석
         saeun_analysis = saju_analyzer.calculate_saeun(birth_info, palja, target_year)
-        logger.info(f"세운 분석 완료: 대상년도 {target_year}")
+        logger.info("세운 분석 완료: 대상년도 %s", target_year)
         
         # 4. 응답 구성
         response = {
@@ -418,8 +414,7 @@ async def analyze_saeun(birth_info: BirthInfoRequest, target_year: int = Query(N
         return JSONResponse(content=response)
         
     except Exception as e:
-        logger.error(f"세운 분석 오류: {e}")
-        logger.error(f"상세 에러: {traceback.format_exc()}")
+        logger.exception("세운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"세운 분석 실패: {str(e)}")
 
 # AI 관련 엔드포인트들
@@ -430,10 +425,11 @@ async def ai_chat_interpretation(
 ):
     """AI 대화형 사주 해석 - 간소화 버전"""
     try:
-        logger.info(f"AI 채팅 요청: {question}")
+        logger.info("AI 채팅 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
+        logger.debug("AI 채팅 질문: %s", question)
         
         # 1. 사주 분석
-        raw_result = saju_analyzer.analyze_saju(birth_info)
+        raw_result = await analyze_saju_shared(birth_info)
         analysis_dict = safe_convert_to_dict(raw_result)
         
         # 2. AI 해석
@@ -453,9 +449,78 @@ async def ai_chat_interpretation(
         }
         
     except Exception as e:
-        logger.error(f"AI 해석 오류: {e}")
+        logger.error("AI 해석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"AI 해석 실패: {str(e)}")
 
+# 채팅 세션 엔드포인트들 (분석은 세션 생성 시 1회, 이후 턴은 세션 ID + 질문만)
+@router.post("/chat-sessions")
+async def create_chat_session(birth_info: BirthInfoRequest):
+    """AI 상담 채팅 세션 생성 - 사주 분석과 프롬프트용 요약을 미리 계산해 저장"""
+    try:
+        _validate_birth_info(birth_info)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        raw_result = await analyze_saju_shared(birth_info)
+        saju_context = get_gemini_interpreter().create_saju_context(safe_convert_to_dict(raw_result))
+        session = chat_sessions.create(birth_info.dict(), saju_context)
+    except Exception as e:
+        logger.error("채팅 세션 생성 오류: %s", e)
+        raise HTTPException(status_code=500, detail=f"채팅 세션 생성 실패: {str(e)}")
+
+    return {
+        "success": True,
+        "data": {
+            "session_id": session.session_id,
+            "basic_info": {
+                "name": birth_info.name,
+                "birth_date": f"{birth_info.year}년 {birth_info.month}월 {birth_info.day}일 {birth_info.hour}시"
+            },
+            "idle_ttl_seconds": chat_sessions.ttl_seconds
+        }
+    }
+
+def _get_chat_session(session_id: str):
+    session = chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="채팅 세션이 없거나 만료되었습니다. 세션을 다시 생성해주세요.")
+    return session
+
+@router.post("/chat-sessions/{session_id}/messages")
+async def send_chat_message(
+    session_id: str,
+    question: str = Query(..., description="사용자 질문")
+):
+    """채팅 세션에 질문 전송 - 저장된 사주 요약과 이전 대화(요약)를 함께 사용"""
+    session = _get_chat_session(session_id)
+    async with session.lock:
+        ai_interpreter = get_gemini_interpreter()
+        ai_result = await ai_interpreter.interpret_chat_turn(session.saju_context, session.history_text(), question)
+        if ai_result.get("success"):
+            chat_sessions.add_turn(session, question, ai_result["ai_interpretation"])
+
+    return {
+        "success": True,
+        "data": {
+            "session_id": session.session_id,
+            "turn": session.total_turns,
+            "user_question": question,
+            "ai_interpretation": ai_result
+        }
+    }
+
+@router.get("/chat-sessions/{session_id}")
+async def get_chat_session(session_id: str):
+    """채팅 세션의 대화 기록 조회 (오래된 대화는 요약으로 표시)"""
+    return {"success": True, "data": _get_chat_session(session_id).to_dict()}
+
+@router.delete("/chat-sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """채팅 세션 종료"""
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="채팅 세션이 없거나 만료되었습니다.")
+    return {"success": True}
+
 @router.get("/ai-usage")
 async def get_ai_usage():
     """AI 사용량 조회"""
@@ -473,10 +538,10 @@ async def generate_suggested_questions(
 ):
     """사주 분석 결과 기반 개인화된 예상 질문 생성 - 하이브리드 방식"""
     try:
-        logger.info(f"예상 질문 생성 요청: {birth_info.name}, 방식: {method}")
+        logger.info("예상 질문 생성 요청: 방식 %s", method, extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         
         # 1. 사주 분석 (기존 로직 재사용)
-        raw_result = saju_analyzer.analyze_saju(birth_info)
+        raw_result = await analyze_saju_shared(birth_info)
         analysis_dict = safe_convert_to_dict(raw_result)
         
         # 2. 하이브리드 방식으로 질문 생성
@@ -493,7 +558,7 @@ async def generate_suggested_questions(
                 questions_result = await _generate_ai_questions(analysis_dict, birth_info)
                 questions_result["generation_method"] = "ai"
             except Exception as e:
-                logger.warning(f"AI 질문 생성 실패, 룰 기반으로 폴백: {e}")
+                logger.warning("AI 질문 생성 실패, 룰 기반으로 폴백: %s", e)
                 questions_result = _generate_rule_based_questions(analysis_dict, birth_info)
                 questions_result["generation_method"] = "rules_fallback"
         
@@ -503,8 +568,7 @@ async def generate_suggested_questions(
         })
         
     except Exception as e:
-        logger.error(f"질문 생성 실패: {e}")
-        logger.error(f"상세 에러: {traceback.format_exc()}")
+        logger.exception("질문 생성 실패: %s", e)
         
         # 최후 폴백: 기본 질문들
         fallback_questions = _get_fallback_questions()
@@ -539,7 +603,7 @@ async def analyze_extended_fortune(birth_info: BirthInfoRequest):
         주거운, 교통운, 소셜운, 취미운 분석 결과
     """
     try:
-        logger.info(f"확장 운세 분석 요청: {birth_info.name}({birth_info.gender})")
+        logger.info("확장 운세 분석 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         
         # 출생 정보를 dict로 변환
         birth_data = {
@@ -576,8 +640,7 @@ async def analyze_extended_fortune(birth_info: BirthInfoRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"확장 운세 분석 오류: {e}")
-        logger.error(f"상세 오류: {traceback.format_exc()}")
+        logger.exception("확장 운세 분석 오류: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"확장 운세 분석 중 오류가 발생했습니다: {str(e)}"
@@ -595,7 +658,7 @@ async def analyze_residence_fortune_only(birth_info: BirthInfoRequest):
         주거운 분석 결과 (이사방향, 인테리어, 풍수 등)
     """
     try:
-        logger.info(f"주거운 분석 요청: {birth_info.name}")
+        logger.info("주거운 분석 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         
         birth_data = {
             "year": birth_info.year,
@@ -620,7 +683,7 @@ async def analyze_residence_fortune_only(birth_info: BirthInfoRequest):
         }
         
     except Exception as e:
-        logger.error(f"주거운 분석 오류: {e}")
+        logger.error("주거운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"주거운 분석 실패: {str(e)}")
 
 @router.post("/transportation-fortune")
@@ -650,7 +713,7 @@ async def analyze_transportation_fortune_only(birth_info: BirthInfoRequest):
         }
         
     except Exception as e:
-        logger.error(f"교통운 분석 오류: {e}")
+        logger.error("교통운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"교통운 분석 실패: {str(e)}")
 
 @router.post("/social-fortune")
@@ -680,7 +743,7 @@ async def analyze_social_fortune_only(birth_info: BirthInfoRequest):
         }
         
     except Exception as e:
-        logger.error(f"소셜운 분석 오류: {e}")
+        logger.error("소셜운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"소셜운 분석 실패: {str(e)}")
 
 @router.post("/hobby-fortune")
@@ -710,7 +773,7 @@ async def analyze_hobby_fortune_only(birth_info: BirthInfoRequest):
         }
         
     except Exception as e:
-        logger.error(f"취미운 분석 오류: {e}")
+        logger.error("취미운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"취미운 분석 실패: {str(e)}")
 
 @router.post("/love-fortune")
@@ -725,7 +788,7 @@ async def analyze_love_fortune(birth_info: BirthInfoRequest):
         연애운 상세 분석 결과 (이상형, 연애스타일, 결혼적령기, 월별운세)
     """
     try:
-        logger.info(f"연애운 분석 요청: {birth_info.name}({birth_info.gender})")
+        logger.info("연애운 분석 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         
         # 간단한 연애운 분석 (생년월일 기반)
         # 년도와 월일을 기반으로 일간 추정 (간소화 버전)
@@ -814,8 +877,7 @@ async def analyze_love_fortune(birth_info: BirthInfoRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"연애운 분석 오류: {e}")
-        logger.error(f"상세 오류: {traceback.format_exc()}")
+        logger.exception("연애운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"연애운 분석 실패: {str(e)}")
 
 # Phase 2 확장 운세 엔드포인트들
@@ -823,7 +885,7 @@ async def analyze_love_fortune(birth_info: BirthInfoRequest):
 async def analyze_career_fortune(birth_info: BirthInfoRequest):
     """💼 직업운 상세 분석 API"""
     try:
-        logger.info(f"직업운 분석 요청: {birth_info.dict()}")
+        logger.info("직업운 분석 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         _validate_birth_info(birth_info)
         
         # 직업운 분석 실행
@@ -844,14 +906,14 @@ async def analyze_career_fortune(birth_info: BirthInfoRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"직업운 분석 오류: {e}")
+        logger.error("직업운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"직업운 분석 실패: {str(e)}")
 
 @router.post("/health-fortune")
 async def analyze_health_fortune(birth_info: BirthInfoRequest):
     """🏥 건강운 세분화 API"""
     try:
-        logger.info(f"건강운 분석 요청: {birth_info.dict()}")
+        logger.info("건강운 분석 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         _validate_birth_info(birth_info)
         
         # 건강운 분석 실행
@@ -872,14 +934,14 @@ async def analyze_health_fortune(birth_info: BirthInfoRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"건강운 분석 오류: {e}")
+        logger.error("건강운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"건강운 분석 실패: {str(e)}")
 
 @router.post("/study-fortune")
 async def analyze_study_fortune(birth_info: BirthInfoRequest):
     """📚 학업/자기계발운 API"""
     try:
-        logger.info(f"학업운 분석 요청: {birth_info.dict()}")
+        logger.info("학업운 분석 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         _validate_birth_info(birth_info)
         
         # 학업운 분석 실행
@@ -900,14 +962,14 @@ async def analyze_study_fortune(birth_info: BirthInfoRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"학업운 분석 오류: {e}")
+        logger.error("학업운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"학업운 분석 실패: {str(e)}")
 
 @router.post("/family-fortune")
 async def analyze_family_fortune(birth_info: BirthInfoRequest):
     """👨‍👩‍👧‍👦 가족운 API"""
     try:
-        logger.info(f"가족운 분석 요청: {birth_info.dict()}")
+        logger.info("가족운 분석 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         _validate_birth_info(birth_info)
         
         # 가족운 분석 실행
@@ -928,7 +990,7 @@ async def analyze_family_fortune(birth_info: BirthInfoRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"가족운 분석 오류: {e}")
+        logger.error("가족운 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"가족운 분석 실패: {str(e)}")
 
 # Phase 2 통합 확장 운세 API
@@ -936,7 +998,7 @@ async def analyze_family_fortune(birth_info: BirthInfoRequest):
 async def analyze_extended_fortune_phase2(birth_info: BirthInfoRequest):
     """🔮 Phase 2 확장 운세 통합 분석 API (4개 운세)"""
     try:
-        logger.info(f"Phase 2 확장 운세 분석 요청: {birth_info.dict()}")
+        logger.info("Phase 2 확장 운세 분석 요청", extra={"birth_year": birth_info.year, "gender": birth_info.gender})
         _validate_birth_info(birth_info)
         
         birth_data = birth_info.dict()
@@ -967,7 +1029,7 @@ async def analyze_extended_fortune_phase2(birth_info: BirthInfoRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Phase 2 확장 운세 분석 오류: {e}")
+        logger.error("Phase 2 확장 운세 분석 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"Phase 2 확장 운세 분석 실패: {str(e)}")
 
 @router.get("/health")
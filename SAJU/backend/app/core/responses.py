@@ -0,0 +1,410 @@
+"""
+응답 직렬화 / 압축 / 캐시 계층
+- orjson이 설치되어 있으면 JSON 직렬화에 사용 (없으면 표준 json)
+- Accept-Encoding에 따라 br(brotli 모듈 설치 시) 또는 gzip으로 압축
+- 입력이 같으면 결과가 같은 분석 엔드포인트는 직렬화/압축된 바이트를 캐시하고 ETag로 304 응답 (GET만)
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 압축 설정
+COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+# 응답 캐시 설정
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# 요청 본문이 이보다 크면 캐시하지 않음 (출생 정보 요청은 수백 바이트)
+RESPONSE_CACHE_MAX_REQUEST_BYTES = 16 * 1024
+
+# 출생 정보만으로 결과가 정해지는 엔드포인트 (AI 해석/채팅은 제외)
+CACHEABLE_PATHS = frozenset(
+    "/api/v1/saju/" + name for name in (
+        "analyze", "daeun", "saeun",
+        "extended-fortune", "extended-fortune-phase2",
+        "residence-fortune", "transportation-fortune", "social-fortune", "hobby-fortune",
+        "love-fortune", "career-fortune", "health-fortune", "study-fortune", "family-fortune",
+    )
+)
+
+
+def _replace_non_finite(value):
+    """NaN/Infinity를 None으로 바꾼 사본을 만듭니다 (orjson과 같은 null 출력용)."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _replace_non_finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_non_finite(item) for item in value]
+    return value
+
+
+def _json_dumps(content) -> str:
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    )
+
+
+def dumps(content) -> bytes:
+    """
+    UTF-8 JSON 바이트로 직렬화합니다 (한글은 이스케이프하지 않음).
+    NaN/Infinity는 두 경로 모두 null로 출력합니다 (orjson 기본 동작, 표준 json은 실패 시 값을 바꿔 다시 직렬화).
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    try:
+        return _json_dumps(content).encode("utf-8")
+    except ValueError:
+        return _json_dumps(_replace_non_finite(content)).encode("utf-8")
+
+
+class UnicodeJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """Accept-Encoding에서 q=0이 아닌 인코딩 중 가장 작은 것(br > gzip)을 고릅니다."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip()] = quality
+    candidates = ("br", "gzip") if brotli is not None else ("gzip",)
+    for encoding in candidates:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return body
+
+
+def _get_header(scope, name: bytes) -> str:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+def _set_headers(headers: List[Tuple[bytes, bytes]], updates: Dict[bytes, bytes]) -> List[Tuple[bytes, bytes]]:
+    kept = [(key, value) for key, value in headers if key.lower() not in updates]
+    return kept + list(updates.items())
+
+
+class CompressionMiddleware:
+    """
+    한 번에 전송되는 응답 본문을 Accept-Encoding에 맞춰 압축합니다.
+    이미 Content-Encoding이 있는 응답(캐시된 압축본)과 스트리밍 응답은 그대로 전달합니다.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(_get_header(scope, b"accept-encoding"))
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = dict((key.lower(), value) for key, value in message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if start_message is not None:
+                initial, start_message = start_message, None
+                if message.get("more_body", False) or len(body) < self.minimum_size:
+                    # 스트리밍이거나 작은 응답은 압축하지 않음
+                    passthrough = True
+                    await send(initial)
+                    await send(message)
+                    return
+                body = compress(body, encoding)
+                initial["headers"] = _set_headers(initial.get("headers", []), {
+                    b"content-encoding": encoding.encode("latin-1"),
+                    b"content-length": str(len(body)).encode("latin-1"),
+                    b"vary": b"Accept-Encoding",
+                })
+                await send(initial)
+                await send({"type": "http.response.body", "body": body})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class CachedResponse(NamedTuple):
+    expires_at: float
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    etag: str
+    variants: Dict[str, bytes]  # {"identity" | "gzip" | "br": 본문}
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.variants.values())
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    # 강한 ETag는 표현(압축 방식)마다 달라야 하므로 인코딩을 접미사로 붙임
+    return etag if encoding == "identity" else f'{etag[:-1]}-{encoding}"'
+
+
+class ResponseCache:
+    """요청 지문별로 직렬화/압축된 응답 바이트를 보관하는 LRU 캐시 (바이트 총량 제한)"""
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES, ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        if entry.size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, object]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "serializer": "orjson" if orjson is not None else "json",
+            "encodings": ["br", "gzip"] if brotli is not None else ["gzip"],
+        }
+
+
+response_cache = ResponseCache()
+
+
+def request_fingerprint(method: str, path: str, query_string: bytes, body: bytes) -> str:
+    """메서드, 경로, 쿼리, 정규화한 JSON 본문, 현재 연도로 캐시 키를 만듭니다."""
+    try:
+        normalized = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8") if body else b""
+    except ValueError:
+        normalized = body
+    query = "&".join(sorted(query_string.decode("latin-1").split("&"))) if query_string else ""
+    digest = hashlib.sha256()
+    # 대운/세운 등은 현재 연도를 기준으로 계산하므로 연도가 바뀌면 다른 키
+    for part in (method, path, query, str(datetime.now().year)):
+        digest.update(part.encode("utf-8") + b"\0")
+    digest.update(normalized)
+    return digest.hexdigest()
+
+
+def _etag_matches(if_none_match: str, etags: Iterable[str]) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+class ResponseCacheMiddleware:
+    """
+    CACHEABLE_PATHS 요청의 200 응답을 요청 지문 기준으로 캐시합니다.
+    캐시 적중 시 분석/직렬화/압축 없이 저장된 바이트를 보내고, GET 요청의 If-None-Match가 맞으면 304를 반환합니다.
+    """
+
+    def __init__(self, app, cache: ResponseCache = response_cache, paths: Iterable[str] = CACHEABLE_PATHS):
+        self.app = app
+        self.cache = cache
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths or scope["method"] not in ("GET", "POST"):
+            await self.app(scope, receive, send)
+            return
+
+        # 지문 계산을 위해 본문을 모두 읽고, 하위 앱에는 다시 재생
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                # 본문을 다 받기 전에 연결이 끊김
+                return
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        if size > RESPONSE_CACHE_MAX_REQUEST_BYTES:
+            await self.app(scope, replay_receive, send)
+            return
+
+        key = request_fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+        encoding = choose_encoding(_get_header(scope, b"accept-encoding"))
+        entry = self.cache.get(key)
+        if entry is not None:
+            # 304는 조건부 GET에만 (POST는 캐시된 본문을 그대로 보냄)
+            if_none_match = _get_header(scope, b"if-none-match") if scope["method"] == "GET" else ""
+            await self._send_cached(entry, encoding, if_none_match, send)
+            return
+
+        start_message = None
+        captured: List[bytes] = []
+
+        async def capture_send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] == "http.response.body":
+                # 본문은 모아 두었다가 캐시 저장 후 한 번에 전송
+                captured.append(message.get("body", b""))
+                return
+            await send(message)
+
+        await self.app(scope, replay_receive, capture_send)
+        if start_message is None:
+            return
+
+        response_body = b"".join(captured)
+        headers = [(key_, value) for key_, value in start_message.get("headers", [])
+                   if key_.lower() not in (b"content-length", b"content-encoding", b"etag", b"vary")]
+        if start_message["status"] != 200:
+            await send({**start_message, "headers": headers + [(b"content-length", str(len(response_body)).encode("latin-1"))]})
+            await send({"type": "http.response.body", "body": response_body})
+            return
+
+        entry = await asyncio.to_thread(self._build_entry, start_message["status"], headers, response_body)
+        self.cache.put(key, entry)
+        await self._send_cached(entry, encoding, "", send)
+
+    def _build_entry(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> CachedResponse:
+        # 한 번만 압축해 두고 재사용하므로 최고 압축률로 저장
+        variants = {"identity": body}
+        if len(body) >= COMPRESSION_MIN_BYTES:
+            variants["gzip"] = compress(body, "gzip", gzip_level=9)
+            if brotli is not None:
+                variants["br"] = compress(body, "br", brotli_quality=11)
+        return CachedResponse(
+            expires_at=time.monotonic() + self.cache.ttl_seconds,
+            status=status,
+            headers=headers,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            variants=variants,
+        )
+
+    async def _send_cached(self, entry: CachedResponse, encoding: str, if_none_match: str, send) -> None:
+        if encoding not in entry.variants:
+            # 압축 최소 크기보다 작은 응답은 원본만 저장
+            encoding = "identity"
+        etag = variant_etag(entry.etag, encoding)
+        extra = {b"etag": etag.encode("latin-1"), b"cache-control": b"private, no-cache"}
+        if len(entry.variants) > 1:
+            extra[b"vary"] = b"Accept-Encoding"
+
+        if if_none_match and _etag_matches(if_none_match, (variant_etag(entry.etag, name) for name in entry.variants)):
+            self.cache.not_modified += 1
+            headers = [(key, value) for key, value in entry.headers if key.lower() != b"content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": _set_headers(headers, extra)})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = entry.variants[encoding]
+        extra[b"content-length"] = str(len(body)).encode("latin-1")
+        if encoding != "identity":
+            extra[b"content-encoding"] = encoding.encode("latin-1")
+        await send({"type": "http.response.start", "status": entry.status, "headers": _set_headers(entry.headers, extra)})
+        await send({"type": "http.response.body", "body": body})
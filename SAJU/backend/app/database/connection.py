@@ -1,6 +1,7 @@
 import sqlite3
 import os
 from typing import List, Dict, Any, Optional
+from msp_common.metrics import time_stage
 
 class ManseryukDB:
     """만세력 데이터베이스 연결 및 쿼리 클래스"""
@@ -15,24 +16,25 @@ class ManseryukDB:
     
     def get_birth_data(self, year: int, month: int, day: int) -> Optional[Dict[str, Any]]:
         """생년월일로 만세력 데이터 조회"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            query = """
-                SELECT * FROM calenda_data 
-                WHERE cd_sy = ? AND cd_sm = ? AND cd_sd = ?
-            """
-            cursor.execute(query, (year, month, day))
-            result = cursor.fetchone()
-            
-            if result:
-                columns = [description[0] for description in cursor.description]
-                return dict(zip(columns, result))
-            return None
+        with time_stage("db_lookup"):
+            conn = self.get_connection()
+            cursor = conn.cursor()
             
-        finally:
-            conn.close()
+            try:
+                query = """
+                    SELECT * FROM calenda_data 
+                    WHERE cd_sy = ? AND cd_sm = ? AND cd_sd = ?
+                """
+                cursor.execute(query, (year, month, day))
+                result = cursor.fetchone()
+                
+                if result:
+                    columns = [description[0] for description in cursor.description]
+                    return dict(zip(columns, result))
+                return None
+                
+            finally:
+                conn.close()
     
     def get_time_ganzhi(self, time: int) -> tuple:
         """시간을 12지지로 변환"""
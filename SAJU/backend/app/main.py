@@ -1,19 +1,26 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import json
-import traceback
+from fastapi.responses import JSONResponse, Response
+import logging
 from app.api import saju
+from app.core.responses import (
+    CompressionMiddleware,
+    ResponseCacheMiddleware,
+    UnicodeJSONResponse,
+    response_cache,
+)
+from app.services.single_flight import get_single_flight_stats
+from app.services.chat_sessions import chat_sessions
+from msp_common.prompt_builder import prompt_metrics
+from msp_common.llm_limiter import get_llm_limiter_stats
+from msp_common.metrics import CONTENT_TYPE, MetricsMiddleware, register_collector, render_metrics
+from msp_common.tracing import TracingMiddleware, get_tracing_stats
+from msp_common.profiling import ProfilingMiddleware, debug_router
+from msp_common.logging_setup import RequestIdMiddleware, get_logging_stats, setup_logging
 
-class UnicodeJSONResponse(JSONResponse):
-    def render(self, content) -> bytes:
-        return json.dumps(
-            content,
-            ensure_ascii=False,
-            allow_nan=False,
-            indent=None,
-            separators=(",", ":"),
-        ).encode("utf-8")
+# 로그 출력은 QueueListener 스레드에서 (각 모듈의 logging.basicConfig 핸들러를 대체)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="사주 웹 서비스 API",
@@ -22,6 +29,10 @@ app = FastAPI(
     default_response_class=UnicodeJSONResponse
 )
 
+# 분석 결과 캐시 (안쪽) + 응답 압축 (바깥쪽). 캐시는 압축본을 직접 보관하므로 압축 계층이 건너뜀
+app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 # CORS 설정
 app.add_middleware(
     CORSMiddleware,
@@ -37,32 +48,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 라우트별 요청 수/지연 시간 (압축/캐시/CORS 처리 시간 포함, 추적/프로파일링/요청 ID 미들웨어는 이보다 바깥쪽)
+app.add_middleware(MetricsMiddleware)
+
+# 분산 추적: 호출한 서비스(NewCompatibility 등)의 traceparent를 이어받아 서버 스팬 시작 (TRACING_EXPORTER 설정 시)
+app.add_middleware(TracingMiddleware)
+
+# 요청 단위 프로파일링: X-Profile-Token 헤더 또는 PROFILE_SAMPLE_RATE로 선택된 요청만 (결과는 /debug/profiles)
+app.add_middleware(ProfilingMiddleware)
+
+# 요청 ID: X-Request-ID를 이어받거나 새로 만들어 모든 로그 레코드와 응답 헤더에 붙임 (가장 바깥쪽)
+app.add_middleware(RequestIdMiddleware)
+
+# 기존 통계 엔드포인트의 숫자 값도 /metrics 게이지로 노출
+register_collector("saju_response_cache", response_cache.stats)
+register_collector("saju_single_flight", get_single_flight_stats, label="flight")
+register_collector("saju_chat_sessions", chat_sessions.stats)
+register_collector("saju_llm", get_llm_limiter_stats, label="provider")
+register_collector("saju_prompt", lambda: prompt_metrics.stats()["endpoints"], label="endpoint")
+register_collector("saju_tracing", get_tracing_stats)
+register_collector("saju_logging", get_logging_stats)
+
 # 글로벌 에러 핸들러
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    print(f"=== 글로벌 에러 핸들러 ===")
-    print(f"URL: {request.url}")
-    print(f"Method: {request.method}")
-    print(f"Error: {str(exc)}")
-    print(f"Traceback: {traceback.format_exc()}")
+    # traceback 문자열화는 로그 리스너 스레드에서 (exc_info만 넘김)
+    # 미들웨어 밖에서 실행되므로 요청 ID는 RequestIdMiddleware가 넣어 둔 헤더에서 가져옴
+    request_id = request.headers.get("x-request-id")
+    logger.error("처리되지 않은 예외: %s", exc, exc_info=exc,
+                 extra={"method": request.method, "path": request.url.path, "request_id": request_id})
     return JSONResponse(
         status_code=500,
-        content={"detail": f"서버 오류: {str(exc)}"}
+        content={"detail": f"서버 오류: {str(exc)}"},
+        headers={"X-Request-ID": request_id} if request_id else None
     )
 
 # API 라우터 등록
 app.include_router(saju.router, prefix="/api/v1/saju", tags=["saju"])
+app.include_router(debug_router)
 
 # Azure OpenAI API 라우터 등록 (안전한 try-catch)
 try:
     from app.api.azure_api import azure_router
     app.include_router(azure_router, prefix="/api/v1/azure", tags=["azure"])
-    print("Azure OpenAI API router registered successfully")
+    logger.info("Azure OpenAI API router registered successfully")
 except ImportError as e:
-    print(f"Azure OpenAI API router load failed: {e}")
-    print("Only Gemini AI is available")
+    logger.warning("Azure OpenAI API router load failed: %s (Only Gemini AI is available)", e)
 except Exception as e:
-    print(f"Azure OpenAI API router registration failed: {e}")
+    logger.error("Azure OpenAI API router registration failed: %s", e)
 
 @app.get("/")
 async def root():
@@ -72,6 +105,36 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/response-cache")
+async def response_cache_stats():
+    """분석 응답 캐시 적중률과 사용량 조회"""
+    return response_cache.stats()
+
+@app.get("/single-flight")
+async def single_flight_stats():
+    """동일 요청 병합 현황 조회 (실제 실행 수 / 병합된 요청 수)"""
+    return get_single_flight_stats()
+
+@app.get("/chat-session-stats")
+async def chat_session_stats():
+    """AI 상담 채팅 세션 현황 조회 (활성/만료/제거 수)"""
+    return chat_sessions.stats()
+
+@app.get("/prompt-metrics")
+async def prompt_metrics_stats():
+    """엔드포인트별 LLM 프롬프트 토큰 수 및 기존 방식 대비 절감량 조회"""
+    return prompt_metrics.stats()
+
+@app.get("/llm-limits")
+async def llm_limits():
+    """LLM 공급자별 동시 실행 한도, 실행/대기 중 요청 수, 대기 시간, 429 재시도 현황 조회"""
+    return get_llm_limiter_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 형식 지표 (라우트별 요청 수/지연 히스토그램, 내부 단계 소요 시간, 캐시/LLM 통계)"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
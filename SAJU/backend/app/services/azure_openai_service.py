@@ -9,10 +9,50 @@ import aiohttp
 from typing import Dict, Any, Optional
 from datetime import datetime
 from dotenv import load_dotenv
+from msp_common.metrics import time_stage
+from msp_common.tracing import inject_headers, start_span
+from app.services.single_flight import ai_flight, fingerprint
+from msp_common.llm_limiter import LLMProviderError, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, azure_limiter, parse_retry_after
+from msp_common.prompt_builder import PromptTemplate, build_prompt, legacy_json
+from app.services.prompt_features import SAJU_FEATURES, birth_info_text
 
 # .env 파일 로드
 load_dotenv()
 
+# 프롬프트 템플릿 (문구를 바꾸면 version을 올려 지표/응답에서 구분)
+INTERPRET_TEMPLATE = PromptTemplate("azure.interpret", "2", """
+사주 정보:
+{features}
+
+질문: {question}
+
+위 사주 분석을 바탕으로 친근하고 따뜻하게 답변해주세요:
+- 핵심 내용 1-2줄로 요약
+- 주요 특징 2-3개 
+- 실용적인 조언 2개
+- 200자 내외, 이모지 적절히 사용
+""")
+
+QUESTIONS_TEMPLATE = PromptTemplate("azure.questions", "2", """
+사주 분석:
+{features}
+개인 정보: {person}
+
+이 분이 가장 궁금해할 만한 질문 5개를 다음 JSON 형식으로 생성해주세요:
+
+{{
+  "questions": [
+    {{"question": "올해 하반기 연애운은 어떨까요?", "category": "연애", "priority": "high", "icon": "💕"}},
+    {{"question": "현재 직장 상황은?", "category": "직업", "priority": "high", "icon": "💼"}},
+    {{"question": "건강 관리 포인트는?", "category": "건강", "priority": "medium", "icon": "🏥"}},
+    {{"question": "재물운 전망은?", "category": "재물", "priority": "medium", "icon": "💰"}},
+    {{"question": "인간관계 개선 방법은?", "category": "인간관계", "priority": "low", "icon": "👥"}}
+  ]
+}}
+
+개인의 사주 특성에 맞게 구체적이고 실용적인 질문으로 작성해주세요.
+""")
+
 # Windows UTF-8 설정 (주석 처리하여 인코딩 문제 방지)
 # if sys.platform.startswith('win'):
 #     import io
@@ -41,8 +81,8 @@ class AzureOpenAIService:
         self.max_tokens = 1000
         self.top_p = 0.9
     
-    async def chat_completion(self, messages: list, system_prompt: str = None) -> str:
-        """Azure OpenAI Chat Completion API 호출"""
+    async def chat_completion(self, messages: list, system_prompt: str = None, priority: int = PRIORITY_INTERACTIVE) -> str:
+        """Azure OpenAI Chat Completion API 호출 (동시 실행 제한 + 429/5xx 재시도)"""
         headers = {
             "Content-Type": "application/json",
             "api-key": self.api_key
@@ -65,40 +105,53 @@ class AzureOpenAIService:
             "top_p": self.top_p
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.api_url, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data["choices"][0]["message"]["content"]
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"Azure OpenAI API 오류 ({response.status}): {error_text}")
+        with time_stage("ai_call.azure_openai"):
+            return await azure_limiter.call(lambda: self._post_chat(headers, payload), priority)
+
+    async def _post_chat(self, headers: Dict[str, str], payload: Dict[str, Any]) -> str:
+        with start_span("azure_openai.chat.completions", kind="client", attributes={"llm.provider": "azure_openai", "llm.deployment": self.deployment_name}) as span:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.api_url, headers=inject_headers(headers), json=payload) as response:
+                    if span is not None:
+                        span.set_attribute("http.status_code", response.status)
+                    if response.status == 200:
+                        data = await response.json()
+                        return data["choices"][0]["message"]["content"]
+                    else:
+                        error_text = await response.text()
+                        raise LLMProviderError(
+                            f"Azure OpenAI API 오류 ({response.status}): {error_text}",
+                            status=response.status,
+                            retry_after=parse_retry_after(response.headers),
+                        )
     
     async def interpret_saju(self, saju_data: Dict[str, Any], question: str) -> Dict[str, Any]:
-        """사주 해석 서비스"""
+        """사주 해석 서비스 (같은 사주/질문의 동시 요청은 호출 1회를 공유)"""
+        key = fingerprint("azure.interpret", self.deployment_name, saju_data, question)
+        return await ai_flight.do(key, lambda: self._interpret_saju(saju_data, question))
+
+    async def _interpret_saju(self, saju_data: Dict[str, Any], question: str) -> Dict[str, Any]:
         try:
             system_prompt = """당신은 30년 경력의 친근한 명리학 전문가입니다. 
 사주 분석 결과를 바탕으로 간결하고 따뜻한 조언을 제공합니다."""
             
-            user_prompt = f"""
-사주 정보: {json.dumps(saju_data, ensure_ascii=False, indent=2)}
-
-질문: {question}
-
-위 사주 분석을 바탕으로 친근하고 따뜻하게 답변해주세요:
-- 핵심 내용 1-2줄로 요약
-- 주요 특징 2-3개 
-- 실용적인 조언 2개
-- 200자 내외, 이모지 적절히 사용
-            """
+            prompt = build_prompt(
+                "azure.interpret",
+                INTERPRET_TEMPLATE,
+                saju_data,
+                SAJU_FEATURES,
+                baseline=INTERPRET_TEMPLATE.text.format(features=legacy_json(saju_data, indent=2), question=question),
+                question=question,
+            )
             
-            response = await self.chat_completion(user_prompt, system_prompt)
+            response = await self.chat_completion(prompt.text, system_prompt)
             
             return {
                 "success": True,
                 "ai_interpretation": response,
                 "provider": "azure_openai",
                 "model": "gpt-4.1",
+                "prompt": prompt.summary(),
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -111,30 +164,24 @@ class AzureOpenAIService:
             }
     
     async def generate_questions(self, saju_data: Dict[str, Any], birth_info: Dict[str, Any]) -> Dict[str, Any]:
-        """개인화된 질문 생성"""
+        """개인화된 질문 생성 (동시 동일 요청은 호출 1회를 공유)"""
+        key = fingerprint("azure.questions", self.deployment_name, saju_data, birth_info)
+        return await ai_flight.do(key, lambda: self._generate_questions(saju_data, birth_info))
+
+    async def _generate_questions(self, saju_data: Dict[str, Any], birth_info: Dict[str, Any]) -> Dict[str, Any]:
         try:
             system_prompt = "당신은 사주 전문가로, 개인 맞춤형 질문을 생성하는 전문가입니다."
             
-            user_prompt = f"""
-사주 분석: {json.dumps(saju_data, ensure_ascii=False)}
-개인 정보: {json.dumps(birth_info, ensure_ascii=False)}
-
-이 분이 가장 궁금해할 만한 질문 5개를 다음 JSON 형식으로 생성해주세요:
-
-{{
-  "questions": [
-    {{"question": "올해 하반기 연애운은 어떨까요?", "category": "연애", "priority": "high", "icon": "💕"}},
-    {{"question": "현재 직장 상황은?", "category": "직업", "priority": "high", "icon": "💼"}},
-    {{"question": "건강 관리 포인트는?", "category": "건강", "priority": "medium", "icon": "🏥"}},
-    {{"question": "재물운 전망은?", "category": "재물", "priority": "medium", "icon": "💰"}},
-    {{"question": "인간관계 개선 방법은?", "category": "인간관계", "priority": "low", "icon": "👥"}}
-  ]
-}}
-
-개인의 사주 특성에 맞게 구체적이고 실용적인 질문으로 작성해주세요.
-            """
+            prompt = build_prompt(
+                "azure.questions",
+                QUESTIONS_TEMPLATE,
+                saju_data,
+                SAJU_FEATURES,
+                baseline=QUESTIONS_TEMPLATE.text.format(features=legacy_json(saju_data), person=legacy_json(birth_info)),
+                person=birth_info_text(birth_info),
+            )
             
-            response = await self.chat_completion(user_prompt, system_prompt)
+            response = await self.chat_completion(prompt.text, system_prompt, PRIORITY_BACKGROUND)
             
             # JSON 파싱
             try:
@@ -153,6 +200,7 @@ class AzureOpenAIService:
                 "suggested_questions": questions,
                 "generation_method": "azure_ai",
                 "provider": "azure_openai", 
+                "prompt": prompt.summary(),
                 "timestamp": datetime.now().isoformat(),
                 "total_questions": len(questions)
             }
@@ -0,0 +1,163 @@
+"""
+AI 상담 채팅 세션
+- 세션 생성 시 사주 분석을 한 번만 실행하고 프롬프트용 사주 요약만 보관 (분석 원본은 보관하지 않음)
+- 이후 턴은 세션 ID로 질문만 보내므로 분석을 다시 실행하거나 출생 정보를 다시 보낼 필요가 없음
+- 최근 대화는 그대로, 오래된 대화는 질문/답변 첫 줄만 남긴 요약으로 압축해 프롬프트 길이를 제한
+- 유휴 세션은 TTL이 지나거나 최대 개수를 넘으면 오래 쓰지 않은 순서(LRU)로 제거
+"""
+import asyncio
+import os
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# 세션 설정
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "1000"))
+CHAT_SESSION_TTL_SECONDS = int(os.getenv("CHAT_SESSION_TTL_SECONDS", "1800"))
+# 프롬프트에 원문 그대로 넣는 최근 질문/답변 쌍 수
+CHAT_HISTORY_RECENT_TURNS = int(os.getenv("CHAT_HISTORY_RECENT_TURNS", "3"))
+# 오래된 대화 요약의 최대 길이 (문자 수, 넘으면 가장 오래된 항목부터 제거)
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "600"))
+# 요약 항목 하나에 남기는 답변 길이
+SUMMARY_ANSWER_CHARS = 80
+
+
+@dataclass
+class ChatTurn:
+    question: str
+    answer: str
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class ChatSession:
+    session_id: str
+    birth_info: Dict[str, Any]
+    saju_context: str
+    created_at: float = field(default_factory=time.time)
+    last_active: float = field(default_factory=time.monotonic)
+    recent_turns: List[ChatTurn] = field(default_factory=list)
+    summary_items: List[str] = field(default_factory=list)
+    total_turns: int = 0
+    # 같은 세션의 턴은 순서대로 처리 (대화 기록이 섞이지 않도록)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    def history_text(self) -> str:
+        """프롬프트에 넣을 이전 대화 (요약 + 최근 턴 원문)"""
+        lines = []
+        if self.summary_items:
+            lines.append("(앞선 대화 요약) " + " / ".join(self.summary_items))
+        for turn in self.recent_turns:
+            lines.append(f"사용자: {turn.question}")
+            lines.append(f"상담사: {turn.answer}")
+        return "\n".join(lines)
+
+    def add_turn(self, question: str, answer: str) -> None:
+        self.recent_turns.append(ChatTurn(question, answer))
+        self.total_turns += 1
+        while len(self.recent_turns) > CHAT_HISTORY_RECENT_TURNS:
+            self.summary_items.append(_summarize_turn(self.recent_turns.pop(0)))
+        # 요약도 길이 상한을 넘으면 가장 오래된 항목부터 버림
+        while self.summary_items and len(" / ".join(self.summary_items)) > CHAT_SUMMARY_MAX_CHARS:
+            self.summary_items.pop(0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "birth_info": self.birth_info,
+            "total_turns": self.total_turns,
+            "summary": self.summary_items,
+            "recent_turns": [{"question": t.question, "answer": t.answer} for t in self.recent_turns],
+            "idle_seconds": round(time.monotonic() - self.last_active, 1),
+        }
+
+
+def _first_line(text: str, limit: int) -> str:
+    # 답변 양식의 제목 줄(## 핵심 결과 등)은 건너뛰고 첫 본문 줄을 사용
+    for line in text.splitlines():
+        if line.lstrip().startswith("#"):
+            continue
+        line = line.strip(" -*•")
+        if line:
+            return line if len(line) <= limit else line[:limit] + "…"
+    return ""
+
+
+def _summarize_turn(turn: ChatTurn) -> str:
+    """추가 LLM 호출 없이 질문과 답변의 첫 내용 줄만 남겨 요약합니다."""
+    return f"Q: {turn.question} → A: {_first_line(turn.answer, SUMMARY_ANSWER_CHARS)}"
+
+
+class ChatSessionStore:
+    """메모리 내 세션 저장소 (LRU + 유휴 TTL)"""
+
+    def __init__(self, max_sessions: int = CHAT_SESSION_MAX, ttl_seconds: int = CHAT_SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.turns = 0
+
+    def create(self, birth_info: Dict[str, Any], saju_context: str) -> ChatSession:
+        self._evict_expired()
+        session = ChatSession(
+            session_id=secrets.token_urlsafe(16),
+            birth_info=birth_info,
+            saju_context=saju_context,
+        )
+        self._sessions[session.session_id] = session
+        self.created += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if time.monotonic() - session.last_active > self.ttl_seconds:
+            del self._sessions[session_id]
+            self.expired += 1
+            return None
+        session.last_active = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def add_turn(self, session: ChatSession, question: str, answer: str) -> None:
+        """세션에 질문/답변을 기록하고 전체 턴 수 통계를 함께 갱신합니다."""
+        session.add_turn(question, answer)
+        self.turns += 1
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def _evict_expired(self) -> None:
+        # 가장 오래 쓰지 않은 세션부터 확인하므로 만료되지 않은 세션을 만나면 중단
+        now = time.monotonic()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_active <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
+
+    def stats(self) -> Dict[str, Any]:
+        self._evict_expired()
+        return {
+            "active_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "turns": self.turns,
+        }
+
+
+chat_sessions = ChatSessionStore()
+
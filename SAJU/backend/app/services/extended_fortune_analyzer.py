@@ -160,7 +160,7 @@ class ExtendedFortuneAnalyzer:
             }
             
         except Exception as e:
-            logger.error(f"주거운 분석 오류: {e}")
+            logger.error("주거운 분석 오류: %s", e)
             return self._get_default_residence_fortune()
 
     def analyze_transportation_fortune(self, birth_info: Dict) -> Dict[str, Any]:
@@ -235,7 +235,7 @@ class ExtendedFortuneAnalyzer:
             }
             
         except Exception as e:
-            logger.error(f"교통운 분석 오류: {e}")
+            logger.error("교통운 분석 오류: %s", e)
             return self._get_default_transportation_fortune()
 
     def analyze_social_fortune(self, birth_info: Dict) -> Dict[str, Any]:
@@ -320,7 +320,7 @@ class ExtendedFortuneAnalyzer:
             }
             
         except Exception as e:
-            logger.error(f"소셜운 분석 오류: {e}")
+            logger.error("소셜운 분석 오류: %s", e)
             return self._get_default_social_fortune()
 
     def analyze_hobby_fortune(self, birth_info: Dict) -> Dict[str, Any]:
@@ -406,7 +406,7 @@ class ExtendedFortuneAnalyzer:
             }
             
         except Exception as e:
-            logger.error(f"취미운 분석 오류: {e}")
+            logger.error("취미운 분석 오류: %s", e)
             return self._get_default_hobby_fortune()
 
     def _get_birth_season(self, month: int) -> str:
@@ -568,7 +568,7 @@ class ExtendedFortuneAnalyzer:
             }
             
         except Exception as e:
-            logger.error(f"직업운 분석 오류: {e}")
+            logger.error("직업운 분석 오류: %s", e)
             return self._get_default_career_fortune()
 
     def analyze_health_fortune(self, birth_info: Dict) -> Dict[str, Any]:
@@ -689,7 +689,7 @@ class ExtendedFortuneAnalyzer:
             }
             
         except Exception as e:
-            logger.error(f"건강운 분석 오류: {e}")
+            logger.error("건강운 분석 오류: %s", e)
             return self._get_default_health_fortune()
 
     def analyze_study_fortune(self, birth_info: Dict) -> Dict[str, Any]:
@@ -795,7 +795,7 @@ class ExtendedFortuneAnalyzer:
             }
             
         except Exception as e:
-            logger.error(f"학업운 분석 오류: {e}")
+            logger.error("학업운 분석 오류: %s", e)
             return self._get_default_study_fortune()
 
     def analyze_family_fortune(self, birth_info: Dict) -> Dict[str, Any]:
@@ -879,7 +879,7 @@ class ExtendedFortuneAnalyzer:
             }
             
         except Exception as e:
-            logger.error(f"가족운 분석 오류: {e}")
+            logger.error("가족운 분석 오류: %s", e)
             return self._get_default_family_fortune()
 
     def _get_default_career_fortune(self) -> Dict[str, Any]:
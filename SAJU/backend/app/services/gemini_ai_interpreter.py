@@ -10,14 +10,22 @@ if sys.platform.startswith('win'):
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 import json
+import logging
 import aiohttp
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from msp_common.metrics import time_stage
+from msp_common.tracing import inject_headers, start_span
+from app.services.single_flight import ai_flight, fingerprint
+from msp_common.prompt_builder import record_prompt
+from msp_common.llm_limiter import LLMProviderError, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, gemini_limiter, parse_retry_after
 
 # 환경 변수 로드
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class GeminiUsageTracker:
     """Gemini API 사용량 추적 및 제한"""
     
@@ -37,7 +45,7 @@ class GeminiUsageTracker:
                     "monthly": {"month": "", "count": 0}
                 }
         except Exception as e:
-            print(f"사용량 파일 로드 실패: {e}")
+            logger.warning("사용량 파일 로드 실패: %s", e)
             self.usage_data = {
                 "daily": {"date": "", "count": 0},
                 "monthly": {"month": "", "count": 0}
@@ -49,7 +57,7 @@ class GeminiUsageTracker:
             with open(self.usage_file, 'w', encoding='utf-8') as f:
                 json.dump(self.usage_data, f, ensure_ascii=False, indent=2)
         except Exception as e:
-            print(f"사용량 파일 저장 실패: {e}")
+            logger.warning("사용량 파일 저장 실패: %s", e)
     
     def check_and_update_usage(self) -> bool:
         """사용량 체크 및 업데이트"""
@@ -99,6 +107,24 @@ class GeminiUsageTracker:
         }
 
 
+COUNSELOR_INTRO = "당신은 간결하고 친근한 사주 상담사입니다."
+
+ANSWER_FORMAT_GUIDE = """**간결하면서 친근하게 답변해주세요:**
+## 핵심 결과 ✨
+- (1줄로 친근하게 요약)
+
+## 주요 특징 😊
+- 특징 1 (간결하게)
+- 특징 2 (간결하게)  
+- 특징 3 (간결하게)
+
+## 실천 조언 💪
+- 조언 1 (친근하게)
+- 조언 2 (친근하게)
+
+**200자 내외로 간결하면서도 따뜻하게 작성하세요. 적절한 이모지와 "~하세요", "~해보시면 좋겠어요" 같은 친근한 말투 사용.**"""
+
+
 class GeminiAIInterpreter:
     """Google Gemini AI 사주 해석 서비스"""
     
@@ -109,7 +135,9 @@ class GeminiAIInterpreter:
         # REST API 방식
         self.api_key = api_key
         self.model_name = "gemini-2.5-flash"
-        self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent"
+        # GEMINI_API_ENDPOINT: 부하 테스트 시 모의 서버(scripts/loadtest/mock_llm_server.py) 주소로 변경
+        self.api_endpoint = os.getenv("GEMINI_API_ENDPOINT", "https://generativelanguage.googleapis.com").rstrip("/")
+        self.api_url = f"{self.api_endpoint}/v1beta/models/{self.model_name}:generateContent"
         
         # 사용량 추적기
         self.usage_tracker = GeminiUsageTracker()
@@ -120,7 +148,11 @@ class GeminiAIInterpreter:
         self.top_p = float(os.getenv("AI_TOP_P", 0.9))
     
     async def interpret_saju(self, analysis_result: Dict[str, Any], question: str, context: Optional[str] = None, tone: str = "concise") -> Dict[str, Any]:
-        """사주 분석 결과를 AI로 해석"""
+        """사주 분석 결과를 AI로 해석 (같은 사주/질문의 동시 요청은 Gemini 호출 1회를 공유)"""
+        key = fingerprint("gemini.interpret", self.model_name, analysis_result, question, context, tone)
+        return await ai_flight.do(key, lambda: self._interpret_saju(analysis_result, question, context, tone))
+
+    async def _interpret_saju(self, analysis_result: Dict[str, Any], question: str, context: Optional[str] = None, tone: str = "concise") -> Dict[str, Any]:
         try:
             # 사용량 체크
             if not self.usage_tracker.check_and_update_usage():
@@ -134,16 +166,17 @@ class GeminiAIInterpreter:
                     }
             
             # 프롬프트 생성
-            prompt = self._create_saju_prompt(analysis_result, question, context)
+            prompt = record_prompt("gemini.interpret", "gemini.interpret@1", self._create_saju_prompt(analysis_result, question, context))
             
             # Gemini API 호출
-            response = await self._call_gemini_async(prompt)
+            response = await self._call_gemini_async(prompt.text)
             
             return {
                 "success": True,
                 "ai_interpretation": response,
                 "usage_status": self.usage_tracker.get_usage_status(),
                 "model": "gemini-2.5-flash",
+                "prompt": prompt.summary(),
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -155,8 +188,12 @@ class GeminiAIInterpreter:
                 "usage_status": self.usage_tracker.get_usage_status()
             }
     
-    async def _call_gemini_async(self, prompt: str) -> str:
-        """비동기 Gemini REST API 호출"""
+    async def _call_gemini_async(self, prompt: str, priority: int = PRIORITY_INTERACTIVE) -> str:
+        """비동기 Gemini REST API 호출 (동시 실행 제한 + 429/5xx 재시도)"""
+        with time_stage("ai_call.gemini"):
+            return await gemini_limiter.call(lambda: self._post_gemini(prompt), priority)
+
+    async def _post_gemini(self, prompt: str) -> str:
         headers = {
             "Content-Type": "application/json",
             "X-goog-api-key": self.api_key
@@ -174,57 +211,100 @@ class GeminiAIInterpreter:
             ]
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.api_url, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data["candidates"][0]["content"]["parts"][0]["text"]
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"Gemini API 오류 ({response.status}): {error_text}")
+        with start_span("gemini.generateContent", kind="client", attributes={"llm.provider": "gemini", "llm.model": self.model_name}) as span:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.api_url, headers=inject_headers(headers), json=payload) as response:
+                    if span is not None:
+                        span.set_attribute("http.status_code", response.status)
+                    if response.status == 200:
+                        data = await response.json()
+                        return data["candidates"][0]["content"]["parts"][0]["text"]
+                    else:
+                        error_text = await response.text()
+                        raise LLMProviderError(
+                            f"Gemini API 오류 ({response.status}): {error_text}",
+                            status=response.status,
+                            retry_after=parse_retry_after(response.headers),
+                        )
     
     def _create_saju_prompt(self, analysis_result: Dict[str, Any], question: str, context: Optional[str] = None) -> str:
         """사주 해석용 프롬프트 생성"""
-        
-        # 분석 결과 요약
+        # 간결하면서 친근한 톤
+        base_prompt = f"""{COUNSELOR_INTRO}
+
+{self.create_saju_context(analysis_result)}
+
+**질문:** {question}
+
+{ANSWER_FORMAT_GUIDE}"""
+
+        return base_prompt
+
+    def create_saju_context(self, analysis_result: Dict[str, Any]) -> str:
+        """프롬프트에 넣을 사주 정보 요약 (채팅 세션은 생성 시 한 번만 만들어 재사용)"""
         palja_info = analysis_result.get('palja', {})
         wuxing_info = analysis_result.get('wuxing', {})
         personality_info = analysis_result.get('personality', {})
-        ten_stars_info = analysis_result.get('ten_stars', {})
-        
-        # 간결하면서 친근한 톤
-        base_prompt = f"""당신은 간결하고 친근한 사주 상담사입니다.
 
-**사주 정보:**
+        return f"""**사주 정보:**
 • 사주: {palja_info.get('day_pillar', '')} 일간
 • 오행: {wuxing_info.get('strength', '')} ({wuxing_info.get('balance_score', 0)}점)
-• 성격: {personality_info.get('basic_nature', '')}
+• 성격: {personality_info.get('basic_nature', '')}"""
 
-**질문:** {question}
-
-**간결하면서 친근하게 답변해주세요:**
-## 핵심 결과 ✨
-- (1줄로 친근하게 요약)
+    def _create_chat_prompt(self, saju_context: str, history: str, question: str) -> str:
+        """채팅 세션용 프롬프트 생성 (사주 요약 + 이전 대화 + 새 질문)"""
+        sections = [COUNSELOR_INTRO, saju_context]
+        if history:
+            sections.append(f"**이전 대화:**\n{history}")
+        sections.append(f"**질문:** {question}")
+        sections.append(ANSWER_FORMAT_GUIDE)
+        return "\n\n".join(sections)
 
-## 주요 특징 😊
-- 특징 1 (간결하게)
-- 특징 2 (간결하게)  
-- 특징 3 (간결하게)
+    async def interpret_chat_turn(self, saju_context: str, history: str, question: str) -> Dict[str, Any]:
+        """채팅 세션의 한 턴 해석 (사주 분석/요약은 세션에 저장된 것을 사용)"""
+        try:
+            # 사용량 체크
+            if not self.usage_tracker.check_and_update_usage():
+                paid_enabled = os.getenv("ENABLE_PAID_GEMINI", "false").lower() == "true"
+                if not paid_enabled:
+                    return {
+                        "success": False,
+                        "error": "daily_limit_exceeded",
+                        "message": "일일 무료 사용량을 초과했습니다. 내일 다시 이용해주세요.",
+                        "usage_status": self.usage_tracker.get_usage_status()
+                    }
 
-## 실천 조언 💪
-- 조언 1 (친근하게)
-- 조언 2 (친근하게)
+            prompt = record_prompt("gemini.chat", "gemini.chat@1", self._create_chat_prompt(saju_context, history, question))
+            response = await self._call_gemini_async(prompt.text)
 
-**200자 내외로 간결하면서도 따뜻하게 작성하세요. 적절한 이모지와 "~하세요", "~해보시면 좋겠어요" 같은 친근한 말투 사용.**"""
+            return {
+                "success": True,
+                "ai_interpretation": response,
+                "usage_status": self.usage_tracker.get_usage_status(),
+                "model": self.model_name,
+                "prompt_chars": len(prompt.text),
+                "prompt": prompt.summary(),
+                "timestamp": datetime.now().isoformat()
+            }
 
-        return base_prompt
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "fallback": "현재 AI 해석 서비스에 일시적인 문제가 있습니다. 기본 분석 결과를 참고해주세요.",
+                "usage_status": self.usage_tracker.get_usage_status()
+            }
     
     def get_usage_status(self) -> Dict[str, Any]:
         """현재 사용량 상태 조회"""
         return self.usage_tracker.get_usage_status()
     
     async def generate_suggested_questions(self, saju_result: Dict[str, Any], birth_info: Dict[str, Any]) -> Dict[str, Any]:
-        """사주 분석 결과 기반 개인화된 질문 생성"""
+        """사주 분석 결과 기반 개인화된 질문 생성 (동시 동일 요청은 Gemini 호출 1회를 공유)"""
+        key = fingerprint("gemini.questions", self.model_name, saju_result, birth_info)
+        return await ai_flight.do(key, lambda: self._generate_suggested_questions(saju_result, birth_info))
+
+    async def _generate_suggested_questions(self, saju_result: Dict[str, Any], birth_info: Dict[str, Any]) -> Dict[str, Any]:
         try:
             # 사용량 체크
             if not self.usage_tracker.check_and_update_usage():
@@ -233,10 +313,10 @@ class GeminiAIInterpreter:
                     raise Exception("AI 사용량 초과")
             
             # 질문 생성 프롬프트
-            prompt = self._create_question_generation_prompt(saju_result, birth_info)
+            prompt = record_prompt("gemini.questions", "gemini.questions@1", self._create_question_generation_prompt(saju_result, birth_info))
             
             # Gemini API 호출
-            response = await self._call_gemini_async(prompt)
+            response = await self._call_gemini_async(prompt.text, PRIORITY_BACKGROUND)
             
             # JSON 파싱 및 검증
             questions = self._parse_and_validate_questions(response)
@@ -245,12 +325,13 @@ class GeminiAIInterpreter:
                 "suggested_questions": questions,
                 "generation_method": "ai",
                 "usage_status": self.usage_tracker.get_usage_status(),
+                "prompt": prompt.summary(),
                 "timestamp": datetime.now().isoformat(),
                 "total_questions": len(questions)
             }
             
         except Exception as e:
-            print(f"AI 질문 생성 실패: {e}")
+            logger.error("AI 질문 생성 실패: %s", e)
             raise e
     
     def _create_question_generation_prompt(self, saju_result: Dict[str, Any], birth_info: Dict[str, Any]) -> str:
@@ -336,8 +417,7 @@ class GeminiAIInterpreter:
             return questions
             
         except Exception as e:
-            print(f"질문 파싱 실패: {e}")
-            print(f"AI 응답 원문: {response[:500]}...")
+            logger.error("질문 파싱 실패: %s", e, extra={"response_head": response[:500]})
             raise ValueError(f"AI 응답 파싱 실패: {e}")
 
     async def test_connection(self) -> Dict[str, Any]:
@@ -0,0 +1,58 @@
+"""
+사주 분석 결과의 프롬프트 항목 정의 (직렬화/토큰 예산은 msp_common.prompt_builder)
+"""
+from typing import Any, Dict, Tuple
+
+from msp_common.prompt_builder import FeatureSpec
+
+
+_WUXING_NAMES = (("wood", "목"), ("fire", "화"), ("earth", "토"), ("metal", "금"), ("water", "수"))
+
+
+def _palja_text(data: Dict[str, Any]) -> str:
+    palja = data.get("palja") or {}
+    pillars = []
+    for prefix, name in (("year", "년"), ("month", "월"), ("day", "일"), ("hour", "시")):
+        gan, ji = palja.get(f"{prefix}_gan", ""), palja.get(f"{prefix}_ji", "")
+        if gan or ji:
+            pillars.append(f"{name}{gan}{ji}")
+    return " ".join(pillars)
+
+
+def _wuxing_text(data: Dict[str, Any]) -> str:
+    wuxing = data.get("wuxing") or {}
+    return " ".join(f"{name}{wuxing.get(key, 0)}" for key, name in _WUXING_NAMES if key in wuxing)
+
+
+def birth_info_text(birth_info: Dict[str, Any]) -> str:
+    """출생 정보를 한 줄로 (예: 홍길동, 1990년 5월 15일 14시, 남성)"""
+    gender = str(birth_info.get("gender", "")).lower()
+    parts = [
+        str(birth_info.get("name", "")),
+        f"{birth_info.get('year')}년 {birth_info.get('month')}월 {birth_info.get('day')}일 {birth_info.get('hour')}시",
+        "남성" if gender in ("male", "m", "남", "남성") else "여성" if gender else "",
+    ]
+    return ", ".join(part for part in parts if part)
+
+
+SAJU_FEATURES: Tuple[FeatureSpec, ...] = (
+    FeatureSpec("사주팔자", _palja_text, 100),
+    FeatureSpec("일간", "palja.day_gan", 95),
+    FeatureSpec("오행 분포", _wuxing_text, 90),
+    FeatureSpec("일간 강약", "wuxing.strength", 85),
+    FeatureSpec("용신", "wuxing.use_god", 80),
+    FeatureSpec("기신", "wuxing.avoid_god", 75),
+    FeatureSpec("기본 성격", "personality.basic_nature", 70),
+    FeatureSpec("십성", "ten_stars", 60),
+    FeatureSpec("강점", "personality.strengths", 55),
+    FeatureSpec("직업 성향", "career.career_tendency", 50),
+    FeatureSpec("적합 분야", "career.suitable_fields", 45),
+    FeatureSpec("재물 성향", "fortune.wealth_tendency", 45),
+    FeatureSpec("대인관계", "relationship.relationship_style", 40),
+    FeatureSpec("약점", "personality.weaknesses", 35),
+    FeatureSpec("건강 조언", "health.health_advice", 30),
+    FeatureSpec("약한 장기", "health.weak_organs", 25),
+    FeatureSpec("재물 주의", "fortune.cautions", 20),
+    FeatureSpec("직업 주의", "career.cautions", 15),
+    FeatureSpec("확장 오행", "wuxing.extended_analysis", 5),
+)
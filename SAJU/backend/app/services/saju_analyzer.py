@@ -1,6 +1,7 @@
 from typing import Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 from app.database.connection import manseryuk_db
+from msp_common.metrics import time_stage
 from app.models.saju import BirthInfoRequest, SajuPaljaResponse, WuXingAnalysis, TenStarsAnalysis
 
 class SajuAnalyzer:
@@ -52,22 +53,26 @@ class SajuAnalyzer:
     def analyze_saju(self, birth_info: BirthInfoRequest) -> Dict[str, Any]:
         """완전한 사주 분석"""
         # 1. 사주팔자 추출
-        palja = self.extract_palja(birth_info)
+        with time_stage("palja"):
+            palja = self.extract_palja(birth_info)
         
         # 2. 오행 분석
-        wuxing = self.analyze_wuxing(palja)
+        with time_stage("wuxing"):
+            wuxing = self.analyze_wuxing(palja)
         
         # 3. 십성 분석
-        ten_stars = self.analyze_ten_stars(palja)
+        with time_stage("ten_stars"):
+            ten_stars = self.analyze_ten_stars(palja)
         
-        # 4. 성격 분석
-        personality = self.analyze_personality(palja, wuxing, ten_stars)
-        
-        # 5. 각종 운세 분석
-        career = self.analyze_career(palja, wuxing, ten_stars)
-        health = self.analyze_health(palja, wuxing)
-        relationship = self.analyze_relationship(palja, wuxing, ten_stars)
-        fortune = self.analyze_fortune(palja, wuxing, ten_stars)
+        with time_stage("interpretation"):
+            # 4. 성격 분석
+            personality = self.analyze_personality(palja, wuxing, ten_stars)
+            
+            # 5. 각종 운세 분석
+            career = self.analyze_career(palja, wuxing, ten_stars)
+            health = self.analyze_health(palja, wuxing)
+            relationship = self.analyze_relationship(palja, wuxing, ten_stars)
+            fortune = self.analyze_fortune(palja, wuxing, ten_stars)
         
         return {
             "palja": {
@@ -0,0 +1,102 @@
+"""
+동일 요청 병합 (single-flight)
+- 같은 지문의 요청이 동시에 들어오면 계산은 한 번만 실행하고 나머지는 그 결과를 함께 기다림
+- 사주 분석(만세력 조회 + 계산)과 AI 해석(Gemini/Azure 호출)에 사용
+"""
+import asyncio
+import copy
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from app.services.saju_analyzer import saju_analyzer
+
+T = TypeVar("T")
+
+
+def fingerprint(*parts: Any) -> str:
+    """요청을 구분하는 값들로 키를 만듭니다. dict는 키 순서와 무관하게 같은 지문이 나옵니다."""
+    normalized = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 1
+
+
+class SingleFlight:
+    """
+    키별로 진행 중인 계산을 하나만 유지합니다.
+    계산은 별도 태스크에서 실행하므로 먼저 요청한 클라이언트가 연결을 끊어도 함께 기다리던 요청은 결과를 받습니다.
+    결과를 여러 요청이 공유할 때는 호출자마다 복사본을 돌려주어 서로의 수정이 섞이지 않게 합니다.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.max_waiters = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.waiters += 1
+            self.coalesced += 1
+            self.max_waiters = max(self.max_waiters, flight.waiters)
+        else:
+            task = asyncio.ensure_future(fn())
+            flight = _Flight(task)
+            self._flights[key] = flight
+            self.executed += 1
+            task.add_done_callback(lambda t: self._finish(key, flight, t))
+
+        # shield: 대기 중인 요청이 취소되어도 공유 계산은 계속 진행
+        result = await asyncio.shield(flight.task)
+        return copy.deepcopy(result) if flight.waiters > 1 else result
+
+    def _finish(self, key: str, flight: _Flight, task: "asyncio.Task[Any]") -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not task.cancelled() and task.exception() is not None:
+            # 모든 대기 요청에 같은 예외가 전달됨 (다음 요청은 새로 계산)
+            self.failed += 1
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.executed + self.coalesced
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "in_flight": self.in_flight(),
+            "max_waiters": self.max_waiters,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
+
+
+# 사주 분석 / AI 해석 병합기
+saju_flight = SingleFlight("saju_analyzer")
+ai_flight = SingleFlight("ai_interpreter")
+
+
+async def analyze_saju_shared(birth_info) -> Any:
+    """
+    saju_analyzer.analyze_saju를 스레드에서 실행하고, 같은 출생 정보의 동시 요청은 한 번의 분석 결과를 공유합니다.
+    (동기 분석이 이벤트 루프를 막지 않아야 동시 요청이 실제로 겹칠 수 있음)
+    """
+    return await saju_flight.do(
+        fingerprint("analyze_saju", birth_info.dict()),
+        lambda: asyncio.to_thread(saju_analyzer.analyze_saju, birth_info),
+    )
+
+
+def get_single_flight_stats() -> Dict[str, Dict[str, Any]]:
+    return {flight.name: flight.stats() for flight in (saju_flight, ai_flight)}
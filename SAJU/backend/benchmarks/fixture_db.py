@@ -0,0 +1,81 @@
+"""
+벤치마크용 만세력 DB 생성
+- 실제 manseryuk.db와 같은 calenda_data 테이블/컬럼으로 지정한 연도 범위의 모든 날짜를 채웁니다.
+- 일주는 율리우스 적일(JDN)로 정확히, 년주/월주는 절기 시작일을 고정 날짜로 근사해 계산합니다.
+  (성능 측정용 데이터이며 실제 운세 결과 검증에는 사용하지 마세요)
+"""
+import datetime
+import os
+import sqlite3
+from typing import Iterator, Tuple
+
+STEMS_HAN = "甲乙丙丁戊己庚辛壬癸"
+STEMS_KOR = "갑을병정무기경신임계"
+BRANCHES_HAN = "子丑寅卯辰巳午未申酉戌亥"
+BRANCHES_KOR = "자축인묘진사오미신유술해"
+
+# 각 월의 절입일(근사): 이 날부터 해당 월의 월지가 바뀜 (1월 소한 ~ 12월 대설)
+TERM_START_DAY = (6, 4, 6, 5, 6, 6, 7, 8, 8, 8, 7, 7)
+
+
+def _ganzhi(index: int) -> Tuple[str, str]:
+    index %= 60
+    return (STEMS_HAN[index % 10] + BRANCHES_HAN[index % 12], STEMS_KOR[index % 10] + BRANCHES_KOR[index % 12])
+
+
+def ganzhi_for_date(date: datetime.date) -> Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]:
+    """(년주, 월주, 일주) 각각 (한자, 한글)"""
+    # 일주: 2000-01-01(JDN 2451545)이 戊午(54)
+    jdn = date.toordinal() + 1721425
+    day = _ganzhi(jdn + 49)
+
+    # 년주: 입춘(2월 절입일) 전이면 전년도
+    saju_year = date.year
+    if (date.month, date.day) < (2, TERM_START_DAY[1]):
+        saju_year -= 1
+    year_index = (saju_year - 4) % 60
+    year = _ganzhi(year_index)
+
+    # 월주: 寅월(2월 절입) 기준 월 순서, 월간은 년간에서 (甲己년 → 丙寅월)
+    month_order = (date.month - 2) % 12
+    if date.day < TERM_START_DAY[date.month - 1]:
+        month_order = (month_order - 1) % 12
+    month_stem = ((year_index % 10) * 2 + 2 + month_order) % 10
+    month_branch = (month_order + 2) % 12
+    month = (STEMS_HAN[month_stem] + BRANCHES_HAN[month_branch], STEMS_KOR[month_stem] + BRANCHES_KOR[month_branch])
+    return year, month, day
+
+
+def _rows(start_year: int, end_year: int) -> Iterator[tuple]:
+    date = datetime.date(start_year, 1, 1)
+    end = datetime.date(end_year, 12, 31)
+    step = datetime.timedelta(days=1)
+    while date <= end:
+        year, month, day = ganzhi_for_date(date)
+        yield (date.year, date.month, date.day, year[0], year[1], month[0], month[1], day[0], day[1])
+        date += step
+
+
+def build_fixture_db(path: str, start_year: int = 1930, end_year: int = 2030, with_index: bool = True) -> str:
+    """calenda_data 테이블을 가진 SQLite 파일을 만들고 경로를 반환합니다 (이미 있으면 덮어씀)."""
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(
+            """
+            CREATE TABLE calenda_data (
+                cd_sy INTEGER, cd_sm INTEGER, cd_sd INTEGER,
+                cd_hyganjee TEXT, cd_kyganjee TEXT,
+                cd_hmganjee TEXT, cd_kmganjee TEXT,
+                cd_hdganjee TEXT, cd_kdganjee TEXT
+            )
+            """
+        )
+        conn.executemany("INSERT INTO calenda_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", _rows(start_year, end_year))
+        if with_index:
+            conn.execute("CREATE INDEX idx_calenda_date ON calenda_data (cd_sy, cd_sm, cd_sd)")
+        conn.commit()
+    finally:
+        conn.close()
+    return path
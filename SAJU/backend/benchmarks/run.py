@@ -0,0 +1,267 @@
+"""
+사주 분석 핫패스 마이크로 벤치마크
+- 대상: SajuAnalyzer.analyze_saju / extract_palja / calculate_daeun / calculate_saeun /
+        analyze_love_fortune_detailed, ExtendedFortuneAnalyzer.analyze_*_fortune
+- cold: 반복마다 처음 보는 출생 정보 (캐시/재사용 효과 없음)
+  warm: 같은 출생 정보를 워밍업 후 반복 (캐시가 생기면 이 값이 먼저 줄어듦)
+- 메서드별 시간(중앙값/p95/최소)과 메모리 할당(호출당 최대 할당량, 호출 후 남은 블록 수)을 측정
+- 기준선 저장(--save-baseline) 후 비교(--compare)하면 임계값을 넘는 회귀가 있을 때 종료 코드 1
+
+실행 (SAJU/backend에서):
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.15
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.fixture_db import build_fixture_db
+
+# 세운 기준 연도 고정 (현재 연도에 따라 결과/시간이 바뀌지 않도록)
+SAEUN_TARGET_YEAR = 2025
+
+# 대표 출생 정보: 입춘/절입 경계, 윤일, 연말, 자시/해시, 남녀
+REPRESENTATIVE = [
+    (1990, 5, 15, 14, "male"),
+    (1984, 2, 3, 23, "female"),   # 입춘 전날 (전년도 년주)
+    (1984, 2, 4, 0, "male"),      # 입춘
+    (2000, 2, 29, 12, "female"),  # 윤일
+    (1999, 12, 31, 23, "male"),   # 연말 자시 직전
+    (1965, 8, 8, 6, "female"),    # 절입일
+    (2010, 1, 5, 1, "male"),      # 소한 전날
+    (1975, 11, 7, 18, "female"),
+]
+
+
+def _birth_info(year: int, month: int, day: int, hour: int, gender: str):
+    from app.models.saju import BirthInfoRequest
+    return BirthInfoRequest(year=year, month=month, day=day, hour=hour, gender=gender, name="벤치마크")
+
+
+def cold_inputs(count: int) -> List[tuple]:
+    """서로 다른 출생 정보 count개 (대표 날짜 + 1930~2029년에 고르게 퍼진 날짜)"""
+    inputs = list(REPRESENTATIVE)
+    i = 0
+    while len(inputs) < count:
+        inputs.append((1930 + (i * 37) % 100, 1 + (i * 5) % 12, 1 + (i * 11) % 28, (i * 7) % 24, ("male", "female")[i % 2]))
+        i += 1
+    return inputs[:count]
+
+
+def build_cases() -> Dict[str, Callable[[tuple], Callable[[], Any]]]:
+    """
+    케이스 이름 → (입력 → 측정할 호출) 팩토리.
+    입력 준비(모델 생성, 선행 분석)는 측정 구간 밖에서 수행합니다.
+    """
+    from app.services.saju_analyzer import saju_analyzer
+    from app.services.extended_fortune_analyzer import extended_fortune_analyzer
+
+    def analyze(raw):
+        info = _birth_info(*raw)
+        return lambda: saju_analyzer.analyze_saju(info)
+
+    def extract_palja(raw):
+        info = _birth_info(*raw)
+        return lambda: saju_analyzer.extract_palja(info)
+
+    def daeun(raw):
+        info = _birth_info(*raw)
+        palja = saju_analyzer.extract_palja(info)
+        return lambda: saju_analyzer.calculate_daeun(info, palja)
+
+    def saeun(raw):
+        info = _birth_info(*raw)
+        palja = saju_analyzer.extract_palja(info)
+        return lambda: saju_analyzer.calculate_saeun(info, palja, SAEUN_TARGET_YEAR)
+
+    def love(raw):
+        info = _birth_info(*raw)
+        palja = dict(saju_analyzer.extract_palja(info).dict(), gender=info.gender)
+        return lambda: saju_analyzer.analyze_love_fortune_detailed(palja)
+
+    def extended(method_name):
+        method = getattr(extended_fortune_analyzer, method_name)
+
+        def factory(raw):
+            year, month, day, hour, gender = raw
+            data = {"year": year, "month": month, "day": day, "hour": hour, "gender": gender, "name": "벤치마크"}
+            return lambda: method(data)
+        return factory
+
+    cases = {
+        "saju.analyze_saju": analyze,
+        "saju.extract_palja": extract_palja,
+        "saju.calculate_daeun": daeun,
+        "saju.calculate_saeun": saeun,
+        "saju.analyze_love_fortune_detailed": love,
+    }
+    for name in ("residence", "transportation", "social", "hobby", "career", "health", "study", "family"):
+        cases[f"extended.{name}"] = extended(f"analyze_{name}_fortune")
+    return cases
+
+
+def _time_calls(calls: List[Callable[[], Any]]) -> List[float]:
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()  # GC 일시정지로 인한 튐 제거 (할당 측정은 별도 패스)
+    try:
+        for call in calls:
+            start = time.perf_counter_ns()
+            call()
+            timings.append((time.perf_counter_ns() - start) / 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return timings
+
+
+def _alloc_stats(calls: List[Callable[[], Any]]) -> Tuple[float, float]:
+    """호출당 최대 할당량(KiB) 중앙값, 호출 후 남은 블록 수 중앙값"""
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for call in calls:
+            gc.collect()
+            before = sys.getallocatedblocks()
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            result = call()
+            _, peak = tracemalloc.get_traced_memory()
+            del result
+            gc.collect()
+            peaks.append((peak - base) / 1024)
+            retained.append(sys.getallocatedblocks() - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.median(peaks), statistics.median(retained)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def run_case(factory, scenario: str, iterations: int, warmup: int, alloc_samples: int) -> Dict[str, Any]:
+    if scenario == "cold":
+        inputs = cold_inputs(iterations + alloc_samples)
+        calls = [factory(raw) for raw in inputs[:iterations]]
+        alloc_calls = [factory(raw) for raw in inputs[iterations:]]
+    else:
+        call = factory(REPRESENTATIVE[0])
+        for _ in range(warmup):
+            call()
+        calls = [call] * iterations
+        alloc_calls = [call] * alloc_samples
+
+    timings = sorted(_time_calls(calls))
+    peak_kib, retained_blocks = _alloc_stats(alloc_calls) if alloc_samples else (0.0, 0.0)
+    return {
+        "iterations": iterations,
+        "median_us": round(statistics.median(timings), 2),
+        "mean_us": round(statistics.fmean(timings), 2),
+        "p95_us": round(_percentile(timings, 95), 2),
+        "min_us": round(timings[0], 2),
+        "peak_alloc_kib": round(peak_kib, 2),
+        "retained_blocks": retained_blocks,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float, min_delta_us: float) -> List[str]:
+    """기준선 대비 중앙값 시간 또는 최대 할당량이 threshold 비율 이상 늘어난 항목"""
+    regressions = []
+    for key, current in sorted(results.items()):
+        base = baseline.get(key)
+        if not base:
+            continue
+        delta_us = current["median_us"] - base["median_us"]
+        if base["median_us"] and delta_us > min_delta_us and delta_us / base["median_us"] > threshold:
+            regressions.append(f"{key}: 시간 {base['median_us']}us → {current['median_us']}us (+{delta_us / base['median_us']:.0%})")
+        base_peak = base.get("peak_alloc_kib", 0)
+        if base_peak and (current["peak_alloc_kib"] - base_peak) / base_peak > threshold and current["peak_alloc_kib"] - base_peak > 1:
+            regressions.append(f"{key}: 할당 {base_peak}KiB → {current['peak_alloc_kib']}KiB")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{'case':<44}{'median':>10}{'p95':>10}{'min':>10}{'peakKiB':>9}{'blocks':>8}{'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+    for key, row in sorted(results.items()):
+        change = ""
+        base = baseline.get(key)
+        if base and base["median_us"]:
+            change = f"{(row['median_us'] - base['median_us']) / base['median_us']:+.0%}"
+        print(f"{key:<44}{row['median_us']:>10}{row['p95_us']:>10}{row['min_us']:>10}"
+              f"{row['peak_alloc_kib']:>9}{row['retained_blocks']:>8}{change:>9}")
+    print("(시간 단위 us)")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="사주 분석 마이크로 벤치마크")
+    parser.add_argument("--iterations", type=int, default=200, help="케이스/시나리오별 측정 호출 수")
+    parser.add_argument("--warmup", type=int, default=20, help="warm 시나리오 워밍업 호출 수")
+    parser.add_argument("--alloc-samples", type=int, default=20, help="할당 측정 호출 수 (0이면 생략)")
+    parser.add_argument("--scenario", choices=("cold", "warm", "both"), default="both")
+    parser.add_argument("--filter", default="", help="케이스 이름에 포함된 문자열로 선택")
+    parser.add_argument("--db", help="픽스처 대신 사용할 만세력 DB 경로")
+    parser.add_argument("--save-baseline", help="결과를 기준선 JSON으로 저장")
+    parser.add_argument("--compare", help="기준선 JSON과 비교 (회귀 시 종료 코드 1)")
+    parser.add_argument("--threshold", type=float, default=0.15, help="회귀로 판단할 증가 비율")
+    parser.add_argument("--min-delta-us", type=float, default=5.0, help="이보다 작은 절대 증가는 잡음으로 무시")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    from app.database.connection import manseryuk_db
+    with tempfile.TemporaryDirectory() as tmp:
+        manseryuk_db.db_path = os.path.abspath(args.db) if args.db else build_fixture_db(os.path.join(tmp, "manseryuk_fixture.db"))
+
+        scenarios = ("cold", "warm") if args.scenario == "both" else (args.scenario,)
+        results: Dict[str, Dict[str, Any]] = {}
+        for name, factory in build_cases().items():
+            if args.filter not in name:
+                continue
+            for scenario in scenarios:
+                results[f"{name}[{scenario}]"] = run_case(factory, scenario, args.iterations, args.warmup, args.alloc_samples)
+
+    baseline: Dict[str, Dict[str, Any]] = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "db": "fixture" if not args.db else args.db,
+                "results": results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"기준선 저장: {args.save_baseline}")
+
+    if args.compare:
+        regressions = compare(results, baseline, args.threshold, args.min_delta_us)
+        if regressions:
+            print(f"\n회귀 {len(regressions)}건 (임계값 {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\n회귀 없음 (임계값 {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
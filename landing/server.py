@@ -2,40 +2,232 @@
 """
 MSProject2 SAJU 랜딩 페이지 서버
 포트 4000에서 간단한 HTML 랜딩 페이지를 제공합니다.
+
+- 요청마다 스레드를 사용하므로 느린 클라이언트가 다른 요청을 막지 않습니다.
+- HTTP/1.1 keep-alive로 한 연결에서 여러 파일을 받습니다.
+- 작은 파일은 메모리에 캐시하고, gzip(과 brotli 모듈이 있으면 brotli)으로 미리 압축해 둡니다.
+- ETag / Last-Modified 조건부 요청에 304로 응답합니다.
 """
 
+import email.utils
+import gzip
+import hashlib
 import http.server
-import socketserver
+import io
+import mimetypes
 import os
 import sys
+import threading
+from functools import partial
 from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성: 없으면 gzip만 제공
+    brotli = None
 
 # 포트 설정
-PORT = 4000
+PORT = int(os.getenv("LANDING_PORT", "4000"))
 
-# 현재 스크립트가 있는 디렉토리로 변경
+# 정적 파일 루트 (현재 스크립트가 있는 디렉토리)
 script_dir = Path(__file__).parent
-os.chdir(script_dir)
+
+# 이 크기 이하의 파일만 메모리에 캐시 (큰 파일은 디스크에서 바로 전송)
+CACHE_MAX_FILE_BYTES = int(os.getenv("LANDING_CACHE_MAX_FILE_BYTES", str(512 * 1024)))
+# 유휴 keep-alive 연결을 끊기까지의 시간(초)
+KEEP_ALIVE_TIMEOUT = float(os.getenv("LANDING_KEEP_ALIVE_TIMEOUT", "15"))
+
+# HTML, 서비스 워커, 매니페스트는 배포 즉시 반영되도록 매번 재검증, 나머지는 1시간 캐시
+REVALIDATE_SUFFIXES = (".html", ".json")
+REVALIDATE_FILES = ("sw.js",)
+CACHE_CONTROL_REVALIDATE = "no-cache"
+CACHE_CONTROL_ASSET = "public, max-age=3600"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/manifest+json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 256
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+class CachedFile(NamedTuple):
+    mtime_ns: int
+    size: int
+    content_type: str
+    etag: str
+    last_modified: str
+    cache_control: str
+    variants: Dict[str, bytes]  # {"identity" | "gzip" | "br": 본문}
+
+
+class StaticFileCache:
+    """경로별 파일 내용과 압축본을 보관합니다. 파일의 mtime/크기가 바뀌면 다시 읽습니다."""
+
+    def __init__(self, max_file_bytes: int = CACHE_MAX_FILE_BYTES):
+        self.max_file_bytes = max_file_bytes
+        self._entries: Dict[str, CachedFile] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Optional[CachedFile]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if stat.st_size > self.max_file_bytes:
+            return None
+        entry = self._entries.get(path)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry
+        entry = self._load(path, stat)
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def _load(self, path: str, stat: os.stat_result) -> CachedFile:
+        with open(path, "rb") as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json", "application/manifest+json"):
+            content_type += "; charset=utf-8"
+
+        variants = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+            # mtime=0: 같은 내용이면 항상 같은 압축 결과
+            variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants["br"] = brotli.compress(body, quality=11)
+
+        name = os.path.basename(path)
+        if name.endswith(REVALIDATE_SUFFIXES) or name in REVALIDATE_FILES:
+            cache_control = CACHE_CONTROL_REVALIDATE
+        else:
+            cache_control = CACHE_CONTROL_ASSET
+
+        return CachedFile(
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            content_type=content_type,
+            # 압축 변형끼리 같은 값을 쓰므로 약한 ETag
+            etag='W/"' + hashlib.sha1(body).hexdigest()[:20] + '"',
+            last_modified=email.utils.formatdate(stat.st_mtime, usegmt=True),
+            cache_control=cache_control,
+            variants=variants,
+        )
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """Accept-Encoding에서 q=0이 아닌 인코딩 중 가장 작은 것(br > gzip)을 고릅니다."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # 약한 비교: W/ 접두사를 무시하고 비교
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any(tag.strip()[2:] == opaque if tag.strip().startswith("W/") else tag.strip() == opaque
+               for tag in if_none_match.split(","))
+
+
+file_cache = StaticFileCache()
+
 
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # keep-alive를 위해 HTTP/1.1 사용 (모든 응답에 Content-Length 지정)
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+
     def end_headers(self):
         # CORS 헤더 추가 (다른 포트의 서비스들과 연동 위해)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         super().end_headers()
-    
+
     def do_GET(self):
         # 루트 경로로 접근시 index.html 반환
         if self.path == '/':
             self.path = '/index.html'
         return super().do_GET()
 
+    def do_HEAD(self):
+        if self.path == '/':
+            self.path = '/index.html'
+        return super().do_HEAD()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = os.path.join(path, "index.html")
+            if not urlsplit(self.path).path.endswith("/") or not os.path.isfile(index):
+                # 디렉토리 리다이렉트/목록은 기본 동작 사용
+                return super().send_head()
+            path = index
+        if not os.path.isfile(path):
+            return super().send_head()
+
+        entry = file_cache.get(path)
+        if entry is None:
+            # 캐시 한도를 넘는 큰 파일은 디스크에서 스트리밍
+            return super().send_head()
+
+        if_none_match = self.headers.get("If-None-Match")
+        not_modified = (
+            etag_matches(if_none_match, entry.etag) if if_none_match is not None
+            else self.headers.get("If-Modified-Since") == entry.last_modified
+        )
+
+        encoding = choose_encoding(self.headers.get("Accept-Encoding", ""), entry.variants)
+        body = entry.variants[encoding]
+
+        self.send_response(304 if not_modified else 200)
+        self.send_header("ETag", entry.etag)
+        self.send_header("Last-Modified", entry.last_modified)
+        self.send_header("Cache-Control", entry.cache_control)
+        if len(entry.variants) > 1:
+            self.send_header("Vary", "Accept-Encoding")
+        if not_modified:
+            self.end_headers()
+            return None
+
+        self.send_header("Content-Type", entry.content_type)
+        if encoding != "identity":
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        return io.BytesIO(body)
+
+
+class LandingHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # 재시작 직후에도 포트를 바로 다시 사용할 수 있도록
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
 def main():
+    handler = partial(MyHTTPRequestHandler, directory=str(script_dir))
     try:
-        with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
+        with LandingHTTPServer(("", PORT), handler) as httpd:
             print("🔮 MSProject2 SAJU 랜딩 페이지 서버 시작")
             print(f"📍 서버 주소: http://localhost:{PORT}")
+            print(f"⚡ 멀티스레드 / keep-alive / 압축: gzip{', br' if brotli else ''}")
             print("🛑 종료하려면 Ctrl+C를 누르세요")
             print("-" * 50)
             httpd.serve_forever()
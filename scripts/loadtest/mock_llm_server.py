@@ -0,0 +1,293 @@
+"""
+모의 LLM 서버 (부하 테스트용)
+- Gemini generateContent / streamGenerateContent 와 Azure OpenAI chat/completions, images/generations
+  요청 형식을 그대로 받아 유료 API 없이 AI 엔드포인트를 측정할 수 있게 합니다.
+- 응답 지연(로그정규 분포), 오류율, 429 비율, 공급자 동시 처리 한도(초과 시 429 + Retry-After)를 설정할 수 있습니다.
+
+실행:
+    python scripts/loadtest/mock_llm_server.py --port 8900 --latency-ms 800 --rate-limit-rate 0.05
+
+서비스 연결 (각 서비스 실행 전 환경 변수):
+    GEMINI_API_ENDPOINT=http://localhost:8900
+    AZURE_OPENAI_ENDPOINT=http://localhost:8900
+    AZURE_OPENAI_API_KEY=mock
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+# 1x1 PNG (부적 이미지 다운로드용)
+MOCK_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+
+INTERPRETATION_TEXT = """## 핵심 결과 ✨
+- 차분하게 기반을 다지면 좋은 흐름이 이어지는 시기예요.
+
+## 주요 특징 😊
+- 꾸준함과 책임감이 강점이에요
+- 주변의 신뢰를 얻기 쉬운 편이에요
+- 새로운 시도보다 정리에 유리해요
+
+## 실천 조언 💪
+- 작은 목표부터 차근차근 세워보세요
+- 가까운 사람과 대화를 자주 나눠보시면 좋겠어요"""
+
+QUESTIONS_TEXT = json.dumps({
+    "questions": [
+        {"question": "올해 하반기 연애운은 어떨까요?", "category": "연애", "priority": "high", "icon": "💕"},
+        {"question": "지금 이직해도 괜찮을까요?", "category": "직업", "priority": "high", "icon": "💼"},
+        {"question": "건강 관리에서 주의할 점은?", "category": "건강", "priority": "medium", "icon": "🏥"},
+        {"question": "재물운이 좋아지는 시기는?", "category": "재물", "priority": "medium", "icon": "💰"},
+        {"question": "인간관계를 넓히는 방법은?", "category": "인간관계", "priority": "low", "icon": "👥"},
+    ]
+}, ensure_ascii=False)
+
+REPORT_TEXT = json.dumps({
+    "overall": "균형 잡힌 인상으로 대인관계가 원만한 편입니다.",
+    "strengths": ["신뢰감", "집중력"],
+    "advice": ["규칙적인 생활을 유지해보세요"],
+}, ensure_ascii=False)
+
+
+class MockState:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.started = time.time()
+
+    def latency(self) -> float:
+        """중앙값 latency_ms, 로그정규 분포 (sigma가 클수록 꼬리가 김)"""
+        if self.args.latency_ms <= 0:
+            return 0.0
+        return self.rng.lognormvariate(math.log(self.args.latency_ms / 1000), self.args.latency_sigma)
+
+    def fault(self) -> Any:
+        """설정된 확률/동시 처리 한도에 따라 429 또는 5xx 응답을 만듭니다 (정상이면 None)."""
+        args = self.args
+        if args.max_concurrency and self.in_flight > args.max_concurrency:
+            return _error(429, "Resource has been exhausted (concurrency)", args.retry_after)
+        roll = self.rng.random()
+        if roll < args.rate_limit_rate:
+            return _error(429, "Resource has been exhausted (e.g. check quota).", args.retry_after)
+        if roll < args.rate_limit_rate + args.error_rate:
+            return _error(503, "The model is overloaded. Please try again later.", None)
+        return None
+
+
+def _error(status: int, message: str, retry_after: Any) -> web.Response:
+    headers = {"Retry-After": str(retry_after)} if retry_after is not None and status == 429 else {}
+    body = {"error": {"code": status, "message": message, "status": "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"}}
+    return web.json_response(body, status=status, headers=headers)
+
+
+def _prompt_text(parts: List[str]) -> str:
+    return "\n".join(p for p in parts if isinstance(p, str))
+
+
+def _answer_for(prompt: str) -> str:
+    # 질문 생성 / 관상 리포트 프롬프트는 JSON 응답을 기대
+    if '"questions"' in prompt:
+        return QUESTIONS_TEXT
+    if "JSON" in prompt:
+        return REPORT_TEXT
+    return INTERPRETATION_TEXT
+
+
+def _chunks(text: str, size: int) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 3)
+
+
+@web.middleware
+async def accounting(request: web.Request, handler):
+    state: MockState = request.app["state"]
+    if request.path.startswith(("/stats", "/mock-assets")):
+        return await handler(request)
+    state.in_flight += 1
+    state.max_in_flight = max(state.max_in_flight, state.in_flight)
+    try:
+        response = await handler(request)
+    finally:
+        state.in_flight -= 1
+    state.statuses[response.status] += 1
+    return response
+
+
+async def gemini(request: web.Request) -> web.StreamResponse:
+    """POST /v1beta/models/{model}:generateContent | :streamGenerateContent"""
+    state: MockState = request.app["state"]
+    model, _, action = request.match_info["model_action"].partition(":")
+    state.requests[f"gemini:{action}"] += 1
+
+    body = await request.json()
+    prompt = _prompt_text([part.get("text") for content in body.get("contents", []) for part in content.get("parts", [])])
+    answer = _answer_for(prompt)
+    usage = {
+        "promptTokenCount": _tokens(prompt),
+        "candidatesTokenCount": _tokens(answer),
+        "totalTokenCount": _tokens(prompt) + _tokens(answer),
+    }
+
+    fault = state.fault()
+    if fault is not None:
+        await asyncio.sleep(state.latency() * 0.1)
+        return fault
+
+    def candidate(text: str) -> Dict[str, Any]:
+        return {"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}
+
+    if action != "streamGenerateContent":
+        await asyncio.sleep(state.latency())
+        return web.json_response({"candidates": [candidate(answer)], "usageMetadata": usage, "modelVersion": model})
+
+    # 스트리밍: 첫 토큰까지 지연의 절반, 나머지를 청크로 나눠 전송
+    chunks = _chunks(answer, state.args.stream_chunk_chars)
+    total = state.latency()
+    sse = request.query.get("alt") == "sse"
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream" if sse else "application/json"})
+    await response.prepare(request)
+    await asyncio.sleep(total / 2)
+    if not sse:
+        await response.write(b"[")
+    for i, chunk in enumerate(chunks):
+        event: Dict[str, Any] = {"candidates": [candidate(chunk)], "modelVersion": model}
+        if i == len(chunks) - 1:
+            event["usageMetadata"] = usage
+        data = json.dumps(event, ensure_ascii=False)
+        if sse:
+            await response.write(f"data: {data}\r\n\r\n".encode("utf-8"))
+        else:
+            await response.write(((",\n" if i else "") + data).encode("utf-8"))
+        await asyncio.sleep(total / 2 / len(chunks))
+    if not sse:
+        await response.write(b"]")
+    await response.write_eof()
+    return response
+
+
+async def azure_chat(request: web.Request) -> web.StreamResponse:
+    """POST /openai/deployments/{deployment}/chat/completions"""
+    state: MockState = request.app["state"]
+    deployment = request.match_info["deployment"]
+    body = await request.json()
+    stream = bool(body.get("stream"))
+    state.requests["azure:chat" + (":stream" if stream else "")] += 1
+
+    prompt = _prompt_text([m.get("content") for m in body.get("messages", [])])
+    answer = _answer_for(prompt)
+    usage = {"prompt_tokens": _tokens(prompt), "completion_tokens": _tokens(answer), "total_tokens": _tokens(prompt) + _tokens(answer)}
+    completion_id = f"chatcmpl-mock-{state.rng.getrandbits(48):x}"
+
+    fault = state.fault()
+    if fault is not None:
+        await asyncio.sleep(state.latency() * 0.1)
+        return fault
+
+    if not stream:
+        await asyncio.sleep(state.latency())
+        return web.json_response({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": deployment,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    chunks = _chunks(answer, state.args.stream_chunk_chars)
+    total = state.latency()
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    await asyncio.sleep(total / 2)
+    for i, chunk in enumerate(chunks):
+        delta = {"role": "assistant", "content": chunk} if i == 0 else {"content": chunk}
+        event = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": deployment,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if i == len(chunks) - 1 else None}],
+        }
+        await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await asyncio.sleep(total / 2 / len(chunks))
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+
+async def azure_images(request: web.Request) -> web.Response:
+    """POST /openai/deployments/{deployment}/images/generations (부적 이미지 생성)"""
+    state: MockState = request.app["state"]
+    state.requests["azure:images"] += 1
+    fault = state.fault()
+    if fault is not None:
+        return fault
+    # 이미지 생성은 텍스트보다 훨씬 느림
+    await asyncio.sleep(state.latency() * state.args.image_latency_factor)
+    url = f"{request.scheme}://{request.host}/mock-assets/charm.png"
+    return web.json_response({"created": int(time.time()), "data": [{"url": url, "revised_prompt": "mock"}]})
+
+
+async def mock_image(request: web.Request) -> web.Response:
+    return web.Response(body=MOCK_PNG, content_type="image/png")
+
+
+async def stats(request: web.Request) -> web.Response:
+    state: MockState = request.app["state"]
+    return web.json_response({
+        "uptime_seconds": round(time.time() - state.started, 1),
+        "in_flight": state.in_flight,
+        "max_in_flight": state.max_in_flight,
+        "requests": dict(state.requests),
+        "statuses": {str(k): v for k, v in state.statuses.items()},
+        "config": vars(state.args),
+    })
+
+
+def create_app(args: argparse.Namespace) -> web.Application:
+    app = web.Application(middlewares=[accounting])
+    app["state"] = MockState(args)
+    app.router.add_post("/v1beta/models/{model_action}", gemini)
+    app.router.add_post("/openai/deployments/{deployment}/chat/completions", azure_chat)
+    app.router.add_post("/openai/deployments/{deployment}/images/generations", azure_images)
+    app.router.add_get("/mock-assets/charm.png", mock_image)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Gemini/Azure OpenAI 모의 서버")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=800, help="응답 지연 중앙값 (0이면 지연 없음)")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="로그정규 분포 sigma (꼬리 길이)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 응답 비율")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 응답 비율")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="동시 처리 한도, 넘으면 429 (0이면 무제한)")
+    parser.add_argument("--retry-after", type=float, default=1, help="429 응답의 Retry-After (초)")
+    parser.add_argument("--stream-chunk-chars", type=int, default=24, help="스트리밍 청크 크기 (문자 수)")
+    parser.add_argument("--image-latency-factor", type=float, default=5.0, help="이미지 생성 지연 배수")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    print(f"모의 LLM 서버: http://{arguments.host}:{arguments.port} (GET /stats 로 통계 확인)")
+    web.run_app(create_app(arguments), host=arguments.host, port=arguments.port, print=None)
@@ -0,0 +1,215 @@
+"""
+부하 테스트 실행기 (asyncio + aiohttp)
+- 가상 사용자 N명이 시나리오 단계를 반복 실행하고, 엔드포인트별 처리량과 p50/p95/p99 지연을 보고합니다.
+- 실행 후 서비스의 통계 엔드포인트(/llm-limits, /prompt-metrics 등)를 함께 수집해 JSON 보고서에 남깁니다.
+
+예:
+    python scripts/loadtest/run_load.py saju --concurrency 20 --duration 60
+    python scripts/loadtest/run_load.py compatibility --requests 500 --report compat.json
+    python scripts/loadtest/run_load.py physiognomy --image sample_face.jpg --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from scenarios import SCENARIOS, Context, make_users  # noqa: E402
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """최근접 순위(nearest-rank) 백분위수"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Dict[str, int] = Counter()
+        self.measuring = False
+
+    def add(self, name: str, latency: float, status: Any, ok: bool) -> None:
+        if not self.measuring:
+            return
+        self.samples[name].append(latency)
+        self.statuses[name][str(status)] += 1
+        if not ok:
+            self.errors[name] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        all_latencies: List[float] = []
+        for name in sorted(self.samples):
+            latencies = sorted(self.samples[name])
+            all_latencies.extend(latencies)
+            endpoints[name] = _summarize(latencies, self.errors[name], elapsed)
+            endpoints[name]["statuses"] = dict(self.statuses[name])
+        overall = _summarize(sorted(all_latencies), sum(self.errors.values()), elapsed)
+        return {"elapsed_seconds": round(elapsed, 2), "overall": overall, "endpoints": endpoints}
+
+
+def _summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / count * 1000, 1) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if count else 0.0,
+    }
+
+
+class Client:
+    """단계 함수가 사용하는 HTTP 클라이언트. 호출마다 이름별로 지연/상태를 기록합니다."""
+
+    def __init__(self, session: aiohttp.ClientSession, base_url: str, recorder: Recorder):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+
+    async def request(self, name: str, method: str, path: str, json: Any = None,
+                      params: Optional[Dict[str, Any]] = None, files: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        data = None
+        if files:
+            data = aiohttp.FormData()
+            for field_name, (filename, content, content_type) in files.items():
+                data.add_field(field_name, content, filename=filename, content_type=content_type)
+        started = time.perf_counter()
+        try:
+            async with self.session.request(method, self.base_url + path, json=json, params=params, data=data) as response:
+                body = await response.read()
+                latency = time.perf_counter() - started
+                ok = response.status < 400
+                self.recorder.add(name, latency, response.status, ok)
+                if not ok:
+                    return None
+                try:
+                    return _json_loads(body)
+                except ValueError:
+                    return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.recorder.add(name, time.perf_counter() - started, type(e).__name__, False)
+            return None
+
+
+def _json_loads(body: bytes) -> Any:
+    return json.loads(body.decode("utf-8")) if body else None
+
+
+async def virtual_user(user_id: int, scenario, client: Client, ctx: Context, deadline: float,
+                       budget: Optional[List[int]], think_seconds: float) -> None:
+    rng = random.Random(ctx.rng.random() + user_id)
+    user_ctx = Context(rng=rng, users=ctx.users, image=ctx.image, image_name=ctx.image_name)
+    while time.monotonic() < deadline:
+        if budget is not None:
+            if budget[0] <= 0:
+                return
+            budget[0] -= 1
+        _, step = scenario.pick(rng)
+        await step(client, user_ctx)
+        if think_seconds:
+            await asyncio.sleep(rng.uniform(0, 2 * think_seconds))
+
+
+async def collect_stats(session: aiohttp.ClientSession, base_url: str, paths: List[str]) -> Dict[str, Any]:
+    stats = {}
+    for path in paths:
+        try:
+            async with session.get(base_url.rstrip("/") + path) as response:
+                stats[path] = await response.json(content_type=None) if response.status == 200 else {"status": response.status}
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            stats[path] = {"error": str(e)}
+    return stats
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    scenario = SCENARIOS[args.scenario]
+    base_url = args.base_url or scenario.default_base_url
+    ctx = Context(rng=random.Random(args.seed), users=make_users(args.distinct_users, args.seed))
+    if scenario.requires_image:
+        if not args.image:
+            raise SystemExit(f"{scenario.name} 시나리오는 --image (얼굴 이미지 경로)가 필요합니다.")
+        with open(args.image, "rb") as f:
+            ctx.image = f.read()
+        ctx.image_name = os.path.basename(args.image)
+
+    recorder = Recorder()
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        client = Client(session, base_url, recorder)
+        budget = [args.requests] if args.requests else None
+        deadline = time.monotonic() + args.warmup + (args.duration if not args.requests else 10 ** 9)
+
+        users = [
+            asyncio.ensure_future(virtual_user(i, scenario, client, ctx, deadline, budget, args.think_ms / 1000))
+            for i in range(args.concurrency)
+        ]
+        # 워밍업 구간(연결 수립, 캐시 적재)은 집계에서 제외
+        if args.warmup:
+            await asyncio.sleep(args.warmup)
+        recorder.measuring = True
+        started = time.monotonic()
+        await asyncio.gather(*users)
+        elapsed = time.monotonic() - started
+
+        report = recorder.report(elapsed)
+        report["scenario"] = scenario.name
+        report["base_url"] = base_url
+        report["config"] = {k: v for k, v in vars(args).items() if k != "image"}
+        report["service_stats"] = await collect_stats(session, base_url, scenario.stats_paths)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = f"{'endpoint':<36}{'reqs':>7}{'err':>6}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(f"\n[{report['scenario']}] {report['base_url']}  ({report['elapsed_seconds']}s, 지연 단위 ms)")
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("(전체)", report["overall"])]
+    for name, row in rows:
+        print(f"{name:<36}{row['requests']:>7}{row['errors']:>6}{row['throughput_rps']:>8}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="SAJU / NewCompatibility / Physiognomy 부하 테스트")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--base-url", help="서비스 주소 (기본: 시나리오별 로컬 포트)")
+    parser.add_argument("--concurrency", type=int, default=10, help="가상 사용자 수")
+    parser.add_argument("--duration", type=float, default=30, help="측정 시간 (초)")
+    parser.add_argument("--requests", type=int, default=0, help="지정하면 시간 대신 단계 실행 횟수로 종료")
+    parser.add_argument("--warmup", type=float, default=0, help="집계에서 제외할 시작 구간 (초)")
+    parser.add_argument("--think-ms", type=float, default=0, help="단계 사이 평균 대기 시간")
+    parser.add_argument("--distinct-users", type=int, default=200, help="출생 정보 풀 크기 (작을수록 캐시 적중 증가)")
+    parser.add_argument("--timeout", type=float, default=120, help="요청 타임아웃 (초)")
+    parser.add_argument("--image", help="physiognomy 시나리오용 얼굴 이미지")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--report", help="JSON 보고서 저장 경로")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    result = asyncio.run(run(arguments))
+    print_report(result)
+    if arguments.report:
+        with open(arguments.report, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n보고서 저장: {arguments.report}")
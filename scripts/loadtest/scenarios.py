@@ -0,0 +1,196 @@
+"""
+부하 테스트 시나리오 (SAJU / NewCompatibility / Physiognomy)
+- 시나리오는 가중치가 있는 단계 목록이며, 가상 사용자는 매 반복마다 가중치에 따라 단계 하나를 골라 실행합니다.
+- 출생 정보는 고정 크기의 사용자 풀에서 뽑으므로 풀 크기(--distinct-users)로 캐시/병합 적중률을 조절할 수 있습니다.
+- 각 단계는 `client.request(이름, ...)`로 호출하며, 이름별로 지연 시간이 집계됩니다.
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+QUESTIONS = (
+    "올해 전반적인 운세는 어떤가요?",
+    "이직하기 좋은 시기가 언제일까요?",
+    "연애운이 궁금해요",
+    "건강에서 주의할 점은?",
+    "재물운을 높이려면 어떻게 해야 하나요?",
+)
+COMPATIBILITY_QUESTIONS = (
+    "우리 둘이 결혼하면 어떨까요?",
+    "갈등이 생기면 어떻게 풀어야 할까요?",
+    "서로 잘 맞는 점은 무엇인가요?",
+)
+
+
+@dataclass
+class Context:
+    rng: random.Random
+    users: List[Dict[str, Any]]
+    image: bytes = b""
+    image_name: str = "face.jpg"
+
+    def person(self) -> Dict[str, Any]:
+        return self.rng.choice(self.users)
+
+    def pair(self) -> Dict[str, Any]:
+        first, second = self.rng.sample(self.users, 2)
+        return {"person1": first, "person2": second}
+
+
+StepFn = Callable[[Any, Context], Awaitable[None]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    default_base_url: str
+    steps: List[Tuple[str, int, StepFn]]
+    # 실행 후 수집할 서비스 자체 통계 엔드포인트
+    stats_paths: List[str] = field(default_factory=list)
+    requires_image: bool = False
+
+    def pick(self, rng: random.Random) -> Tuple[str, StepFn]:
+        name, _, fn = rng.choices(self.steps, weights=[weight for _, weight, _ in self.steps])[0]
+        return name, fn
+
+
+def make_users(count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    users = []
+    for i in range(max(2, count)):
+        users.append({
+            "year": rng.randint(1960, 2005),
+            "month": rng.randint(1, 12),
+            "day": rng.randint(1, 28),
+            "hour": rng.randint(0, 23),
+            "gender": rng.choice(("male", "female")),
+            "name": f"사용자{i:04d}",
+        })
+    return users
+
+
+# ==================== SAJU (기본 포트 8000) ====================
+
+async def saju_analyze(client, ctx: Context) -> None:
+    await client.request("saju.analyze", "POST", "/api/v1/saju/analyze", json=ctx.person())
+
+
+async def saju_extended_fortune(client, ctx: Context) -> None:
+    await client.request("saju.extended-fortune", "POST", "/api/v1/saju/extended-fortune", json=ctx.person())
+
+
+async def saju_ai_chat(client, ctx: Context) -> None:
+    await client.request("saju.ai-chat", "POST", "/api/v1/saju/ai-chat",
+                         json=ctx.person(), params={"question": ctx.rng.choice(QUESTIONS)})
+
+
+async def saju_suggested_questions(client, ctx: Context) -> None:
+    await client.request("saju.suggested-questions", "POST", "/api/v1/saju/suggested-questions",
+                         json=ctx.person(), params={"method": "ai"})
+
+
+async def saju_chat_session(client, ctx: Context) -> None:
+    """세션 생성 → 질문 2회 → 종료"""
+    created = await client.request("saju.chat-session.create", "POST", "/api/v1/saju/chat-sessions", json=ctx.person())
+    if not created:
+        return
+    session_id = created["data"]["session_id"]
+    for question in ctx.rng.sample(QUESTIONS, 2):
+        await client.request("saju.chat-session.message", "POST", f"/api/v1/saju/chat-sessions/{session_id}/messages",
+                             params={"question": question})
+    await client.request("saju.chat-session.delete", "DELETE", f"/api/v1/saju/chat-sessions/{session_id}")
+
+
+async def saju_azure_chat(client, ctx: Context) -> None:
+    await client.request("saju.azure.chat", "POST", "/api/v1/azure/chat",
+                         json=ctx.person(), params={"question": ctx.rng.choice(QUESTIONS)})
+
+
+async def saju_azure_questions(client, ctx: Context) -> None:
+    await client.request("saju.azure.questions", "POST", "/api/v1/azure/questions", json=ctx.person())
+
+
+SAJU = Scenario(
+    name="saju",
+    default_base_url="http://localhost:8000",
+    steps=[
+        ("analyze", 4, saju_analyze),
+        ("extended-fortune", 2, saju_extended_fortune),
+        ("ai-chat", 3, saju_ai_chat),
+        ("suggested-questions", 1, saju_suggested_questions),
+        ("chat-session", 1, saju_chat_session),
+        ("azure-chat", 2, saju_azure_chat),
+        ("azure-questions", 1, saju_azure_questions),
+    ],
+    stats_paths=["/response-cache", "/single-flight", "/prompt-metrics", "/llm-limits", "/chat-session-stats"],
+)
+
+
+# ==================== NewCompatibility (기본 포트 8003) ====================
+
+async def compatibility_analyze(client, ctx: Context) -> None:
+    await client.request("compatibility.analyze", "POST", "/api/v1/compatibility/analyze", json=ctx.pair())
+
+
+async def compatibility_ai_chat(client, ctx: Context) -> None:
+    await client.request("compatibility.ai-chat", "POST", "/api/v1/compatibility/ai-chat",
+                         json=ctx.pair(), params={"question": ctx.rng.choice(COMPATIBILITY_QUESTIONS)})
+
+
+async def compatibility_suggested_questions(client, ctx: Context) -> None:
+    await client.request("compatibility.suggested-questions", "POST", "/api/v1/compatibility/suggested-questions",
+                         json=ctx.pair(), params={"method": "ai"})
+
+
+async def compatibility_azure_chat(client, ctx: Context) -> None:
+    await client.request("compatibility.azure.chat", "POST", "/api/v1/azure-compatibility/chat",
+                         json=ctx.pair(), params={"question": ctx.rng.choice(COMPATIBILITY_QUESTIONS)})
+
+
+async def compatibility_azure_questions(client, ctx: Context) -> None:
+    await client.request("compatibility.azure.questions", "POST", "/api/v1/azure-compatibility/questions", json=ctx.pair())
+
+
+COMPATIBILITY = Scenario(
+    name="compatibility",
+    default_base_url="http://localhost:8003",
+    steps=[
+        ("analyze", 4, compatibility_analyze),
+        ("ai-chat", 3, compatibility_ai_chat),
+        ("suggested-questions", 1, compatibility_suggested_questions),
+        ("azure-chat", 2, compatibility_azure_chat),
+        ("azure-questions", 1, compatibility_azure_questions),
+    ],
+    stats_paths=["/prompt-metrics", "/llm-limits"],
+)
+
+
+# ==================== Physiognomy (기본 포트 8001) ====================
+
+async def physiognomy_analyze(client, ctx: Context) -> None:
+    await client.request("physiognomy.analyze", "POST", "/analyze/",
+                         files={"file": (ctx.image_name, ctx.image, "image/jpeg")})
+
+
+async def physiognomy_analyses(client, ctx: Context) -> None:
+    await client.request("physiognomy.analyses", "GET", "/analyses/", params={"limit": 10})
+
+
+async def physiognomy_rules(client, ctx: Context) -> None:
+    await client.request("physiognomy.rules", "GET", "/rules/")
+
+
+PHYSIOGNOMY = Scenario(
+    name="physiognomy",
+    default_base_url="http://localhost:8001",
+    steps=[
+        ("analyze", 5, physiognomy_analyze),
+        ("analyses", 3, physiognomy_analyses),
+        ("rules", 1, physiognomy_rules),
+    ],
+    stats_paths=["/pipeline-metrics/", "/report-cache/", "/charm-cache/"],
+    requires_image=True,
+)
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (SAJU, COMPATIBILITY, PHYSIOGNOMY)}
@@ -0,0 +1,170 @@
+"""
+JSONL 스팬 파일로 트레이스 재구성
+- 여러 서비스(SAJU, NewCompatibility)의 JSONL 파일을 합쳐 trace_id별 스팬 트리를 만들고,
+  각 트레이스의 임계 경로(critical path: 응답 시간을 실제로 결정한 스팬 사슬)를 표시합니다.
+- 여러 트레이스를 모아 스팬 이름별로 임계 경로에서 차지한 자기 시간(self time)을 합산합니다.
+
+예:
+    python scripts/tracing/trace_report.py SAJU/backend/traces NewCompatibility/backend/traces
+    python scripts/tracing/trace_report.py traces/*.jsonl --root "POST /api/v1/compatibility/analyze" --slowest 3
+    python scripts/tracing/trace_report.py traces --trace 4bf92f3577b34da6a3ce929d0e0e4736
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+Span = Dict[str, Any]
+
+
+def iter_files(paths: Iterable[str]) -> Iterable[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, "*.jsonl")))
+        else:
+            yield from sorted(glob.glob(path)) or [path]
+
+
+def load_spans(paths: Iterable[str]) -> Dict[str, List[Span]]:
+    traces: Dict[str, List[Span]] = defaultdict(list)
+    for path in iter_files(paths):
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    print(f"{path}:{line_no} JSON 파싱 실패, 건너뜀", file=sys.stderr)
+                    continue
+                span["end_ns"] = span["start_ns"] + int(span["duration_ms"] * 1e6)
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def build_tree(spans: List[Span]) -> Tuple[List[Span], Dict[str, List[Span]]]:
+    """(루트 스팬 목록, span_id → 자식 목록). 부모가 파일에 없는 스팬(원격 부모 미수집)은 루트로 취급"""
+    by_id = {span["span_id"]: span for span in spans}
+    children: Dict[str, List[Span]] = defaultdict(list)
+    roots = []
+    for span in spans:
+        if span.get("parent_id") in by_id:
+            children[span["parent_id"]].append(span)
+        else:
+            roots.append(span)
+    for siblings in children.values():
+        siblings.sort(key=lambda s: s["start_ns"])
+    roots.sort(key=lambda s: s["start_ns"])
+    return roots, children
+
+
+def critical_path(span: Span, children: Dict[str, List[Span]]) -> List[Tuple[Span, float]]:
+    """
+    span의 임계 경로를 [(스팬, 임계 경로상 자기 시간 ms)] 로 반환합니다.
+    끝에서부터 거꾸로, 현재 시점 이전에 끝난 자식 중 가장 늦게 끝난 자식을 따라갑니다 (병렬 자식 중 느린 쪽).
+    """
+    path: List[Tuple[Span, float]] = []
+    cursor = span["end_ns"]
+    covered_ns = 0
+    for child in sorted(children.get(span["span_id"], []), key=lambda s: s["end_ns"], reverse=True):
+        if child["end_ns"] > cursor:
+            continue
+        # 서비스 간 시계 차이로 부모 범위를 벗어난 부분은 잘라냄
+        start = max(child["start_ns"], span["start_ns"])
+        covered_ns += max(0, child["end_ns"] - start)
+        path.extend(critical_path(child, children))
+        cursor = start
+    self_ms = max(0.0, (span["end_ns"] - span["start_ns"] - covered_ns) / 1e6)
+    return [(span, self_ms)] + path
+
+
+def print_tree(span: Span, children: Dict[str, List[Span]], origin_ns: int, critical_ids: set, depth: int = 0) -> None:
+    marker = "*" if span["span_id"] in critical_ids else " "
+    offset_ms = (span["start_ns"] - origin_ns) / 1e6
+    status = "" if span.get("status") == "ok" else f"  [오류] {span.get('error') or ''}"
+    label = f"{'  ' * depth}{span['name']}"
+    print(f"{marker} {label:<56} {span.get('service', ''):<18} +{offset_ms:>9.1f}ms {span['duration_ms']:>10.1f}ms{status}")
+    for child in children.get(span["span_id"], []):
+        print_tree(child, children, origin_ns, critical_ids, depth + 1)
+
+
+def root_duration(spans: List[Span]) -> float:
+    roots, _ = build_tree(spans)
+    return max((root["duration_ms"] for root in roots), default=0.0)
+
+
+def select_traces(traces: Dict[str, List[Span]], root_name: Optional[str]) -> Dict[str, List[Span]]:
+    if not root_name:
+        return traces
+    selected = {}
+    for trace_id, spans in traces.items():
+        roots, _ = build_tree(spans)
+        if any(root["name"] == root_name for root in roots):
+            selected[trace_id] = spans
+    return selected
+
+
+def summarize(traces: Dict[str, List[Span]]) -> List[Tuple[str, int, float, float]]:
+    """스팬 이름별 (임계 경로 등장 횟수, 자기 시간 합계 ms, 평균 ms) - 합계 내림차순"""
+    totals: Dict[str, List[float]] = defaultdict(list)
+    for spans in traces.values():
+        roots, children = build_tree(spans)
+        for root in roots:
+            for span, self_ms in critical_path(root, children):
+                totals[f"{span.get('service', '')}:{span['name']}"].append(self_ms)
+    rows = [(name, len(values), sum(values), sum(values) / len(values)) for name, values in totals.items()]
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def print_trace(trace_id: str, spans: List[Span]) -> None:
+    roots, children = build_tree(spans)
+    origin = min(span["start_ns"] for span in spans)
+    services = sorted({span.get("service", "") for span in spans})
+    print(f"\n=== trace {trace_id}  ({len(spans)} spans, {', '.join(services)}) — * = 임계 경로")
+    for root in roots:
+        critical_ids = {span["span_id"] for span, _ in critical_path(root, children)}
+        print_tree(root, children, origin, critical_ids)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="JSONL 스팬 파일로 트레이스/임계 경로 재구성")
+    parser.add_argument("paths", nargs="+", help="JSONL 파일, glob, 또는 *.jsonl이 있는 디렉터리")
+    parser.add_argument("--trace", help="이 trace_id만 출력")
+    parser.add_argument("--root", help="루트 스팬 이름으로 필터 (예: 'POST /api/v1/compatibility/analyze')")
+    parser.add_argument("--slowest", type=int, default=5, help="가장 느린 트레이스 N개를 트리로 출력")
+    parser.add_argument("--top", type=int, default=15, help="임계 경로 요약에 표시할 스팬 이름 수")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    traces = select_traces(load_spans(args.paths), args.root)
+    if not traces:
+        print("해당하는 트레이스가 없습니다.")
+        return 1
+
+    if args.trace:
+        if args.trace not in traces:
+            print(f"trace {args.trace}를 찾을 수 없습니다.")
+            return 1
+        print_trace(args.trace, traces[args.trace])
+        return 0
+
+    durations = sorted(((root_duration(spans), trace_id) for trace_id, spans in traces.items()), reverse=True)
+    print(f"트레이스 {len(traces)}개, 루트 지연 최대 {durations[0][0]:.1f}ms / 중앙값 {durations[len(durations) // 2][0]:.1f}ms")
+
+    print(f"\n임계 경로 자기 시간 합계 (상위 {args.top})")
+    print(f"{'service:span':<64}{'count':>7}{'total ms':>12}{'avg ms':>10}")
+    for name, count, total, avg in summarize(traces)[:args.top]:
+        print(f"{name:<64}{count:>7}{total:>12.1f}{avg:>10.1f}")
+
+    for _, trace_id in durations[:args.slowest]:
+        print_trace(trace_id, traces[trace_id])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
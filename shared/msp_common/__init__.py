@@ -0,0 +1,15 @@
+"""
+서비스 공용 모듈 (SAJU / NewCompatibility / Physiognomy 백엔드가 같은 구현을 사용)
+- metrics: Prometheus 형식 지표 (/metrics), 내부 단계 소요 시간
+- tracing: 분산 추적 (W3C traceparent), JSONL/OTLP 내보내기
+- profiling: 요청 단위 샘플링 프로파일러, tracemalloc (/debug/*)
+- logging_setup: 비동기 구조화 로깅, 요청 ID
+- llm_limiter: LLM 공급자별 적응형 동시 실행 제한
+- prompt_builder: LLM 프롬프트 직렬화/토큰 예산/지표 (분석 항목 정의는 각 서비스의 prompt_features)
+
+각 서비스의 app/__init__.py가 shared/ 디렉터리를 sys.path에 추가하고 SERVICE_NAME 기본값을 정합니다.
+"""
+import os
+
+# 스팬/로그 레코드의 서비스 이름 (TRACING_SERVICE_NAME / LOG_SERVICE_NAME으로 개별 지정 가능)
+SERVICE_NAME = os.getenv("SERVICE_NAME", "app")
@@ -0,0 +1,214 @@
+"""
+LLM 공급자별 적응형 동시 실행 제한
+- 공급자(Gemini/Azure)마다 동시에 보내는 요청 수를 AIMD 방식으로 조절
+  (성공하면 천천히 늘리고, 429를 받으면 절반으로 줄임)
+- 자리가 없으면 우선순위 큐에서 대기 (대화형 해석/궁합 해석이 백그라운드 질문 생성보다 먼저)
+- 429/5xx는 Retry-After를 우선으로, 없으면 지수 백오프(+지터)로 재시도
+- 대기 시간, 실행 중/대기 중 요청 수를 통계로 제공
+한도는 프로세스(서비스)마다 따로 관리됩니다.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# 동시 실행 한도 (공급자별)
+LLM_CONCURRENCY_INITIAL = float(os.getenv("LLM_CONCURRENCY_INITIAL", "4"))
+LLM_CONCURRENCY_MIN = float(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+LLM_CONCURRENCY_MAX = float(os.getenv("LLM_CONCURRENCY_MAX", "16"))
+# 재시도 / 백오프
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+# 자리를 기다리는 최대 시간 (넘으면 호출하지 않고 실패 처리)
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+
+# 우선순위 (작을수록 먼저)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class LLMProviderError(Exception):
+    """LLM API 오류 응답. 429와 5xx는 재시도 대상입니다."""
+
+    def __init__(self, message: str, status: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """Retry-After(초 또는 HTTP 날짜) / retry-after-ms(Azure) 헤더를 초 단위로 변환"""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 동시 실행 제한기.
+    - 성공: limit += 1 / limit (한도만큼 성공하면 약 1 증가)
+    - 429: limit *= 0.5. 같은 혼잡으로 동시에 받은 429로 여러 번 줄지 않도록
+      마지막으로 줄인 뒤에 시작한 요청의 429만 반영합니다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: float = LLM_CONCURRENCY_INITIAL,
+        minimum: float = LLM_CONCURRENCY_MIN,
+        maximum: float = LLM_CONCURRENCY_MAX,
+    ):
+        self.name = name
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, "asyncio.Future[None]"]] = []
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        # 통계
+        self.completed = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failed = 0
+        self.queue_timeouts = 0
+        self.max_in_flight = 0
+        self._wait_total = 0.0
+        self._wait_count = 0
+        self._wait_max = 0.0
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(1, int(self.limit))
+
+    def _grant(self) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():  # 대기 중 취소/시간 초과된 요청
+                continue
+            self._grant()
+            future.set_result(None)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    async def _acquire(self, priority: int) -> None:
+        started = time.monotonic()
+        if self._has_capacity() and not self._waiters:
+            self._grant()
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), future))
+            try:
+                await asyncio.wait_for(future, LLM_QUEUE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                # 시간 초과와 자리 배정이 겹쳤다면 받은 자리를 반납 (in_flight 누수 방지)
+                if future.done() and not future.cancelled():
+                    self._release()
+                self.queue_timeouts += 1
+                raise LLMProviderError(f"{self.name} 요청 대기 시간 초과 ({LLM_QUEUE_TIMEOUT_SECONDS:g}초)", status=503)
+            except BaseException:
+                # 자리를 받은 직후 취소되었다면 반납
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+        waited = time.monotonic() - started
+        self._wait_total += waited
+        self._wait_count += 1
+        self._wait_max = max(self._wait_max, waited)
+
+    def _on_success(self) -> None:
+        self.completed += 1
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self._wake()
+
+    def _on_throttle(self, started: float) -> None:
+        self.throttled += 1
+        if started >= self._last_decrease:
+            self.limit = max(self.minimum, self.limit * 0.5)
+            self._last_decrease = time.monotonic()
+
+    async def call(self, fn: Callable[[], Awaitable[T]], priority: int = PRIORITY_INTERACTIVE) -> T:
+        """자리를 받아 fn을 실행하고, 재시도 가능한 오류면 백오프 후 다시 줄을 섭니다."""
+        attempt = 0
+        while True:
+            await self._acquire(priority)
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except LLMProviderError as e:
+                if e.status == 429:
+                    self._on_throttle(started)
+                if not e.retryable or attempt >= LLM_MAX_RETRIES:
+                    self.failed += 1
+                    raise
+                error = e
+            except BaseException:
+                self.failed += 1
+                raise
+            else:
+                self._on_success()
+                return result
+            finally:
+                self._release()
+
+            # 백오프 중에는 자리를 차지하지 않음
+            attempt += 1
+            self.retries += 1
+            delay = error.retry_after
+            if delay is None:
+                delay = LLM_BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)) * random.uniform(1.0, 1.5)
+            await asyncio.sleep(min(delay, LLM_BACKOFF_MAX_SECONDS))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": sum(1 for _, _, future in self._waiters if not future.done()),
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "failed": self.failed,
+            "queue_timeouts": self.queue_timeouts,
+            "queue_wait_avg_ms": round(self._wait_total / self._wait_count * 1000, 1) if self._wait_count else 0.0,
+            "queue_wait_max_ms": round(self._wait_max * 1000, 1),
+        }
+
+
+# 공급자별 제한기
+gemini_limiter = AdaptiveLimiter("gemini")
+azure_limiter = AdaptiveLimiter("azure_openai")
+
+
+def get_llm_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    return {limiter.name: limiter.stats() for limiter in (gemini_limiter, azure_limiter)}
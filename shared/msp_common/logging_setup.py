@@ -0,0 +1,276 @@
+"""
+비동기 구조화 로깅
+- setup_logging(): 루트/uvicorn 로거의 핸들러를 QueueHandler 하나로 바꾸고, 실제 출력(포맷팅 + stdout 쓰기)은
+  QueueListener 백그라운드 스레드에서 처리 → 요청 처리 스레드(이벤트 루프)는 큐에 넣기만 함
+- 메시지 포맷팅(%s 인자 치환, 예외 traceback 문자열화)도 리스너 스레드에서 하므로 logger.info("...%s", obj)처럼
+  인자를 넘기면 출력되지 않는 레코드(레벨/샘플링으로 걸러진 레코드)는 문자열로 바뀌지 않음
+- LOG_FORMAT=json(기본): 한 줄에 JSON 하나 (ts, level, logger, msg, request_id, trace_id, extra 필드, exc)
+  LOG_FORMAT=text: 사람이 읽기 쉬운 한 줄 형식
+- LOG_SAMPLE_RATES="app.api.saju=0.1,uvicorn.access=0.05": 로거 이름(접두사)별로 INFO 이하 레코드를 그 비율만 남김
+  (WARNING 이상은 항상 출력)
+- RequestIdMiddleware: X-Request-ID 헤더(없으면 새로 생성)를 요청 컨텍스트에 두고 응답 헤더로 돌려줌.
+  같은 요청에서 남긴 로그에는 request_id와 (추적이 켜져 있으면) trace_id가 붙음.
+  with_request_id()로 다른 서비스 호출(NewCompatibility → SAJU API)에도 같은 ID를 실어 보냄
+큐가 가득 차면(LOG_QUEUE_SIZE) 요청을 막지 않고 레코드를 버리며 개수는 get_logging_stats()로 확인합니다.
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from msp_common import SERVICE_NAME
+from msp_common.tracing import current_span
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SERVICE_NAME = os.getenv("LOG_SERVICE_NAME", SERVICE_NAME)
+
+
+def _parse_sample_rates(value: str) -> List[Tuple[str, float]]:
+    """"a.b=0.1,c=0.5" → [(접두사, 비율)] (긴 접두사 우선)"""
+    rates = []
+    for item in value.split(","):
+        name, sep, rate = item.partition("=")
+        if sep and name.strip():
+            rates.append((name.strip(), min(1.0, max(0.0, float(rate)))))
+    return sorted(rates, key=lambda pair: len(pair[0]), reverse=True)
+
+
+LOG_SAMPLE_RATES = _parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# LogRecord 기본 속성 (이외의 속성은 extra= 로 넘긴 구조화 필드로 취급)
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "trace_id", "span_id"}
+
+_stats_lock = threading.Lock()
+_stats = {"enqueued": 0, "dropped_queue_full": 0, "sampled_out": 0}
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def with_request_id(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """나가는 요청 헤더에 현재 요청 ID를 X-Request-ID로 추가 (호출받는 서비스의 로그와 연결)"""
+    headers = {} if headers is None else headers
+    request_id = _request_id.get()
+    if request_id:
+        headers["X-Request-ID"] = request_id
+    return headers
+
+
+class ContextFilter(logging.Filter):
+    """
+    호출한 스레드에서 실행되는 필터: 요청/트레이스 ID를 레코드에 붙이고, 로거별 샘플링으로 INFO 이하 레코드를 거름.
+    (컨텍스트 변수는 리스너 스레드에서는 보이지 않으므로 여기서 복사해 둠)
+    """
+
+    def __init__(self, sample_rates: List[Tuple[str, float]] = LOG_SAMPLE_RATES):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self._rate_cache: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._rate_cache.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix, value in self.sample_rates:
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = value
+                    break
+            self._rate_cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and self.sample_rates:
+            rate = self._rate(record.name)
+            if rate < 1.0 and random.random() >= rate:
+                _count("sampled_out")
+                return False
+        if getattr(record, "request_id", None) is None:
+            record.request_id = _request_id.get()
+        span = current_span()
+        record.trace_id = span.trace_id if span is not None else None
+        record.span_id = span.span_id if span is not None else None
+        return True
+
+
+# 리스너 스레드에서 늦게 포맷팅해도 결과가 같은 인자 타입
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    표준 QueueHandler.prepare()는 호출한 스레드에서 메시지와 예외를 모두 포맷팅하므로, 인자가 불변 기본형이면
+    레코드를 그대로 넣고 포맷팅은 리스너 스레드의 포매터에 맡깁니다.
+    그 밖의 인자(pydantic 모델, dict 뷰, ORM 객체 등)는 로그 직후 바뀌거나 다른 스레드에서 읽으면 안전하지 않으므로
+    호출 시점에 메시지 문자열로 고정합니다.
+    큐가 가득 차면 기다리지 않고 버립니다.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE_ARG_TYPES) for arg in args)):
+            record = copy.copy(record)
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            _count("enqueued")
+        except queue.Full:
+            _count("dropped_queue_full")
+
+
+class _DrainingQueueListener(logging.handlers.QueueListener):
+    """종료 표시를 put_nowait로 넣는 기본 구현은 큐가 가득 차 있으면 실패하므로, 리스너가 비울 때까지 기다려 넣음"""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def _timestamp(record: logging.LogRecord) -> str:
+    return datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄 JSON. extra= 로 넘긴 필드는 최상위 키로 들어갑니다."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": _timestamp(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "service": LOG_SERVICE_NAME,
+            "msg": record.getMessage(),
+        }
+        for key in ("request_id", "trace_id", "span_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+_listener: Optional[_DrainingQueueListener] = None
+_queue: Optional["queue.Queue[logging.LogRecord]"] = None
+_UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+
+def setup_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT) -> None:
+    """
+    루트 로거와 uvicorn 로거를 큐 핸들러로 교체하고 리스너 스레드를 시작합니다 (여러 번 호출해도 한 번만 적용).
+    각 모듈의 logging.basicConfig()로 붙은 스트림 핸들러는 제거됩니다.
+    """
+    global _listener, _queue
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if log_format == "text" else JsonFormatter())
+
+    _queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(_queue)
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    # uvicorn은 자체 핸들러로 동기 출력하므로 같은 큐로 돌림
+    for name in _UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = [handler]
+        uvicorn_logger.propagate = False
+
+    _listener = _DrainingQueueListener(_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """큐에 남은 레코드를 모두 출력하고 리스너 스레드를 멈춥니다."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["queue_size"] = _queue.qsize() if _queue is not None else 0
+    stats["queue_max"] = LOG_QUEUE_SIZE
+    return stats
+
+
+class RequestIdMiddleware:
+    """
+    X-Request-ID 헤더(없으면 새로 생성)를 로그 컨텍스트에 두고 응답 헤더로 돌려줍니다.
+    새로 만든 ID는 요청 헤더에도 넣어, 안쪽 미들웨어(프로파일링 등)와 미들웨어 밖에서 도는 전역 예외 핸들러도
+    같은 ID를 쓰게 합니다 (request.headers["x-request-id"]). 가장 바깥쪽에 등록합니다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = ""
+        for key, value in scope.get("headers", []):
+            if key.lower() == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+            # 예외 핸들러(ServerErrorMiddleware)가 같은 scope 객체를 보므로 제자리에서 수정
+            scope["headers"] = list(scope.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
@@ -0,0 +1,255 @@
+"""
+Prometheus 형식 지표 수집
+- MetricsMiddleware: 라우트별 요청 수 / 지연 시간 히스토그램 / 처리 중 요청 수
+- time_stage() / observe_stage(): 내부 단계 소요 시간 히스토그램
+  (SAJU: DB 조회, 팔자 추출, 오행 분석 / NewCompatibility: SAJU API 호출, 궁합 계산 /
+   Physiognomy: FaceMesh 랜드마크, 기하학 계산, 규칙, RAG / 공통: AI 호출)
+- register_collector(): 기존 통계(stats() 딕셔너리)의 숫자 값을 게이지로 노출
+- /metrics 엔드포인트는 render_metrics() 결과를 text/plain; version=0.0.4 로 반환
+외부 패키지 없이 텍스트 노출 형식만 구현합니다 (카운터/게이지/히스토그램).
+"""
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from msp_common.tracing import route_template, start_span
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _parse_buckets(value: str) -> Tuple[float, ...]:
+    return tuple(sorted(float(v) for v in value.split(",") if v.strip()))
+
+
+# 요청 지연 버킷(초): 리포트/해석처럼 LLM 호출이 포함된 엔드포인트까지 고려해 60초까지
+REQUEST_BUCKETS = _parse_buckets(os.getenv(
+    "METRICS_REQUEST_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60"))
+# 단계 지연 버킷(초): 팔자 추출/규칙 판정처럼 100us 단위 단계부터 AI 호출까지
+STAGE_BUCKETS = _parse_buckets(os.getenv(
+    "METRICS_STAGE_BUCKETS", "0.0001,0.00025,0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60"))
+
+LabelValues = Tuple[str, ...]
+_INF_LABEL = 'le="+Inf"'
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = REQUEST_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+        # 라벨 값 → [버킷별 개수..., 합계, 전체 개수]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = self.header()
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, _INF_LABEL)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {repr(float(state[-2]))}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # (이름 접두사, 통계 함수, 라벨 이름) - 렌더링 시점에 호출
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, Any]], Optional[str]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, prefix: str, stats_fn: Callable[[], Dict[str, Any]], label: Optional[str] = None) -> None:
+        """
+        stats_fn()의 숫자 값을 `{prefix}_{키}` 게이지로 노출합니다.
+        label을 지정하면 stats_fn()은 {라벨 값: {키: 숫자}} 형태여야 합니다 (예: 공급자별 제한기 통계).
+        """
+        self._collectors.append((prefix, stats_fn, label))
+
+    def _render_collectors(self) -> List[str]:
+        samples: Dict[str, List[str]] = {}
+        for prefix, stats_fn, label in self._collectors:
+            try:
+                stats = stats_fn()
+            except Exception as e:
+                logger.warning("지표 수집 실패 (%s): %s", prefix, e)
+                continue
+            groups = stats.items() if label else [(None, stats)]
+            for label_value, values in groups:
+                if not isinstance(values, dict):
+                    continue
+                labels = _format_labels((label,), (label_value,)) if label else ""
+                for key, value in values.items():
+                    if isinstance(value, bool):
+                        value = int(value)
+                    if isinstance(value, (int, float)):
+                        name = _INVALID_NAME_CHARS.sub("_", f"{prefix}_{key}")
+                        samples.setdefault(name, []).append(f"{name}{labels} {_format_value(value)}")
+        lines = []
+        for name in sorted(samples):
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples[name])
+        return lines
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        lines.extend(self._render_collectors())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "처리한 HTTP 요청 수", ("method", "route", "status")))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP 요청 처리 시간(초)", ("method", "route"), REQUEST_BUCKETS))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "처리 중인 HTTP 요청 수", ("method", "route")))
+stage_duration_seconds = registry.register(Histogram(
+    "stage_duration_seconds", "내부 처리 단계 소요 시간(초)", ("stage",), STAGE_BUCKETS))
+stage_errors_total = registry.register(Counter(
+    "stage_errors_total", "예외로 끝난 내부 처리 단계 수", ("stage",)))
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        stage_duration_seconds.observe(seconds, stage)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """
+    with time_stage("palja"): ... 형태로 내부 단계 소요 시간을 기록합니다. 추적이 켜져 있으면 같은 이름의 스팬도 만듭니다.
+    동기/비동기 코드 모두에서 사용할 수 있습니다 (async 함수 안에서도 with 블록으로 await 가능).
+    """
+    started = time.perf_counter()
+    try:
+        with start_span(stage):
+            yield
+    except BaseException:
+        if METRICS_ENABLED:
+            stage_errors_total.inc(stage)
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def register_collector(prefix: str, stats_fn: Callable[[], Dict[str, Any]], label: Optional[str] = None) -> None:
+    registry.register_collector(prefix, stats_fn, label)
+
+
+def render_metrics() -> str:
+    return registry.render()
+
+
+class MetricsMiddleware:
+    """라우트별 요청 수, 지연 시간, 처리 중 요청 수를 기록합니다. 안쪽 미들웨어(압축/캐시/CORS 등) 처리 시간은 포함됩니다."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status = 500
+        started = time.perf_counter()
+        http_requests_in_progress.inc(method, route)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec(method, route)
+            http_request_duration_seconds.observe(time.perf_counter() - started, method, route)
+            http_requests_total.inc(method, route, str(status))
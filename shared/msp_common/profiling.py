@@ -0,0 +1,369 @@
+"""
+요청 단위 샘플링 프로파일러 / 메모리 스냅샷 (운영 중 디버깅용, 기본 비활성)
+- ProfilingMiddleware: X-Profile-Token 헤더가 PROFILE_ADMIN_TOKEN과 같거나 PROFILE_SAMPLE_RATE 확률에 걸린 요청만 프로파일링
+- 백그라운드 스레드가 PROFILE_INTERVAL_MS마다 스택을 샘플링해, 그 요청에 속한 스택만 모음
+  (이벤트 루프 스레드: 요청 코루틴이 실행 중일 때, asyncio.to_thread 워커: 요청의 컨텍스트로 실행 중일 때)
+  (ProcessPoolExecutor에서 도는 작업 - Physiognomy의 FaceMesh/이미지 처리 등 - 은 다른 프로세스라 샘플링되지 않으므로
+   이 구간은 /metrics의 stage_duration_seconds로 확인)
+- 결과는 요청 ID별로 메모리에 최근 PROFILE_MAX_STORED개 보관, folded 형식(flamegraph.pl / speedscope에 바로 사용)으로 조회
+- /debug/tracemalloc: 스냅샷 저장 후 이후 증가분(diff)을 파일:줄 단위로 조회
+/debug/* 엔드포인트는 PROFILE_ADMIN_TOKEN이 설정되어 있고 X-Profile-Token 헤더가 일치할 때만 응답합니다.
+"""
+import asyncio
+import concurrent.futures.thread
+import contextvars
+import functools
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+# 한 요청에서 모을 최대 샘플 수 (긴 스트리밍 응답 등에서 메모리가 늘지 않도록)
+PROFILE_MAX_SAMPLES = int(os.getenv("PROFILE_MAX_SAMPLES", "20000"))
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "10"))
+
+_WORKITEM_RUN = concurrent.futures.thread._WorkItem.run.__code__
+_active_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("active_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self, request_id: str, method: str, path: str, marker_frame, loop_thread_id: int, reason: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.reason = reason
+        # 이 프레임(미들웨어 코루틴)이 스택에 있으면 이벤트 루프가 이 요청을 실행 중
+        self.marker_frame = marker_frame
+        self.loop_thread_id = loop_thread_id
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.status: Optional[int] = None
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.ticks = 0
+        self.busy_ticks = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 1),
+            "samples": self.sample_count,
+            # 요청이 진행된 시간 중 요청 코드가 실행 중이던 비율 (낮으면 대부분 I/O 대기)
+            "busy_ratio": round(self.busy_ticks / self.ticks, 3) if self.ticks else 0.0,
+            "interval_ms": PROFILE_INTERVAL_MS,
+        }
+
+    def folded(self) -> str:
+        """flamegraph.pl / speedscope용 folded 형식 (루트;...;리프 샘플수)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def top_functions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """리프(self) 기준 / 포함(total) 기준 샘플 수 상위 함수"""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.samples.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        return [
+            {"function": name, "self": self_counts.get(name, 0), "total": total}
+            for name, total in total_counts.most_common(limit)
+        ]
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _context_of_workitem(frame) -> Optional[contextvars.Context]:
+    """asyncio.to_thread가 넘긴 functools.partial(ctx.run, ...)에서 호출자의 컨텍스트를 꺼냄"""
+    item = frame.f_locals.get("self")
+    fn = getattr(item, "fn", None)
+    if isinstance(fn, functools.partial):
+        owner = getattr(fn.func, "__self__", None)
+        if isinstance(owner, contextvars.Context):
+            return owner
+    return None
+
+
+class SamplingProfiler:
+    """진행 중인 프로파일이 있을 때만 샘플링 스레드를 돌립니다."""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, max_stored: int = PROFILE_MAX_STORED):
+        self.interval = interval_ms / 1000
+        self.max_stored = max_stored
+        self._active: List[RequestProfile] = []
+        self._stored: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: RequestProfile) -> None:
+        with self._lock:
+            if profile in self._active:
+                self._active.remove(profile)
+            profile.marker_frame = None
+            self._stored[profile.request_id] = profile
+            while len(self._stored) > self.max_stored:
+                self._stored.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._stored.get(request_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._stored.values())
+        return [profile.summary() for profile in reversed(profiles)]
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            busy = set()
+            for thread_id, leaf in frames.items():
+                if thread_id != own_id:
+                    owner = self._sample_thread(thread_id, leaf, active)
+                    if owner is not None:
+                        busy.add(owner.request_id)
+            del frames
+            for profile in active:
+                profile.ticks += 1
+                if profile.request_id in busy:
+                    profile.busy_ticks += 1
+            time.sleep(self.interval)
+
+    def _sample_thread(self, thread_id: int, leaf, active: List[RequestProfile]) -> Optional[RequestProfile]:
+        """스택을 리프에서 거슬러 올라가며 어느 요청의 스택인지 찾고, 찾으면 그 요청 아래 부분만 기록"""
+        stack = []
+        frame = leaf
+        while frame is not None:
+            for profile in active:
+                if thread_id == profile.loop_thread_id and frame is profile.marker_frame:
+                    return self._record(profile, stack)
+                if frame.f_code is _WORKITEM_RUN:
+                    context = _context_of_workitem(frame)
+                    if context is not None and context.get(_active_profile) is profile:
+                        # 워커 스레드 스택은 요청의 비동기 스택과 이어지지 않으므로 별도 루트로 표시
+                        stack.append("[to_thread]")
+                        return self._record(profile, stack)
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+        return None
+
+    @staticmethod
+    def _record(profile: RequestProfile, stack: List[str]) -> RequestProfile:
+        if stack and profile.sample_count < PROFILE_MAX_SAMPLES:
+            profile.samples[";".join(reversed(stack))] += 1
+            profile.sample_count += 1
+        return profile
+
+
+profiler = SamplingProfiler()
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return ""
+
+
+def _token_matches(token: Optional[str]) -> bool:
+    # 응답 시간으로 토큰을 추측하지 못하도록 상수 시간 비교
+    return bool(PROFILE_ADMIN_TOKEN) and token is not None and hmac.compare_digest(
+        token.encode("latin-1", "replace"), PROFILE_ADMIN_TOKEN.encode("latin-1", "replace"))
+
+
+def _profile_reason(scope) -> Optional[str]:
+    if _token_matches(_header(scope, b"x-profile-token")):
+        return "header"
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """선택된 요청을 샘플링 프로파일러로 감싸고 응답에 X-Profile-Id 헤더를 붙입니다."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        reason = _profile_reason(scope) if scope["type"] == "http" and not scope["path"].startswith("/debug/") else None
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _header(scope, b"x-request-id") or uuid.uuid4().hex
+        profile = RequestProfile(request_id, scope["method"], scope["path"], sys._getframe(), threading.get_ident(), reason)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        token = _active_profile.set(profile)
+        profiler.start(profile)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.duration_ms = (time.perf_counter() - started) * 1000
+            profiler.stop(profile)
+            _active_profile.reset(token)
+
+
+# ==================== tracemalloc ====================
+
+_baseline: Optional[tracemalloc.Snapshot] = None
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def _stat_row(stat) -> Dict[str, Any]:
+    frame = stat.traceback[0]
+    row = {"location": f"{frame.filename}:{frame.lineno}", "size_kib": round(stat.size / 1024, 1), "count": stat.count}
+    if hasattr(stat, "size_diff"):
+        row["size_diff_kib"] = round(stat.size_diff / 1024, 1)
+        row["count_diff"] = stat.count_diff
+    return row
+
+
+def tracemalloc_snapshot(limit: int = 20) -> Dict[str, Any]:
+    """추적을 시작(필요 시)하고 현재 스냅샷을 diff 기준으로 저장합니다."""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    _baseline = _take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "current_kib": round(current / 1024, 1),
+        "peak_kib": round(peak / 1024, 1),
+        "top": [_stat_row(stat) for stat in _baseline.statistics("lineno")[:limit]],
+    }
+
+
+def tracemalloc_diff(limit: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+    """저장된 스냅샷 이후 늘어난 할당을 크기 증가순으로 반환합니다."""
+    if _baseline is None or not tracemalloc.is_tracing():
+        raise ValueError("먼저 POST /debug/tracemalloc/snapshot으로 기준 스냅샷을 만들어야 합니다.")
+    snapshot = _take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    stats = snapshot.compare_to(_baseline, group_by)
+    return {
+        "current_kib": round(current / 1024, 1),
+        "peak_kib": round(peak / 1024, 1),
+        "total_diff_kib": round(sum(stat.size_diff for stat in stats) / 1024, 1),
+        "top": [_stat_row(stat) for stat in stats[:limit]],
+    }
+
+
+def tracemalloc_stop() -> Dict[str, Any]:
+    global _baseline
+    _baseline = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return {"tracing": False}
+
+
+# ==================== /debug 엔드포인트 ====================
+
+def _require_token(token: Optional[str]) -> None:
+    if not _token_matches(token):
+        raise HTTPException(status_code=403, detail="PROFILE_ADMIN_TOKEN과 일치하는 X-Profile-Token 헤더가 필요합니다.")
+
+
+async def require_admin_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    """관리용 엔드포인트 의존성 (Depends) - /debug/*와 같은 PROFILE_ADMIN_TOKEN 검사"""
+    _require_token(x_profile_token)
+
+
+debug_router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@debug_router.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """저장된 요청 프로파일 목록 (최근 순)"""
+    _require_token(x_profile_token)
+    return {"sample_rate": PROFILE_SAMPLE_RATE, "interval_ms": PROFILE_INTERVAL_MS, "profiles": profiler.list()}
+
+
+@debug_router.get("/profiles/{request_id}")
+async def get_profile(request_id: str, format: str = Query("folded", pattern="^(folded|json)$"),
+                      x_profile_token: Optional[str] = Header(None)):
+    """folded: flamegraph.pl / speedscope 입력 텍스트, json: 요약 + 상위 함수"""
+    _require_token(x_profile_token)
+    profile = profiler.get(request_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="프로파일을 찾을 수 없습니다.")
+    if format == "folded":
+        return PlainTextResponse(profile.folded())
+    return {**profile.summary(), "top_functions": profile.top_functions()}
+
+
+@debug_router.post("/tracemalloc/snapshot")
+async def take_tracemalloc_snapshot(limit: int = 20, x_profile_token: Optional[str] = Header(None)):
+    """메모리 추적 시작 + 기준 스냅샷 저장"""
+    _require_token(x_profile_token)
+    # 스냅샷/통계 계산은 힙 크기에 비례해 오래 걸리므로 이벤트 루프 밖에서 실행
+    return await asyncio.to_thread(tracemalloc_snapshot, limit)
+
+
+@debug_router.get("/tracemalloc/diff")
+async def get_tracemalloc_diff(limit: int = 20, group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+                               x_profile_token: Optional[str] = Header(None)):
+    """기준 스냅샷 이후 증가한 메모리 할당 (파일:줄 기준)"""
+    _require_token(x_profile_token)
+    try:
+        return await asyncio.to_thread(tracemalloc_diff, limit, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@debug_router.delete("/tracemalloc")
+async def stop_tracemalloc(x_profile_token: Optional[str] = Header(None)):
+    """메모리 추적 중지 (추적 중에는 할당마다 오버헤드가 있음)"""
+    _require_token(x_profile_token)
+    return tracemalloc_stop()
@@ -0,0 +1,223 @@
+"""
+LLM 프롬프트 빌더
+- 분석 결과를 "라벨: 값" 한 줄씩의 간결하고 결정적인(같은 입력 → 같은 문자열) 형태로 직렬화
+- 프롬프트 토큰 수를 세고, 예산을 넘으면 우선순위가 낮은 항목부터 제거
+- 템플릿에 버전을 붙여 응답/지표에서 어떤 프롬프트로 생성했는지 추적
+- 엔드포인트별로 기존 방식(분석 dict 전체 JSON 삽입) 대비 토큰 절감량을 집계
+프롬프트에 넣을 분석 항목(FeatureSpec 목록)은 각 서비스의 app/services/prompt_features.py에서 정의합니다.
+"""
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# 프롬프트 토큰 예산 (템플릿 고정 문구 포함)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))
+# 항목 하나의 최대 길이 (문자 수)
+PROMPT_FIELD_MAX_CHARS = int(os.getenv("PROMPT_FIELD_MAX_CHARS", "160"))
+
+try:
+    import tiktoken
+except ImportError:  # 선택 의존성: 없으면 근사치로 계산
+    tiktoken = None
+
+_encoding = None
+_encoding_failed = False
+
+
+def count_tokens(text: str) -> int:
+    """
+    프롬프트 토큰 수. tiktoken이 있으면 o200k_base 인코딩으로 세고,
+    없으면 근사치(ASCII 4글자당 1토큰, 한글 등 그 외 문자는 글자당 1토큰)를 사용합니다.
+    """
+    global _encoding, _encoding_failed
+    if tiktoken is not None and not _encoding_failed:
+        if _encoding is None:
+            try:
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                # 인코딩 파일을 받을 수 없는 환경 (오프라인 등)
+                _encoding_failed = True
+        if _encoding is not None:
+            return len(_encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ch < "\x80")
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """프롬프트에 넣을 분석 항목. priority가 높을수록 예산이 부족해도 끝까지 남습니다."""
+    label: str
+    source: Union[str, Callable[[Dict[str, Any]], Any]]  # 점으로 구분한 경로 또는 추출 함수
+    priority: int
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: str
+    text: str  # str.format 자리표시자: {features} 와 호출 시 넘기는 값들
+
+    @property
+    def template_id(self) -> str:
+        return f"{self.name}@{self.version}"
+
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    template_id: str
+    tokens: int
+    baseline_tokens: int
+    dropped: List[str]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "template": self.template_id,
+            "tokens": self.tokens,
+            "baseline_tokens": self.baseline_tokens,
+            "dropped_fields": self.dropped,
+        }
+
+
+def _lookup(data: Dict[str, Any], path: str) -> Any:
+    value: Any = data
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def compact_value(value: Any, max_chars: int = PROMPT_FIELD_MAX_CHARS) -> str:
+    """값을 짧은 한 줄 문자열로 만듭니다. 빈 값/0은 생략하고 dict는 키 순서로 정렬합니다."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        text = "예" if value else "아니오"
+    elif isinstance(value, float):
+        text = f"{value:.2f}".rstrip("0").rstrip(".")
+    elif isinstance(value, dict):
+        parts = []
+        for key in sorted(value, key=str):
+            item = compact_value(value[key], max_chars)
+            if item and item != "0":
+                parts.append(f"{key}={item}")
+        text = ", ".join(parts)
+    elif isinstance(value, (list, tuple)):
+        text = ", ".join(item for item in (compact_value(v, max_chars) for v in value) if item)
+    elif hasattr(value, "dict"):
+        return compact_value(value.dict(), max_chars)
+    else:
+        text = str(value)
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+
+def serialize_features(data: Dict[str, Any], specs: Sequence[FeatureSpec]) -> List[Tuple[FeatureSpec, str]]:
+    lines = []
+    for spec in specs:
+        raw = spec.source(data) if callable(spec.source) else _lookup(data, spec.source)
+        value = compact_value(raw)
+        if value:
+            lines.append((spec, value))
+    return lines
+
+
+class PromptMetrics:
+    """엔드포인트별 프롬프트 토큰 통계"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, endpoint: str, built: BuiltPrompt) -> None:
+        stats = self._stats.setdefault(endpoint, {
+            "template": built.template_id,
+            "calls": 0,
+            "tokens": 0,
+            "baseline_tokens": 0,
+            "max_tokens": 0,
+            "budget_truncations": 0,
+        })
+        stats["template"] = built.template_id
+        stats["calls"] += 1
+        stats["tokens"] += built.tokens
+        stats["baseline_tokens"] += built.baseline_tokens
+        stats["max_tokens"] = max(stats["max_tokens"], built.tokens)
+        stats["budget_truncations"] += bool(built.dropped)
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for endpoint, stats in self._stats.items():
+            calls = stats["calls"]
+            baseline = stats["baseline_tokens"]
+            result[endpoint] = {
+                **stats,
+                "avg_tokens": round(stats["tokens"] / calls, 1),
+                "avg_baseline_tokens": round(baseline / calls, 1),
+                "reduction_ratio": round(1 - stats["tokens"] / baseline, 4) if baseline else 0.0,
+            }
+        return {"budget": PROMPT_TOKEN_BUDGET, "tokenizer": "tiktoken" if _encoding is not None else "approx", "endpoints": result}
+
+
+prompt_metrics = PromptMetrics()
+
+
+def build_prompt(
+    endpoint: str,
+    template: PromptTemplate,
+    data: Dict[str, Any],
+    specs: Sequence[FeatureSpec],
+    baseline: Optional[str] = None,
+    budget: Optional[int] = None,
+    **values: Any,
+) -> BuiltPrompt:
+    """
+    템플릿의 {features} 자리에 직렬화한 항목을 넣어 프롬프트를 만듭니다.
+    토큰 수가 예산을 넘으면 우선순위가 낮은 항목(같으면 뒤쪽 항목)부터 빼고 다시 셉니다.
+
+    Args:
+        baseline: 비교용 기존 방식 프롬프트 (지표의 절감량 계산에 사용)
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET
+    lines = serialize_features(data, specs)
+
+    def render(kept: Sequence[Tuple[FeatureSpec, str]]) -> str:
+        features = "\n".join(f"• {spec.label}: {value}" for spec, value in kept)
+        return template.text.format(features=features, **values)
+
+    kept_indexes = list(range(len(lines)))
+    text = render(lines)
+    tokens = count_tokens(text)
+    dropped: List[str] = []
+    for index in sorted(kept_indexes, key=lambda i: (lines[i][0].priority, -i)):
+        if tokens <= budget:
+            break
+        kept_indexes.remove(index)
+        dropped.append(lines[index][0].label)
+        text = render([lines[i] for i in kept_indexes])
+        tokens = count_tokens(text)
+
+    built = BuiltPrompt(
+        text=text,
+        template_id=template.template_id,
+        tokens=tokens,
+        baseline_tokens=count_tokens(baseline) if baseline is not None else tokens,
+        dropped=dropped,
+    )
+    prompt_metrics.record(endpoint, built)
+    return built
+
+
+def record_prompt(endpoint: str, template_id: str, text: str) -> BuiltPrompt:
+    """이미 요약된 필드만 쓰는 고정 형식 프롬프트도 토큰 지표에 남깁니다 (절감량 0으로 집계)."""
+    tokens = count_tokens(text)
+    built = BuiltPrompt(text=text, template_id=template_id, tokens=tokens, baseline_tokens=tokens, dropped=[])
+    prompt_metrics.record(endpoint, built)
+    return built
+
+
+def legacy_json(data: Any, indent: Optional[int] = None) -> str:
+    """기존 프롬프트가 분석 dict를 넣던 방식 (절감량 비교 기준)"""
+    return json.dumps(data, ensure_ascii=False, indent=indent, default=str)
+
@@ -0,0 +1,322 @@
+"""
+분산 추적 (W3C traceparent 호환)
+- SAJU API를 호출하는 쪽(NewCompatibility)이 traceparent를 실어 보내면 두 서비스의 스팬이 한 트레이스로 이어짐
+- TracingMiddleware: 들어온 요청의 traceparent를 이어받아 서버 스팬을 시작 (없으면 새 트레이스)
+- start_span(): 현재 스팬의 자식 스팬 (contextvars 기반이라 asyncio.gather / asyncio.to_thread로도 이어짐)
+- inject_headers(): 나가는 HTTP 요청(httpx/aiohttp) 헤더에 traceparent 추가
+- 내보내기: 백그라운드 스레드가 묶어서 JSONL 파일 및/또는 OTLP/HTTP(JSON) 수집기로 전송
+  TRACING_EXPORTER=jsonl,otlp 처럼 쉼표로 지정 (기본 none = 비활성)
+JSONL 파일은 scripts/tracing/trace_report.py로 서비스 간 트리/임계 경로를 재구성할 수 있습니다.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from starlette.routing import Match
+
+from msp_common import SERVICE_NAME
+
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTERS = frozenset(
+    name.strip() for name in os.getenv("TRACING_EXPORTER", "none").lower().split(",") if name.strip() not in ("", "none")
+)
+TRACING_ENABLED = bool(TRACING_EXPORTERS)
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", SERVICE_NAME)
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+TRACING_JSONL_PATH = os.getenv("TRACING_JSONL_PATH", f"./traces/{TRACING_SERVICE_NAME}.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_FLUSH_SECONDS = float(os.getenv("TRACING_FLUSH_SECONDS", "2"))
+TRACING_QUEUE_SIZE = int(os.getenv("TRACING_QUEUE_SIZE", "10000"))
+TRACING_BATCH_SIZE = 512
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# OTLP SpanKind
+_KIND_CODES = {"internal": 1, "server": 2, "client": 3}
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, kind: str = "internal",
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "service": TRACING_SERVICE_NAME,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def parse_traceparent(value: str) -> Optional[Dict[str, Any]]:
+    match = _TRACEPARENT.match(value.strip().lower()) if value else None
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return {"trace_id": match.group(1), "span_id": match.group(2), "sampled": int(match.group(3), 16) & 1 == 1}
+
+
+@contextmanager
+def start_span(name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None,
+               parent: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+    """
+    현재 스팬(또는 parent로 넘긴 원격 부모)의 자식 스팬을 시작합니다. 추적이 비활성화면 None을 넘깁니다.
+    예외가 발생하면 스팬에 오류로 기록한 뒤 그대로 다시 던집니다.
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+
+    local_parent = _current_span.get()
+    if parent is not None:
+        span = Span(name, parent["trace_id"], parent["span_id"], parent["sampled"], kind, attributes)
+    elif local_parent is not None:
+        span = Span(name, local_parent.trace_id, local_parent.span_id, local_parent.sampled, kind, attributes)
+    else:
+        span = Span(name, "%032x" % random.getrandbits(128), None, random.random() < TRACING_SAMPLE_RATIO, kind, attributes)
+
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_ns = time.time_ns()
+        if span.sampled:
+            exporter.submit(span)
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """나가는 요청 헤더에 현재 스팬의 traceparent를 추가해 반환합니다 (원본 딕셔너리는 변경하지 않음)."""
+    headers = dict(headers or {})
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = span.traceparent
+    return headers
+
+
+class SpanExporter:
+    """완료된 스팬을 큐에 모았다가 백그라운드 스레드에서 묶음 단위로 내보냅니다. 큐가 가득 차면 버립니다."""
+
+    def __init__(self, exporters=TRACING_EXPORTERS, jsonl_path: str = TRACING_JSONL_PATH,
+                 otlp_endpoint: str = TRACING_OTLP_ENDPOINT, flush_seconds: float = TRACING_FLUSH_SECONDS):
+        self.exporters = exporters
+        self.jsonl_path = jsonl_path
+        self.otlp_endpoint = otlp_endpoint
+        self.flush_seconds = flush_seconds
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=TRACING_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.export_errors = 0
+
+    def submit(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            # 첫 스팬이 들어오면 flush_seconds 동안 (또는 묶음이 찰 때까지) 더 모아서 한 번에 내보냄
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < TRACING_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._export(batch)
+
+    def _drain(self, batch: List[Span]) -> List[Span]:
+        while len(batch) < TRACING_BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self) -> None:
+        """남은 스팬을 즉시 내보냅니다 (프로세스 종료 시 호출)."""
+        while not self._queue.empty():
+            self._export(self._drain([]))
+
+    def _export(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        with self._lock:
+            try:
+                if "jsonl" in self.exporters:
+                    self._write_jsonl(spans)
+                if "otlp" in self.exporters:
+                    self._post_otlp(spans)
+                self.exported += len(spans)
+            except Exception as e:
+                self.export_errors += 1
+                logger.warning("스팬 내보내기 실패 (%d개): %s", len(spans), e)
+
+    def _write_jsonl(self, spans: List[Span]) -> None:
+        directory = os.path.dirname(self.jsonl_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.jsonl_path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_record(), ensure_ascii=False, default=str) + "\n")
+
+    def _post_otlp(self, spans: List[Span]) -> None:
+        body = json.dumps(otlp_payload(spans), default=str).encode("utf-8")
+        request = urllib.request.Request(self.otlp_endpoint, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            response.read()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": TRACING_ENABLED,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "export_errors": self.export_errors,
+            "queued": self._queue.qsize(),
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    """OTLP/HTTP JSON 형식 (ExportTraceServiceRequest)"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACING_SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": "msp_common.tracing"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": _KIND_CODES.get(span.kind, 1),
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                } for span in spans],
+            }],
+        }]
+    }
+
+
+exporter = SpanExporter()
+
+
+def get_tracing_stats() -> Dict[str, Any]:
+    return exporter.stats()
+
+
+def route_template(scope) -> str:
+    """요청 경로 대신 라우트 템플릿(/chat-sessions/{session_id} 등)을 돌려줌 (지표 라벨/스팬 이름의 종류 수가 늘지 않도록)"""
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    for route in getattr(router, "routes", ()):
+        try:
+            match, _ = route.matches(scope)
+        except Exception:
+            continue
+        if match == Match.FULL:
+            return getattr(route, "path", "") or scope["path"]
+    return "unmatched"
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return ""
+
+
+class TracingMiddleware:
+    """요청마다 서버 스팬을 시작하고 응답에 X-Trace-Id 헤더를 붙입니다. 가장 바깥쪽에 등록합니다."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        remote_parent = parse_traceparent(_header(scope, b"traceparent"))
+        route = route_template(scope)
+        with start_span(f"{scope['method']} {route}", kind="server", parent=remote_parent,
+                        attributes={"http.method": scope["method"], "http.route": route, "http.target": scope["path"]}) as span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", span.trace_id.encode("latin-1"))]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)